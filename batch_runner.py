@@ -0,0 +1,573 @@
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import string
+import sys
+import tempfile
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+from context_packer import pack_context
+from generation_plan import GenerationPlan
+from hwpx_writer import write_document
+from llm_cache import ResponseCache
+from llm_provider import create_provider
+from marker_grammar import LETTER_DIGIT, PAIR, PAIR_DIGIT, TITLE, extract_json, parse_markers
+from page_store import MappedPages
+from pdf_extract import default_cache, file_sha256, iter_pdf_pages
+from rate_limiter import PRIORITY_HIGH, PRIORITY_NORMAL, default_limiter
+from retrieval_index import RetrievalIndex, format_passages
+from template_index import load_template_index
+from tracing import export_requested, span
+
+#==============================================================================
+# 작업 목록(manifest) 기반 일괄 문서 생성기
+#   - YAML/JSON 작업 목록의 작업마다 (템플릿, 참고 PDF, 프롬프트 프로필, 출력 경로)를 받아
+#     여러 문서(군정집 발간사, 시정연설문, 부서별 업무계획 등)를 한 번에 만든다.
+#   - 여러 작업이 같은 PDF를 쓰면 한 번만 추출하고, 생성은 max_parallel 개까지 동시에 진행한다.
+#     문서 저장은 한/글 COM 을 위해 이 프로그램을 실행한 스레드에서 한다.
+#   - 끝난 작업은 상태 파일(<manifest>.state.json)에 기록해 두므로, 중간에 멈춰도 다시 실행하면
+#     남은 작업만 이어서 한다. 응답은 디스크 캐시에 남아 있어 진행 중이던 작업도 다시 요청하지 않는다.
+#
+#   사용법: python batch_runner.py jobs.yaml [--max-parallel 3] [--force] [--dry-run]
+#
+#   작업 목록 예시 (경로는 작업 목록 파일 기준 상대 경로도 가능)
+#     model: gemini-2.5-flash
+#     max_parallel: 3
+#     defaults:
+#       sources: [pdf/2025_업무계획.pdf]
+#       year: 2026
+#     jobs:
+#       - name: 4분기_발간사
+#         profile: foreword
+#         template: template/발간사.hwpx
+#         output: out/4분기_발간사.hwpx
+#         quarter: 4
+#       - name: 기획예산실_업무계획
+#         profile: workplan
+#         template: template/업무계획.hwpx
+#         output: out/기획예산실.hwpx
+#         keyword: 인구 소멸 대응
+#==============================================================================
+
+DEFAULT_MAX_PARALLEL = 3
+DEFAULT_MODEL = "gemini-2.5-flash"
+DEFAULT_CONTEXT_TOKENS = 200000
+STATE_SUFFIX = ".state.json"
+
+_JOB_FIELDS = ("name", "profile", "template", "sources", "output")
+
+# name: 작업 이름 (상태 파일 키), profile: 프롬프트 프로필 이름, template: 템플릿 경로,
+# sources: 참고 PDF 경로 목록, output: 출력 경로, options: 그 밖의 설정 (keyword, year, instructions 등)
+JobSpec = namedtuple("JobSpec", ["name", "profile", "template", "sources", "output", "options"])
+# name: 프로필 이름, build(plan, job, sources, ask_context): 생성 계획에 섹션 요청을 추가하고
+# 마커 맵을 채울 dict 를 반환하는 함수, defaults: 끝까지 받지 못한 마커에 넣을 값,
+# erase: 끝까지 받지 못하면 마커 줄째 지울 마커 (hwpx_writer.write_document)
+PromptProfile = namedtuple("PromptProfile", ["name", "build", "defaults", "erase"])
+# job: JobSpec, status: done/failed/skipped, output: 저장된 경로, error: 오류 문자열, seconds: 소요 시간
+JobResult = namedtuple("JobResult", ["job", "status", "output", "error", "seconds"])
+
+
+#------------------------------------------------------------------------------
+# 작업 목록 읽기
+#------------------------------------------------------------------------------
+
+def load_manifest(path):
+    """YAML/JSON 작업 목록을 읽어 (설정 dict, JobSpec 목록) 을 반환하는 함수"""
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    if path.lower().endswith(('.yaml', '.yml')):
+        if yaml is None:
+            raise RuntimeError("YAML 작업 목록을 읽으려면 PyYAML 이 필요합니다 (pip install pyyaml). JSON 을 사용해도 됩니다.")
+        manifest = yaml.safe_load(text) or {}
+    else:
+        manifest = json.loads(text)
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    defaults = manifest.get("defaults") or {}
+    jobs = []
+    names = set()
+    for number, entry in enumerate(manifest.get("jobs") or [], 1):
+        entry = {**defaults, **entry}
+        name = str(entry.get("name") or f"job{number}")
+        if name in names:
+            raise ValueError(f"작업 이름이 중복됩니다: {name}")
+        names.add(name)
+        profile = entry.get("profile")
+        if profile not in PROFILES:
+            raise ValueError(f"'{name}' 작업의 프롬프트 프로필을 알 수 없습니다: {profile} "
+                             f"(사용 가능: {', '.join(PROFILES)})")
+        if not entry.get("output"):
+            raise ValueError(f"'{name}' 작업에 output 이 없습니다.")
+        sources = entry.get("sources") or []
+        if isinstance(sources, str):
+            sources = [sources]
+        jobs.append(JobSpec(
+            name,
+            profile,
+            _resolve(base_dir, entry.get("template")),
+            [_resolve(base_dir, source) for source in sources],
+            _resolve(base_dir, entry["output"]),
+            {key: value for key, value in entry.items() if key not in _JOB_FIELDS},
+        ))
+    settings = {key: value for key, value in manifest.items() if key not in ("defaults", "jobs")}
+    return settings, jobs
+
+
+def _resolve(base_dir, path):
+    if not path:
+        return ""
+    path = os.path.expanduser(str(path))
+    return path if os.path.isabs(path) else os.path.normpath(os.path.join(base_dir, path))
+
+
+def job_fingerprint(job):
+    """작업 설정과 템플릿·참고 PDF 내용이 같은지 판단하는 해시 (달라지면 다시 생성)"""
+    digest = hashlib.sha256(json.dumps(job._asdict(), ensure_ascii=False, sort_keys=True, default=str).encode('utf-8'))
+    for path in [job.template, *job.sources]:
+        if path and os.path.exists(path):
+            digest.update(file_sha256(path).encode('ascii'))
+    return digest.hexdigest()
+
+
+#------------------------------------------------------------------------------
+# 이어하기 상태 파일
+#------------------------------------------------------------------------------
+
+class BatchState:
+    """작업별 완료 여부를 기록하는 상태 파일 (작업이 끝날 때마다 원자적으로 저장)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.jobs = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.jobs = json.load(f).get("jobs", {})
+            except (OSError, ValueError):
+                self.jobs = {}
+
+    def is_done(self, job, fingerprint):
+        entry = self.jobs.get(job.name)
+        return (entry is not None and entry.get("status") == "done" and entry.get("fingerprint") == fingerprint
+                and os.path.exists(entry.get("output", "")))
+
+    def record(self, result, fingerprint):
+        self.jobs[result.job.name] = {
+            "status": result.status,
+            "fingerprint": fingerprint,
+            "output": result.output,
+            "error": result.error,
+            "seconds": round(result.seconds, 2),
+            "finished": datetime.datetime.now().isoformat(timespec="seconds"),
+        }
+        self.save()
+
+    def save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(suffix='.json', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({"jobs": self.jobs}, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+#------------------------------------------------------------------------------
+# 공유 참고 자료
+#------------------------------------------------------------------------------
+
+class SourceStore:
+    """여러 작업이 함께 쓰는 PDF 텍스트 (파일마다 한 번만 추출)
+
+    페이지는 PDF 텍스트 캐시의 페이지 파일을 mmap 으로 연 MappedPages 로 들고 있어,
+    작업 수나 자료 수가 늘어도 메모리에 올라오는 것은 지금 읽는 페이지뿐이다.
+    """
+
+    def __init__(self):
+        self.pages = {}  # 경로 → 정제된 페이지 텍스트 목록 (MappedPages, 캐시 저장 실패 시 list)
+        self._indexes = {}
+
+    def load(self, paths, log=print):
+        pending = [path for path in dict.fromkeys(paths) if path not in self.pages]
+        missing = [path for path in pending if not os.path.exists(path)]
+        for path in missing:
+            if log:
+                log(f"  - 경고: 참고 자료 '{path}' 파일을 찾을 수 없어 건너뜁니다.")
+        pages = {}
+        digests = {}
+        failed = set()
+        found = [path for path in pending if path not in missing]
+        for item in iter_pdf_pages(found):
+            if item.error is not None:
+                if log:
+                    log(f"  - 오류: '{os.path.basename(item.path)}' 처리 중 오류 발생: {item.error}")
+                failed.add(item.path)
+                continue
+            digests[item.path] = item.sha256
+            if not item.cached:
+                pages.setdefault(item.path, []).append(item.cleaned)
+        for path in found:
+            if path in failed and path not in digests:
+                continue
+            entry = default_cache().get(digests[path]) if path in digests else None
+            self.pages[path] = entry.pages("cleaned") if entry is not None else pages.get(path, [])
+            if not log:
+                continue
+            if self._has_text(self.pages[path]):
+                log(f"  - 추출: {os.path.basename(path)} ({len(self.pages[path])}쪽)")
+            else:
+                log(f"  - 경고: '{os.path.basename(path)}'에서 텍스트를 추출할 수 없습니다.")
+
+    def documents(self, paths):
+        """pack_context 에 넘길 (제목, 텍스트) 목록 (페이지 파일이면 문자열로 합치지 않음)"""
+        return [(os.path.basename(path), self._text(self.pages[path])) for path in paths if path in self.pages]
+
+    @staticmethod
+    def _has_text(pages):
+        if isinstance(pages, MappedPages):
+            return pages.char_count > 0
+        return any(pages)
+
+    @staticmethod
+    def _text(pages):
+        if isinstance(pages, MappedPages):
+            return pages.joined()
+        return " ".join(page for page in pages if page)
+
+    def index(self, paths):
+        """paths 문서들의 검색 인덱스 (같은 조합은 한 번만 만듦)"""
+        key = tuple(path for path in paths if path in self.pages)
+        index = self._indexes.get(key)
+        if index is None:
+            index = RetrievalIndex()
+            for path in key:
+                index.add_pages(os.path.basename(path), self.pages[path])
+            self._indexes[key] = index
+        return index
+
+
+#------------------------------------------------------------------------------
+# 프롬프트 프로필
+#------------------------------------------------------------------------------
+
+class JobContext:
+    """프롬프트 프로필이 쓰는 작업별 참고 자료와 템플릿 정보"""
+
+    def __init__(self, job, sources, template_index):
+        self.job = job
+        self.options = job.options
+        self.template_index = template_index
+        self._sources = sources
+        self._packed = None
+
+    def reference(self):
+        """작업 참고 PDF 전체를 토큰 예산 안에서 구성한 참고 자료 (없으면 빈 목록)"""
+        if self._packed is None:
+            budget = int(self.options.get("context_tokens", DEFAULT_CONTEXT_TOKENS))
+            documents = self._sources.documents(self.job.sources)
+            self._packed = pack_context(documents, budget).text if documents else ""
+        return [f"[참고 자료 요약]\n{self._packed}"] if self._packed else []
+
+    def search(self, queries, k=5):
+        """질의별 관련 조각만 골라 만든 참고 자료 (없으면 빈 목록)"""
+        passages = self._sources.index(self.job.sources).search_sections(queries, k=k)
+        return [f"[참고 자료 발췌]\n{format_passages(passages)}"] if passages else []
+
+    def hint(self, *families, where=None):
+        """템플릿에 실제로 있는 식별자 안내 (색인이 없으면 빈 목록)"""
+        if self.template_index is None:
+            return []
+        hint = self.template_index.prompt_hint(*families, where=where)
+        return [hint] if hint else []
+
+    def instructions(self):
+        extra = self.options.get("instructions")
+        return [f"[추가 지침]\n{extra}"] if extra else []
+
+    @property
+    def year(self):
+        return int(self.options.get("year", datetime.date.today().year))
+
+
+def _insert_titles(text, families, marker_map):
+    # 섹션의 첫 줄(제목)만 넣는다 (스크립트와 같은 규칙)
+    sections = parse_markers(text, families=families)
+    marker_map.update({marker: title.replace("#", "") for marker, title in sections.titles().items()})
+
+
+def _insert_json(text, marker_map):
+    data = extract_json(text)
+    if data is None:
+        raise ValueError("응답에서 JSON 을 찾을 수 없습니다.")
+    marker_map.update({marker: content for marker, content in data.items() if isinstance(content, str)})
+
+
+def _build_foreword(plan, context, marker_map):
+    """군정집 발간사 (writeForeword2): 문장마다 ##AA, ##BB ... 마커"""
+    quarter = context.options.get("quarter", (datetime.date.today().month - 1) // 3 + 1)
+    focus = context.options.get("focus", "지역 경제 활성화와 군민 화합")
+    plan.add("발간사", lambda results: [
+        *context.reference(),
+        *context.hint(PAIR),
+        *context.instructions(),
+        f"""
+        {context.year}년도 {quarter}분기 울진군 군정집 발간사를 작성해주세요.
+        - 초점: {focus}
+        - 경제, 화합, 희망 3대 키워드를 자연스럽게 포함하고 구체적 성과와 비전을 제시
+        - 10줄 분량, 공식적이고 품격있는 문체, 인사말로 시작해 감사/격려로 마무리
+        - 각 문장마다 파싱문자 ##AA,##BB,##CC,##DD ... 부여 (예시 ##AA 내용 ##BB 내용)
+        """,
+    ], handle=lambda text: _insert_titles(text, (TITLE, PAIR), marker_map))
+
+
+def _build_speech(plan, context, marker_map):
+    """시정연설문 (writeForeword3): 문단마다 ##A1 ~ ##Z9 마커"""
+    plan.add("시정연설문", lambda results: [
+        *context.reference(),
+        *context.hint(LETTER_DIGIT),
+        *context.instructions(),
+        f"""
+        {context.year}년도 울진군 시정연설문을 작성해주세요.
+        - {context.year - 1}년 주요 성과를 보고하고 {context.year}년도 군정 운영 방향과 핵심 사업을 설명
+        - 공식적이고 품격있는 문체, 강조할 때는 '**' 문자 말고 '##'로 강조
+        - 각 문단마다 파싱문자 ##A1~A9,##B1~B9,##C1~C9 ... 부여 (하나의 알파벳에 대해 숫자는 1부터 9까지 순서대로)
+        """,
+    ], handle=lambda text: _insert_titles(text, (LETTER_DIGIT,), marker_map))
+
+
+def _build_workplan(plan, context, marker_map):
+    """부서별 업무계획 (replacehwp2): 대제목 → 세부내용, 주요성과·특수시책은 동시에"""
+    keyword = context.options.get("keyword", "")
+    titles = {}
+
+    def handle_titles(text):
+        sections = parse_markers(text, families=(TITLE,))
+        titles.update(sections.titles())
+        marker_map.update(titles)
+
+    plan.add("대제목", lambda results: [
+        *context.search([f"{keyword} 주요 업무 계획", "중점 추진 사업 계획", "주요 사업 추진 방향"], k=10),
+        *context.hint(TITLE),
+        *context.instructions(),
+        """
+        참고 자료를 바탕으로 중복되는 업무 계획의 대제목을 생성해줘.
+        답변은 반드시 '## 식별자 제목' 형식으로만 생성하고, 식별자는 AAA, BBB, CCC ... 순서로 사용해줘.
+        """,
+    ], handle=handle_titles)
+
+    def build_details(results):
+        title_lines = "\n".join(f"## {marker} {title}" for marker, title in titles.items())
+        queries = [f"{keyword} {title} {aspect}" for title in titles.values() for aspect in ("추진배경", "성과목표", "추진방향")]
+        return [
+            *context.search(queries or [keyword], k=3),
+            *([f"[앞서 생성한 대제목]\n{title_lines}"] if title_lines else []),
+            *context.hint(PAIR_DIGIT, where=lambda marker: marker[0] == marker[1]),
+            f"""
+            [앞서 생성한 대제목]마다 키워드 '{keyword}' 관점의 세부 내용을 순수한 JSON 으로만 작성해줘.
+            키는 대제목의 자식 식별자(AAA = AA1~AA6, BBB = BB1~BB6 ...)를 사용하고,
+            1: 한줄요약, 2~3: 성과목표, 4: 소제목, 5: 추진배경, 6: 추진방향 순서로 채워줘.
+            예시: {{"AA1": "한줄요약", "AA2": "성과목표", "AA3": "성과목표", "AA4": "소제목", "AA5": "추진배경", "AA6": "추진방향"}}
+            """,
+        ]
+
+    plan.add("세부내용", build_details, depends_on=["대제목"], handle=lambda text: _insert_json(text, marker_map))
+    plan.add("주요성과", lambda results: [
+        *context.search([f"{context.year - 1}년 주요 성과", "성과 달성 실적", "추진 결과 성과 확립"], k=8),
+        *context.hint(PAIR_DIGIT, where=lambda marker: marker[1] == "C" and marker[0] != "C"),
+        f"""
+        참고 자료를 종합해서 {context.year - 1}년의 주요 성과를 순수한 JSON 으로만 정리해줘 (음슴체).
+        키는 AC1, AC2 ... AC9, BC1 ... BC9, DC1 ... 순서로 사용하고, 홀수 번째는 성과 제목, 짝수 번째는 요약이야.
+        예시: {{"AC1": "성과 제목", "AC2": "요약"}}
+        """,
+    ], handle=lambda text: _insert_json(text, marker_map))
+    plan.add("특수시책", lambda results: [
+        *context.search([f"{context.year}년 핵심과제", f"{context.year}년 특수시책", "신규 시책 추진 계획"], k=8),
+        *context.hint(LETTER_DIGIT),
+        f"""
+        참고 자료를 종합해서 {context.year}년도 핵심과제와 특수시책 제목을 순수한 JSON 으로만 적어줘 (음슴체).
+        키는 핵심과제 J1, J2 ..., 특수시책 H1, H2 ... 를 사용해줘.
+        예시: {{"J1": "핵심과제 제목", "H1": "특수시책 제목"}}
+        """,
+    ], handle=lambda text: _insert_json(text, marker_map))
+
+
+PROFILES = {
+    "foreword": PromptProfile("foreword", _build_foreword,
+                              {f"{char}{char}": "" for char in string.ascii_uppercase}, ()),
+    "speech": PromptProfile("speech", _build_speech, {"#": ""},
+                            tuple(f"{char}{num}" for char in string.ascii_uppercase for num in range(1, 10))),
+    "workplan": PromptProfile("workplan", _build_workplan, {}, ()),
+}
+
+
+#------------------------------------------------------------------------------
+# 일괄 실행
+#------------------------------------------------------------------------------
+
+class BatchRunner:
+    """작업 목록을 제한된 동시성으로 실행하고, 끝난 작업을 상태 파일에 기록하는 실행기"""
+
+    def __init__(self, jobs, model_name=DEFAULT_MODEL, max_parallel=DEFAULT_MAX_PARALLEL, state_path=None,
+                 provider=None, response_cache=None, force=False, log=print):
+        self.jobs = jobs
+        self.max_parallel = max(1, int(max_parallel))
+        self.state = BatchState(state_path) if state_path else None
+        self.provider = provider if provider is not None else create_provider()
+        self.model = self.provider.model(model_name)
+        self.response_cache = response_cache if response_cache is not None else ResponseCache()
+        self.sources = SourceStore()
+        self.force = force
+        self.log = log
+
+    def _pending(self):
+        pending, results = [], []
+        for job in self.jobs:
+            fingerprint = job_fingerprint(job)
+            if not self.force and self.state is not None and self.state.is_done(job, fingerprint):
+                results.append(JobResult(job, "skipped", self.state.jobs[job.name]["output"], None, 0.0))
+                if self.log:
+                    self.log(f"  - [{job.name}] 이미 완료됨, 건너뜀")
+                continue
+            pending.append((job, fingerprint))
+        return pending, results
+
+    def _ask(self, task, prompt_parts):
+        priority = PRIORITY_HIGH if task.name == "대제목" else PRIORITY_NORMAL
+        response = self.response_cache.generate(self.model, prompt_parts, priority=priority)
+        try:
+            return response.text
+        except Exception:
+            return None
+
+    def _generate(self, job):
+        """생성 계획을 실행해 (마커 맵, 템플릿 색인) 을 반환하는 함수 (작업 스레드)"""
+        profile = PROFILES[job.profile]
+        template_index = load_template_index(job.template, log=None)
+        context = JobContext(job, self.sources, template_index)
+        marker_map = dict(profile.defaults)
+        plan = GenerationPlan()
+        profile.build(plan, context, marker_map)
+        log = (lambda line: self.log(f"  [{job.name}]{line[3:] if line.startswith('  -') else line}")) if self.log else None
+        plan.run(self._ask, log=log)
+        if plan.errors:
+            raise RuntimeError("; ".join(f"{name}: {error}" for name, error in plan.errors.items()))
+        date_map = {'YEAR': str(context.year), 'YDDY': str(context.year - 1),
+                    'YYYY': str(context.year), 'YYYD': str(context.year - 1)}
+        for marker, value in date_map.items():
+            marker_map.setdefault(marker, value)
+        return marker_map, template_index
+
+    def run(self):
+        """모든 작업을 실행하고 JobResult 목록을 반환하는 함수"""
+        pending, results = self._pending()
+        if not pending:
+            return results
+
+        if self.log:
+            self.log(f"\n참고 자료 추출 (작업 {len(pending)}개 공용)...")
+        self.sources.load([source for job, _ in pending for source in job.sources], log=self.log)
+
+        if self.log:
+            self.log(f"\n작업 {len(pending)}개를 최대 {self.max_parallel}개씩 동시에 생성합니다...")
+        with ThreadPoolExecutor(max_workers=self.max_parallel) as executor:
+            futures = {executor.submit(self._timed_generate, job): (job, fingerprint) for job, fingerprint in pending}
+            # 문서 저장은 이 스레드에서 (한/글 COM 객체는 만든 스레드에서만 사용)
+            for future in as_completed(futures):
+                job, fingerprint = futures[future]
+                result = self._write(job, *future.result())
+                results.append(result)
+                if self.state is not None:
+                    self.state.record(result, fingerprint)
+        return results
+
+    def _timed_generate(self, job):
+        with span("batch.generate", job=job.name, profile=job.profile) as attrs:
+            started = datetime.datetime.now()
+            try:
+                marker_map, template_index = self._generate(job)
+            except Exception as e:
+                attrs["error"] = str(e)
+                return None, None, e, (datetime.datetime.now() - started).total_seconds()
+            return marker_map, template_index, None, (datetime.datetime.now() - started).total_seconds()
+
+    def _write(self, job, marker_map, template_index, error, seconds):
+        if error is not None:
+            if self.log:
+                self.log(f"  ✗ [{job.name}] 생성 실패: {error}")
+            return JobResult(job, "failed", "", str(error), seconds)
+        try:
+            with span("batch.write", job=job.name):
+                os.makedirs(os.path.dirname(os.path.abspath(job.output)), exist_ok=True)
+                output_path, counts = write_document(job.template, job.output, marker_map, log=None,
+                                                     index=template_index, erase=PROFILES[job.profile].erase)
+        except Exception as e:
+            if self.log:
+                self.log(f"  ✗ [{job.name}] 문서 저장 실패: {e}")
+            return JobResult(job, "failed", "", str(e), seconds)
+        if self.log:
+            self.log(f"  ✓ [{job.name}] 저장: {output_path} ({sum(counts.values())}개 마커 치환, {seconds:.1f}초)")
+        return JobResult(job, "done", output_path, None, seconds)
+
+
+def format_results(results):
+    """실행 결과 요약 문자열 목록"""
+    counts = {}
+    for result in results:
+        counts[result.status] = counts.get(result.status, 0) + 1
+    lines = [f"\n일괄 생성 결과: 완료 {counts.get('done', 0)}건, 건너뜀 {counts.get('skipped', 0)}건, "
+             f"실패 {counts.get('failed', 0)}건"]
+    for result in results:
+        if result.status == "failed":
+            lines.append(f"  - ✗ {result.job.name}: {result.error}")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="작업 목록(YAML/JSON)으로 여러 문서를 한 번에 생성합니다.")
+    parser.add_argument("manifest", help="작업 목록 파일 (.yaml/.yml/.json)")
+    parser.add_argument("--max-parallel", type=int, help="동시에 생성할 작업 수 (기본: 작업 목록의 max_parallel 또는 3)")
+    parser.add_argument("--state", help=f"이어하기 상태 파일 (기본: <작업 목록>{STATE_SUFFIX})")
+    parser.add_argument("--force", action="store_true", help="이미 끝난 작업도 다시 생성")
+    parser.add_argument("--only", action="append", help="이 이름의 작업만 실행 (여러 번 지정 가능)")
+    parser.add_argument("--dry-run", action="store_true", help="실행할 작업 목록만 출력")
+    args = parser.parse_args(argv)
+
+    settings, jobs = load_manifest(args.manifest)
+    if args.only:
+        jobs = [job for job in jobs if job.name in args.only]
+    if args.dry_run:
+        for job in jobs:
+            print(f"- {job.name} [{job.profile}] {job.template or '(새 문서)'} → {job.output} (참고 PDF {len(job.sources)}개)")
+        return 0
+
+    runner = BatchRunner(
+        jobs,
+        model_name=settings.get("model", DEFAULT_MODEL),
+        max_parallel=args.max_parallel or settings.get("max_parallel", DEFAULT_MAX_PARALLEL),
+        state_path=args.state or args.manifest + STATE_SUFFIX,
+        provider=create_provider(settings.get("provider")),
+        force=args.force,
+    )
+    try:
+        results = runner.run()
+    finally:
+        export_requested()
+    for line in format_results(results):
+        print(line)
+    print(default_limiter().summary())
+    return 1 if any(result.status == "failed" for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
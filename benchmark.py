@@ -0,0 +1,346 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from collections import namedtuple
+
+from context_packer import pack_context
+from hwpx_writer import HwpxSectionWriter
+from llm_cache import ResponseCache
+from llm_provider import LocalProvider
+from pdf_extract import PdfTextCache, iter_pdf_pages
+from pipeline import Pipeline, upload_sources
+from retrieval_index import RetrievalIndex
+from section_stream import LETTER_PAIR_MARKERS, SectionParser
+from template_index import load_template_index
+from tracing import export_requested, get_tracer
+from upload_manifest import LocalFilesApi, ReusableUploader, UploadManifest
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+#==============================================================================
+# 문서 생성 파이프라인 벤치마크
+#   - 합성 PDF(페이지 수 지정) → 텍스트 추출 → 검색 인덱스·참고 자료 구성 →
+#     업로드(가짜 파일 API) → 생성(로컬 가짜 LLM, 스트리밍) → HWPX 작성 순서로
+#     실제 모듈을 그대로 실행하고, 단계별 시간·처리량·최대 메모리를 잰다.
+#   - 네트워크와 한/글 없이 동작하며 결과를 JSON 으로 저장하므로,
+#     커밋 사이의 결과를 --compare 로 비교해 성능 저하를 찾을 수 있다.
+#
+#   사용 예) python benchmark.py --pdfs 4 --pages 30 --documents 10 --output bench.json
+#           python benchmark.py --compare bench.json
+#==============================================================================
+
+RESULT_VERSION = 1
+
+BenchmarkConfig = namedtuple("BenchmarkConfig", [
+    "pdfs", "pages", "documents", "sections", "latency", "chunk_delay", "concurrency",
+    "workers", "backend", "context_tokens", "seed",
+], defaults=[3, 20, 5, 10, 0.2, 0.005, 4, None, "hwpx", 30000, 0])
+
+# name: 단계 이름, seconds: 경과 시간, items: 처리 수, peak_memory_mb: 단계 중 파이썬 최대 할당량
+StageTiming = namedtuple("StageTiming", ["name", "seconds", "items", "peak_memory_mb"])
+
+_WORDS = [
+    "uljin", "county", "economy", "tourism", "budget", "hydrogen", "industry", "welfare", "agriculture",
+    "fishery", "culture", "safety", "health", "education", "energy", "transport", "housing", "youth",
+    "elderly", "forest", "ocean", "festival", "investment", "employment", "infrastructure", "plan",
+    "project", "support", "growth", "community", "environment", "innovation", "2025", "2026",
+]
+
+
+def _pdf_escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_synthetic_pdf(path, pages, seed=0, lines_per_page=40, words_per_line=12):
+    """영문 단어로 채운 pages 쪽짜리 PDF 를 만드는 함수 (외부 라이브러리 없이 직접 작성)"""
+    rng = random.Random(seed)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # 페이지 목록은 페이지 객체 번호가 정해진 뒤 채움
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for _ in range(pages):
+        lines = [" ".join(rng.choice(_WORDS) for _ in range(words_per_line)) + "." for _ in range(lines_per_page)]
+        stream = "BT /F1 9 Tf 40 800 Td 11 TL " + " ".join(f"({_pdf_escape(line)}) Tj T*" for line in lines) + " ET"
+        stream = stream.encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_id = len(objects)
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id)
+        page_ids.append(len(objects))
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids).encode("ascii")
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    data = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(data))
+        data += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(data)
+    data += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    data += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    data += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def write_synthetic_template(path, markers):
+    """마커가 한 문단씩 들어 있는 최소 HWPX 템플릿을 만드는 함수"""
+    paragraphs = "".join(f'<hp:p><hp:run><hp:t>{marker}</hp:t></hp:run></hp:p>' for marker in markers)
+    section = ('<?xml version="1.0" encoding="UTF-8"?>'
+               '<hs:sec xmlns:hs="http://www.hancom.co.kr/hwpml/2011/section" '
+               'xmlns:hp="http://www.hancom.co.kr/hwpml/2011/paragraph">' + paragraphs + '</hs:sec>')
+    with zipfile.ZipFile(path, "w") as zout:
+        zout.writestr(zipfile.ZipInfo("mimetype"), "application/hwp+zip")
+        zout.writestr("Contents/section0.xml", section, compress_type=zipfile.ZIP_DEFLATED)
+    return path
+
+
+def _foreword_markers(count):
+    return [chr(ord("A") + i) * 2 for i in range(min(count, 26))]
+
+
+class _StageRecorder:
+    """단계별 경과 시간과 파이썬 최대 할당량(tracemalloc)을 기록하는 도우미"""
+
+    def __init__(self, log):
+        self.stages = []
+        self.log = log
+
+    def run(self, name, func, items=None):
+        tracemalloc.reset_peak()
+        started = time.perf_counter()
+        result = func()
+        seconds = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        count = items(result) if callable(items) else items
+        self.stages.append(StageTiming(name, seconds, count, peak / 1024 / 1024))
+        if self.log:
+            self.log(f"  - {name}: {seconds:.2f}초" + (f" ({count}건)" if count is not None else ""))
+        return result
+
+
+def run_benchmark(config=BenchmarkConfig(), work_dir=None, log=print):
+    """설정대로 파이프라인 전체를 한 번 실행하고 결과 dict 를 반환하는 함수"""
+    own_dir = work_dir is None
+    work_dir = work_dir or tempfile.mkdtemp(prefix="docwriter_bench_")
+    markers = _foreword_markers(config.sections)
+    recorder = _StageRecorder(log)
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        # 1. 입력 합성 (측정 대상은 아니지만 기록)
+        def _synthesize():
+            paths = [write_synthetic_pdf(os.path.join(work_dir, f"source_{k:02d}.pdf"), config.pages, config.seed + k)
+                     for k in range(config.pdfs)]
+            template = write_synthetic_template(os.path.join(work_dir, "template.hwpx"), markers)
+            return paths, template
+
+        pdf_paths, template_path = recorder.run("synthesize", _synthesize, items=config.pdfs)
+
+        # 2. PDF 텍스트 추출 (빈 캐시에서 시작하는 첫 실행 기준)
+        cache = PdfTextCache(cache_dir=os.path.join(work_dir, "pdf_cache"))
+        pages = recorder.run("extract", lambda: [page for page in iter_pdf_pages(pdf_paths, cache=cache,
+                                                                                 max_workers=config.workers)
+                                                 if page.error is None], items=len)
+
+        # 3. 검색 인덱스 + 참고 자료 구성
+        def _index():
+            index = RetrievalIndex()
+            for page in pages:
+                index.add(page.cleaned, os.path.basename(page.path), page.page + 1)
+            return index
+
+        index = recorder.run("index", _index, items=lambda index: len(index))
+        documents = {}
+        for page in pages:
+            documents.setdefault(os.path.basename(page.path), []).append(page.cleaned)
+        packed = recorder.run("pack", lambda: pack_context([(title, " ".join(texts)) for title, texts in documents.items()],
+                                                           config.context_tokens), items=len(documents))
+
+        # 4. 업로드 + 처리 대기 (가짜 파일 API)
+        uploader = ReusableUploader(LocalFilesApi(), UploadManifest(path=None))
+        recorder.run("upload", lambda: upload_sources(pdf_paths, uploader, log=lambda message: None), items=len)
+
+        # 5. 생성(스트리밍) → 섹션 작성, 문서 여러 개를 파이프라인으로 동시에 처리
+        provider = LocalProvider(latency=config.latency, chunk_delay=config.chunk_delay, sections=config.sections,
+                                 seed=config.seed)
+        model = provider.model("foreword")
+        response_cache = ResponseCache(cache_dir=os.path.join(work_dir, "responses"))
+        output_dir = os.path.join(work_dir, "output")
+        os.makedirs(output_dir, exist_ok=True)
+        template_index = load_template_index(template_path, log=None)
+
+        def _generate(k):
+            passages = index.search_sections([f"{_WORDS[k % len(_WORDS)]} plan"], k=3)
+            prompt = [packed.text[:2000], *(passage.text for passage in passages),
+                      f"버전 {k}: 각 문장마다 파싱문자 ##AA,##BB,##CC... 를 부여"]
+            parser = SectionParser(LETTER_PAIR_MARKERS)
+            for chunk in response_cache.stream(model, prompt, bypass=True):
+                parser.feed(chunk)
+            parser.close()
+            return k, parser.sections
+
+        def _write(generated):
+            k, sections = generated
+            if config.backend != "hwpx":
+                return len(sections)
+            with HwpxSectionWriter(template_path, os.path.join(output_dir, f"document_{k:02d}.hwpx"), markers,
+                                   defaults={marker: "" for marker in markers}, log=None,
+                                   index=template_index) as writer:
+                for marker, content in sections.items():
+                    writer.add(marker, content)
+                writer.save()
+            return len(sections)
+
+        pipeline = Pipeline().add_stage("generate", _generate, workers=config.concurrency).add_stage("write", _write)
+        results = recorder.run("documents", lambda: pipeline.run(range(config.documents)), items=len)
+        failures = [result for result in results if result.error is not None]
+        total_seconds = time.perf_counter() - started
+    finally:
+        tracemalloc.stop()
+        if own_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    stages = {stage.name: stage._asdict() for stage in recorder.stages}
+    for name, (count, busy) in pipeline.stats.items():
+        stages[f"documents.{name}"] = {"name": f"documents.{name}", "seconds": busy, "items": count,
+                                       "peak_memory_mb": None}
+    extract_seconds = stages["extract"]["seconds"]
+    documents_seconds = stages["documents"]["seconds"]
+    return {
+        "version": RESULT_VERSION,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": config._asdict(),
+        "stages": stages,
+        "throughput": {
+            "pages_per_second": len(pages) / extract_seconds if extract_seconds else None,
+            "documents_per_minute": (config.documents - len(failures)) * 60 / documents_seconds if documents_seconds else None,
+        },
+        "failures": [f"{result.stage}: {result.error}" for result in failures],
+        "total_seconds": total_seconds,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _peak_rss_mb():
+    """프로세스 최대 상주 메모리(MB), 알 수 없으면 None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def format_result(result):
+    """결과 요약 문자열"""
+    lines = [f"벤치마크 결과 (commit {result['commit'] or '-'}, 총 {result['total_seconds']:.2f}초)"]
+    for stage in result["stages"].values():
+        memory = f", 최대 {stage['peak_memory_mb']:.1f}MB" if stage["peak_memory_mb"] is not None else ""
+        items = f", {stage['items']}건" if stage["items"] is not None else ""
+        lines.append(f"  {stage['name']:<20} {stage['seconds']:8.3f}초{items}{memory}")
+    throughput = result["throughput"]
+    if throughput["pages_per_second"] is not None:
+        lines.append(f"  추출 처리량: {throughput['pages_per_second']:.1f} 페이지/초")
+    if throughput["documents_per_minute"] is not None:
+        lines.append(f"  문서 처리량: {throughput['documents_per_minute']:.1f} 문서/분")
+    if result["peak_rss_mb"] is not None:
+        lines.append(f"  최대 상주 메모리: {result['peak_rss_mb']:.1f}MB")
+    if result["failures"]:
+        lines.append(f"  실패: {len(result['failures'])}건 - {result['failures'][0]}")
+    return "\n".join(lines)
+
+
+def compare_results(baseline, current, threshold=0.10):
+    """두 결과의 단계별 시간을 비교해 (요약 줄 목록, 느려진 단계 목록) 을 반환하는 함수
+
+    threshold 비율 이상 느려진 단계를 성능 저하로 본다.
+    """
+    lines = [f"비교: {baseline.get('commit') or '-'} → {current.get('commit') or '-'}"]
+    regressions = []
+    for name, stage in current["stages"].items():
+        before = baseline["stages"].get(name)
+        if not before or not before["seconds"]:
+            continue
+        change = stage["seconds"] / before["seconds"] - 1
+        flag = ""
+        if change >= threshold:
+            flag = "  ← 느려짐"
+            regressions.append(name)
+        lines.append(f"  {name:<20} {before['seconds']:8.3f}초 → {stage['seconds']:8.3f}초 ({change:+.0%}){flag}")
+    if baseline.get("config") != current.get("config"):
+        lines.append("  (주의: 두 결과의 설정이 다릅니다)")
+    return lines, regressions
+
+
+def main(argv=None):
+    defaults = BenchmarkConfig()
+    parser = argparse.ArgumentParser(description="문서 생성 파이프라인 벤치마크 (네트워크·한/글 없이 실행)")
+    parser.add_argument("--pdfs", type=int, default=defaults.pdfs, help="합성 PDF 수")
+    parser.add_argument("--pages", type=int, default=defaults.pages, help="PDF 당 페이지 수")
+    parser.add_argument("--documents", type=int, default=defaults.documents, help="생성할 문서 수")
+    parser.add_argument("--sections", type=int, default=defaults.sections, help="문서당 섹션(마커) 수")
+    parser.add_argument("--latency", type=float, default=defaults.latency, help="가짜 LLM 첫 응답 지연(초)")
+    parser.add_argument("--chunk-delay", type=float, default=defaults.chunk_delay, help="가짜 LLM 조각 간 지연(초)")
+    parser.add_argument("--concurrency", type=int, default=defaults.concurrency, help="동시 생성 요청 수")
+    parser.add_argument("--workers", type=int, default=defaults.workers, help="PDF 추출 프로세스 수")
+    parser.add_argument("--backend", choices=["hwpx", "none"], default=defaults.backend, help="문서 작성 방식")
+    parser.add_argument("--context-tokens", type=int, default=defaults.context_tokens, help="참고 자료 토큰 예산")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    parser.add_argument("--compare", help="비교할 이전 결과 JSON (느려진 단계가 있으면 종료 코드 1)")
+    parser.add_argument("--threshold", type=float, default=0.10, help="성능 저하로 볼 비율 (기본 0.10)")
+    parser.add_argument("--trace", metavar="PREFIX", help="단계별 span 을 PREFIX.jsonl, PREFIX.trace.json 으로 저장")
+    args = parser.parse_args(argv)
+    if args.trace:
+        get_tracer().enable()
+
+    config = BenchmarkConfig(args.pdfs, args.pages, args.documents, args.sections, args.latency, args.chunk_delay,
+                             args.concurrency, args.workers, args.backend, args.context_tokens, args.seed)
+    print("벤치마크를 실행합니다...")
+    result = run_benchmark(config)
+    print(format_result(result))
+    export_requested(prefix=args.trace)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"결과 저장: {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        lines, regressions = compare_results(baseline, result, args.threshold)
+        print("\n".join(lines))
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+import hashlib
+import os
+import re
+from collections import namedtuple
+
+#==============================================================================
+# 토큰 예산 기반 참고 자료 구성기
+#   - 문자 수로 앞에서부터 자르는 대신, 토큰 수를 로컬에서 추정하고
+#     문서(출처)별로 예산을 공평하게 나눈다. 짧은 문서가 다 쓰지 못한 예산은
+#     나머지 문서에 다시 나눠 준다.
+#   - 각 문서 안에서는 정보가 많은 조각부터 채우고, 출력은 원래 순서를 유지한다.
+#   - 문서 텍스트는 str 이나 len·슬라이싱을 지원하는 지연 텍스트(page_store.MappedText)이며,
+#     조각은 점수만 매기고 버린 뒤 고른 조각만 마지막에 다시 잘라 오므로 자료가 커져도
+#     한 번에 들고 있는 텍스트는 고른 조각 분량이다.
+#==============================================================================
+
+# doc: 문서 번호, index: 문서 안 조각 번호, start: 문서 안 시작 위치, tokens: 추정 토큰 수
+Chunk = namedtuple("Chunk", ["doc", "index", "start", "text", "tokens"])
+# text: 구성된 참고 자료, tokens: 추정 토큰 수, documents: [(제목, 사용 토큰, 전체 토큰)]
+PackedContext = namedtuple("PackedContext", ["text", "tokens", "documents"])
+
+DEFAULT_CHUNK_CHARS = 1500
+
+# 한글·한자·가나는 글자당 약 1토큰, 그 밖의 문자는 약 4글자당 1토큰으로 본다.
+_WIDE_CHAR_PATTERN = re.compile(r'[ᄀ-ᇿ぀-ヿ㄰-㆏一-鿿가-힣]')
+_SPACE_PATTERN = re.compile(r'\s')
+_WORD_PATTERN = re.compile(r'\w+')
+_SENTENCE_END_PATTERN = re.compile(r'[.!?。](?=\s)|\n')
+
+GAP_MARKER = "\n...(중략)...\n"
+
+
+def estimate_tokens(text):
+    """토크나이저 없이 토큰 수를 추정하는 함수 (한국어가 섞인 텍스트 기준, 약간 넉넉하게)"""
+    if not text:
+        return 0
+    wide = len(_WIDE_CHAR_PATTERN.findall(text))
+    spaces = len(_SPACE_PATTERN.findall(text))
+    other = len(text) - wide - spaces
+    return wide + (other + 3) // 4 + spaces // 8
+
+
+def iter_chunks(text, doc=0, target_chars=DEFAULT_CHUNK_CHARS):
+    """문장 경계를 우선해 약 target_chars 글자 단위 조각을 차례로 내보내는 함수"""
+    index = 0
+    start = 0
+    length = len(text)
+    while start < length:
+        end = min(length, start + target_chars)
+        if end < length:
+            # 조각 후반부의 마지막 문장 끝에서 자르고, 없으면 공백, 그래도 없으면 그대로 자른다.
+            window = text[start + target_chars // 2:end]
+            boundary = None
+            for match in _SENTENCE_END_PATTERN.finditer(window):
+                boundary = match.end()
+            if boundary is None:
+                space = window.rfind(' ')
+                boundary = space + 1 if space >= 0 else None
+            if boundary:
+                end = start + target_chars // 2 + boundary
+        piece = text[start:end]
+        if piece.strip():
+            yield Chunk(doc, index, start, piece, estimate_tokens(piece))
+            index += 1
+        start = end
+
+
+def split_chunks(text, doc=0, target_chars=DEFAULT_CHUNK_CHARS):
+    """문장 경계를 우선해 약 target_chars 글자 단위 조각 목록으로 나누는 함수"""
+    return list(iter_chunks(text, doc, target_chars))
+
+
+def density_score(chunk):
+    """조각의 정보량 점수 (서로 다른 단어 비율 + 숫자 포함 가산점)"""
+    words = _WORD_PATTERN.findall(chunk.text)
+    if not words:
+        return 0.0
+    distinct = len(set(words)) / len(words)
+    digits = sum(1 for word in words if any(ch.isdigit() for ch in word)) / len(words)
+    return distinct + 0.5 * digits
+
+
+def documents_from_corpus(corpus):
+    """TextCorpus 를 출처(파일)별 (제목, 텍스트) 목록으로 바꾸는 함수 (머리글 조각 제외)"""
+    texts = {}
+    for segment in corpus.segments:
+        if segment.source is not None:
+            texts.setdefault(segment.source, []).append(segment.text)
+    # 조각이 하나면(파일당 한 조각) 지연 텍스트를 그대로 넘겨 전체 문자열을 만들지 않는다
+    return [(os.path.basename(source), parts[0] if len(parts) == 1 else " ".join(str(part) for part in parts))
+            for source, parts in texts.items()]
+
+
+def fair_shares(needs, budget):
+    """문서별 필요량 needs 에 budget 을 공평하게 나누는 함수 (적게 필요한 문서의 남는 몫은 재분배)"""
+    shares = [0] * len(needs)
+    remaining = budget
+    order = sorted(range(len(needs)), key=lambda i: needs[i])
+    for k, i in enumerate(order):
+        share = remaining // (len(needs) - k)
+        shares[i] = min(needs[i], share)
+        remaining -= shares[i]
+    return shares
+
+
+def pack_context(documents, budget_tokens, score=density_score, chunk_chars=DEFAULT_CHUNK_CHARS):
+    """문서 목록을 토큰 예산 안에서 공평하게, 정보량이 큰 조각부터 채워 참고 자료를 만드는 함수
+
+    documents 는 (제목, 텍스트) 목록이다. score(chunk) 는 조각의 가치를 돌려주며,
+    질문 관련도 점수 등으로 바꿔 끼울 수 있다. 같은 내용의 조각은 한 번만 넣는다.
+    """
+    headers = [f"\n\n=== {title}의 내용 ===\n" for title, _ in documents]
+    available = max(0, budget_tokens - sum(estimate_tokens(h) for h in headers))
+
+    # 1. 조각을 차례로 훑으며 중복 조각을 지우고 점수 계산
+    # 조각 텍스트는 들고 있지 않고 (끝 위치만 남겨) 고른 조각만 4단계에서 다시 잘라 온다.
+    seen = set()
+    ranked = []
+    totals = []  # 문서별 (조각 수, 전체 토큰)
+    ends = {}
+    for doc, (_, text) in enumerate(documents):
+        unique = []
+        count = total = 0
+        for chunk in iter_chunks(text, doc, chunk_chars):
+            count += 1
+            total += chunk.tokens
+            key = hashlib.blake2b(" ".join(chunk.text.split()).encode('utf-8'), digest_size=16).digest()
+            if key in seen:
+                continue
+            seen.add(key)
+            ends[(doc, chunk.index)] = chunk.start + len(chunk.text)
+            unique.append((score(chunk), chunk._replace(text=None)))
+        unique.sort(key=lambda item: (-item[0], item[1].index))
+        ranked.append(unique)
+        totals.append((count, total))
+
+    # 2. 문서별 공평 배분 후 점수 순으로 채우기
+    needs = [sum(chunk.tokens for _, chunk in items) for items in ranked]
+    shares = fair_shares(needs, available)
+    selected = [[] for _ in documents]
+    used = [0] * len(documents)
+    leftovers = []
+    for doc, items in enumerate(ranked):
+        for value, chunk in items:
+            if used[doc] + chunk.tokens <= shares[doc]:
+                selected[doc].append(chunk)
+                used[doc] += chunk.tokens
+            else:
+                leftovers.append((value, chunk))
+
+    # 3. 조각 단위로 남은 예산은 전체에서 점수가 높은 조각에 다시 배정
+    spare = available - sum(used)
+    for value, chunk in sorted(leftovers, key=lambda item: -item[0]):
+        if chunk.tokens <= spare:
+            selected[chunk.doc].append(chunk)
+            used[chunk.doc] += chunk.tokens
+            spare -= chunk.tokens
+
+    # 4. 원래 순서대로 이어 붙이고, 빠진 부분에는 생략 표시
+    pieces = []
+    report = []
+    for doc, (title, text) in enumerate(documents):
+        chunks = sorted(selected[doc], key=lambda chunk: chunk.index)
+        count, total = totals[doc]
+        report.append((title, used[doc], total))
+        if not chunks:
+            continue
+        pieces.append(headers[doc])
+        previous = -1
+        for chunk in chunks:
+            if chunk.index != previous + 1:
+                pieces.append(GAP_MARKER)
+            pieces.append(text[chunk.start:ends[(doc, chunk.index)]])
+            previous = chunk.index
+        if chunks[-1].index != count - 1:
+            pieces.append(GAP_MARKER)
+    text = "".join(pieces)
+    return PackedContext(text, estimate_tokens(text), report)
+
+
+def format_pack_report(packed):
+    """문서별 사용 토큰을 보여 주는 요약 문자열 목록"""
+    lines = [f"참고 자료 {packed.tokens:,} 토큰 (추정)"]
+    for title, used, total in packed.documents:
+        ratio = used / total * 100 if total else 100.0
+        lines.append(f"  - {title}: {used:,}/{total:,} 토큰 ({ratio:.0f}%)")
+    return lines
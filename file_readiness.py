@@ -0,0 +1,160 @@
+import queue
+import random
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from tracing import get_tracer
+
+#==============================================================================
+# 업로드 파일 처리 완료 추적기
+#   - 처리 중(PROCESSING)인 파일 전체를 백그라운드 스레드에서 동시에 조회한다.
+#   - 파일마다 지터가 섞인 지수 백오프로 다음 조회 시각을 정하고,
+#     ACTIVE/FAILED 가 되는 즉시 이벤트로 알려 준다.
+#   - 업로드가 진행되는 동안 events() 를 읽으면 처리 결과를 업로드 완료를 기다리지 않고 받을 수 있다.
+#==============================================================================
+
+ACTIVE = "ACTIVE"
+FAILED = "FAILED"
+TIMEOUT = "TIMEOUT"
+
+# file: 마지막으로 조회한 파일 객체, state: ACTIVE/FAILED/TIMEOUT, elapsed: 추적 시작 후 경과 시간(초)
+FileEvent = namedtuple("FileEvent", ["file", "state", "elapsed"])
+
+
+class ReadinessTracker:
+    """여러 업로드 파일의 처리 상태를 동시에 조회하는 추적기
+
+    업로드가 끝나는 대로 add() 하고, 더 추가할 파일이 없으면 close() 한다.
+    events() 는 파일이 준비되거나 실패하는 순서대로 FileEvent 를 내보낸다.
+    """
+
+    def __init__(self, files_api, files=(), max_wait_time=300, base_delay=2.0, max_delay=30.0,
+                 jitter=0.5, max_workers=8):
+        self.files_api = files_api
+        self.max_wait_time = max_wait_time
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.max_workers = max_workers
+
+        self._cond = threading.Condition()
+        self._order = []
+        self._files = {}
+        self._states = {}
+        self._pending = {}  # 이름 → [추적 시작 시각, 다음 조회 시각, 조회 횟수]
+        self._closed = False
+        self._events = queue.Queue()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        for file in files:
+            self.add(file)
+
+    def _delay(self, attempt):
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _resolve(self, name, file, state, elapsed):
+        # self._cond 를 잡은 상태에서 호출한다.
+        if file is not None:
+            self._files[name] = file
+        self._states[name] = state
+        polls = self._pending.pop(name, [None, None, 0])[2]
+        get_tracer().record("upload.processing", get_tracer().now() - elapsed, lane="readiness",
+                            file=getattr(self._files.get(name), "display_name", name), state=state, attempt=polls)
+        self._events.put(FileEvent(self._files[name], state, elapsed))
+        self._cond.notify_all()
+
+    def add(self, file):
+        """추적할 파일을 추가하는 함수 (이미 ACTIVE/FAILED 이면 바로 이벤트 발생)"""
+        now = time.monotonic()
+        with self._cond:
+            if file.name in self._files:
+                return
+            self._order.append(file.name)
+            self._files[file.name] = file
+            state = file.state.name
+            if state in (ACTIVE, FAILED):
+                self._resolve(file.name, file, state, 0.0)
+            else:
+                self._pending[file.name] = [now, now + self._delay(0), 0]
+        self._wakeup.set()
+
+    def close(self):
+        """더 이상 추가할 파일이 없음을 알리는 함수"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._wakeup.set()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+
+    def _poll(self, name):
+        try:
+            return name, self.files_api.get(name)
+        except Exception:
+            # 일시적인 조회 실패는 처리 중으로 보고 다음 백오프 때 다시 조회한다.
+            return name, None
+
+    def _run(self):
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while not self._stop.is_set():
+                self._wakeup.clear()
+                with self._cond:
+                    now = time.monotonic()
+                    for name, (started, _, _) in list(self._pending.items()):
+                        if now - started > self.max_wait_time:
+                            self._resolve(name, None, TIMEOUT, now - started)
+                    if self._closed and not self._pending:
+                        break
+                    due = [name for name, (_, next_poll, _) in self._pending.items() if next_poll <= now]
+                    wake_at = min((min(next_poll, started + self.max_wait_time)
+                                   for started, next_poll, _ in self._pending.values()), default=None)
+
+                if not due:
+                    self._wakeup.wait(None if wake_at is None else max(0.0, wake_at - time.monotonic()))
+                    continue
+
+                for name, file in pool.map(self._poll, due):
+                    with self._cond:
+                        if name not in self._pending:
+                            continue
+                        started, _, attempt = self._pending[name]
+                        now = time.monotonic()
+                        state = file.state.name if file is not None else None
+                        if state in (ACTIVE, FAILED):
+                            self._resolve(name, file, state, now - started)
+                        else:
+                            if file is not None:
+                                self._files[name] = file
+                            self._pending[name] = [started, now + self._delay(attempt + 1), attempt + 1]
+        self._events.put(None)
+
+    def events(self):
+        """파일이 준비·실패·시간 초과되는 순서대로 FileEvent 를 내보내는 함수 (close() 후 종료)"""
+        self.start()
+        while True:
+            event = self._events.get()
+            if event is None:
+                return
+            yield event
+
+    def ready_files(self, names=None):
+        """지금까지 ACTIVE 가 된 파일 목록 (추가한 순서)"""
+        with self._cond:
+            order = self._order if names is None else [n for n in self._order if n in names]
+            return [self._files[n] for n in order if self._states.get(n) == ACTIVE]
+
+    def state(self, name):
+        with self._cond:
+            return self._states.get(getattr(name, "name", name))
@@ -0,0 +1,116 @@
+import asyncio
+import time
+from collections import namedtuple
+
+from tracing import get_tracer
+
+#==============================================================================
+# 섹션 단위 생성 계획 (의존 관계 DAG)
+#   - 하나의 채팅 세션에 질문을 차례로 보내면 요청마다 늘어난 대화 기록과
+#     첨부 파일 전체를 다시 보내게 되어 뒤로 갈수록 느리고 비싸진다.
+#   - 섹션(질문)마다 필요한 최소 문맥만 담은 독립 요청으로 나누고, 앞 답변이
+#     꼭 필요한 섹션만 의존 관계로 잇는다. 의존 관계가 없는 섹션은 동시에 요청한다.
+#==============================================================================
+
+# name: 섹션 이름, build(results): 요청 내용을 만드는 함수 (끝난 섹션의 응답 dict 를 받음),
+# depends_on: 먼저 끝나야 하는 섹션 이름들, handle(text): 응답 처리 함수
+PlanTask = namedtuple("PlanTask", ["name", "build", "depends_on", "handle"])
+
+DEFAULT_MAX_PARALLEL = 4
+
+
+class GenerationPlan:
+    """섹션 요청들의 의존 관계를 보고, 준비된 섹션부터 동시에 요청하는 계획
+
+    요청(ask)만 스레드에서 실행하고 build/handle 은 run 을 호출한 스레드에서 실행하므로,
+    handle 에서 한/글 COM 객체를 그대로 사용할 수 있다.
+    """
+
+    def __init__(self):
+        self.tasks = {}
+        self.errors = {}
+        self.timings = {}  # 섹션 이름 → (요청 시작, 끝) 경과 시간(초)
+
+    def add(self, name, build, depends_on=(), handle=None):
+        if name in self.tasks:
+            raise ValueError(f"'{name}' 섹션이 이미 있습니다.")
+        self.tasks[name] = PlanTask(name, build, tuple(depends_on), handle)
+        return self
+
+    def order(self):
+        """의존 관계를 지키는 실행 순서 (없는 섹션을 참조하거나 순환이 있으면 ValueError)"""
+        for task in self.tasks.values():
+            missing = [dep for dep in task.depends_on if dep not in self.tasks]
+            if missing:
+                raise ValueError(f"'{task.name}' 섹션이 없는 섹션에 의존합니다: {', '.join(missing)}")
+        ordered = []
+        state = {}  # 1: 방문 중, 2: 완료
+
+        def _visit(name, path):
+            if state.get(name) == 2:
+                return
+            if state.get(name) == 1:
+                raise ValueError(f"섹션 의존 관계에 순환이 있습니다: {' → '.join(path + [name])}")
+            state[name] = 1
+            for dep in self.tasks[name].depends_on:
+                _visit(dep, path + [name])
+            state[name] = 2
+            ordered.append(name)
+
+        for name in self.tasks:
+            _visit(name, [])
+        return ordered
+
+    async def run_async(self, ask, max_parallel=DEFAULT_MAX_PARALLEL, log=print):
+        self.order()
+        results = {}
+        self.errors = {}
+        done = {name: asyncio.Event() for name in self.tasks}
+        semaphore = asyncio.Semaphore(max_parallel)
+        started = time.monotonic()
+        tracer = get_tracer()
+
+        async def _run(task):
+            try:
+                for dep in task.depends_on:
+                    await done[dep].wait()
+                failed = [dep for dep in task.depends_on if dep in self.errors]
+                if failed:
+                    raise RuntimeError(f"선행 섹션 실패로 건너뜀: {', '.join(failed)}")
+                prompt_parts = task.build(results)
+                async with semaphore:
+                    begin = time.monotonic() - started
+                    if log:
+                        log(f"  - [{task.name}] 요청 시작 ({begin:.1f}초)")
+                    span_start = tracer.now()
+                    try:
+                        text = await asyncio.to_thread(ask, task, prompt_parts)
+                    except Exception as e:
+                        tracer.record("llm.section", span_start, error=e, lane=f"section-{task.name}", marker=task.name)
+                        raise
+                    end = time.monotonic() - started
+                tracer.record("llm.section", span_start, lane=f"section-{task.name}", marker=task.name,
+                              chars=len(text or ""))
+                self.timings[task.name] = (begin, end)
+                if log:
+                    log(f"  - [{task.name}] 응답 완료 ({end:.1f}초, {end - begin:.1f}초 소요)")
+                results[task.name] = text
+                if text and task.handle:
+                    task.handle(text)
+            except Exception as e:
+                self.errors[task.name] = e
+                if log:
+                    log(f"  - [{task.name}] 실패: {e}")
+            finally:
+                done[task.name].set()
+
+        await asyncio.gather(*(_run(task) for task in self.tasks.values()))
+        return results
+
+    def run(self, ask, max_parallel=DEFAULT_MAX_PARALLEL, log=print):
+        """ask(task, prompt_parts) 로 모든 섹션을 요청하고 {섹션 이름: 응답 텍스트} 를 반환하는 함수
+
+        ask 가 None 을 반환하면(차단 등) 해당 섹션 결과는 None 이고 의존 섹션은 그대로 진행한다.
+        예외가 난 섹션은 errors 에 남고, 그 섹션에 의존하는 섹션은 건너뛴다.
+        """
+        return asyncio.run(self.run_async(ask, max_parallel, log))
@@ -1,16 +1,16 @@
 import sys
 import os
-import re
 import datetime
 import time
 import string
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import groupby
+import multiprocessing
 
 # --- GUI 라이브러리 ---
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QLabel, QLineEdit, QTextEdit, QFileDialog,
-    QListWidget, QListWidgetItem, QGroupBox, QMessageBox, QProgressBar
+    QListWidget, QListWidgetItem, QGroupBox, QMessageBox, QProgressBar, QCheckBox
 )
 from PyQt6.QtCore import QThread, QObject, pyqtSignal, Qt
 from PyQt6.QtGui import QIcon, QFont
@@ -19,43 +19,97 @@ from PyQt6.QtGui import QIcon, QFont
 import pyhwpx
 import google.generativeai as genai
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
-import PyPDF2
 from dotenv import load_dotenv
 
+from marker_replace import replace_markers_with_hwp, sweep_residual_markers
+from hwpx_writer import is_hwpx, hwpx_output_path, render_hwpx
+from render_pool import LogBuffer, render_variations
+from pdf_extract import iter_pdf_pages, load_document_text
+from text_corpus import TextCorpus
+from upload_manifest import ReusableUploader
+from pipeline import prepare_sources, upload_sources
+from context_packer import documents_from_corpus, format_pack_report, pack_context
+from llm_cache import ResponseCache
+from llm_provider import create_provider
+from rate_limiter import default_limiter, is_rate_limit_error
+from tracing import export_requested
+from marker_grammar import PAIR, TITLE, parse_markers
+from section_stream import LETTER_PAIR_MARKERS, SectionParser
+
 #==============================================================================
 # 기존 스크립트의 핵심 로직 (Worker 스레드에서 호출될 함수들)
 #==============================================================================
 
-def combine_pdf_texts(pdf_files_paths, worker_signal):
-    """여러 PDF 파일의 텍스트를 효율적으로 합치는 함수"""
-    combined_text = ""
+def combine_pdf_texts(pdf_files_paths, worker_signal, progress_signal=None):
+    """여러 PDF 파일의 텍스트를 효율적으로 합치는 함수 (프로세스 풀에서 페이지 단위 병렬 추출)"""
+    combined_text = TextCorpus()
+    existing_paths = []
     for file_path in pdf_files_paths:
         if not os.path.exists(file_path):
             worker_signal.emit(f"   - 경고: '{os.path.basename(file_path)}' 파일을 찾을 수 없어 건너뜁니다.")
             continue
+        existing_paths.append(file_path)
+
+    # 파일 내용 해시 기반 캐시 + 프로세스 풀 추출: 결과는 파일·페이지 순서대로 들어온다
+    total_files = len(existing_paths)
+    for file_index, (file_path, pages) in enumerate(groupby(iter_pdf_pages(existing_paths), key=lambda p: p.path)):
         worker_signal.emit(f"   - 텍스트 추출 중: {os.path.basename(file_path)}")
-        try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                raw_text = "".join(page.extract_text() + "\n" for page in pdf_reader.pages if page.extract_text())
-                
-                if not raw_text.strip():
-                    worker_signal.emit(f"   - 경고: '{os.path.basename(file_path)}'에서 텍스트를 추출할 수 없습니다.")
-                    continue
-
-                cleaned_text = re.sub(r'[^\w\s가-힣.,!?;:\'"""''·()\[\]{} -]', ' ', raw_text)
-                cleaned_text = re.sub(r'\s+', ' ', cleaned_text).strip()
-                
-                combined_text += f"\n\n=== {os.path.basename(file_path)}의 내용 ===\n{cleaned_text}"
-                worker_signal.emit(f"   - 완료: {len(cleaned_text):,} 문자")
-        except Exception as e:
-            worker_signal.emit(f"   - 오류: '{os.path.basename(file_path)}' 처리 중 오류 발생: {e}")
-    
+        texts = []
+        cached = True
+        error = None
+        digest = None
+        for page in pages:
+            if page.error is not None:
+                error = page.error
+                break
+            cached = cached and page.cached
+            digest = page.sha256
+            # 캐시에서 읽은 페이지는 모으지 않는다 (파일 전체 텍스트는 아래에서 페이지 파일로 가져옴)
+            if page.cleaned and not page.cached:
+                texts.append(page.cleaned)
+            if progress_signal:
+                progress_signal.emit(int((file_index + (page.page + 1) / page.page_count) / total_files * 100))
+
+        if error is not None:
+            worker_signal.emit(f"   - 오류: '{os.path.basename(file_path)}' 처리 중 오류 발생: {error}")
+            continue
+
+        # 캐시의 페이지 파일을 mmap 으로 이어 쓰고, 문자열로 합치는 것은 캐시 저장에 실패했을 때뿐
+        cleaned_text = load_document_text(digest) or " ".join(texts)
+        if not cleaned_text:
+            worker_signal.emit(f"   - 경고: '{os.path.basename(file_path)}'에서 텍스트를 추출할 수 없습니다.")
+            continue
+
+        combined_text.append(f"\n\n=== {os.path.basename(file_path)}의 내용 ===\n")
+        combined_text.append(cleaned_text, source=file_path)
+        worker_signal.emit(f"   - 완료: {len(cleaned_text):,} 문자{' (캐시)' if cached else ''}")
+
     worker_signal.emit(f"\n통합 및 정제된 텍스트 총 길이: {len(combined_text):,} 문자")
     return combined_text
 
 def create_hwp_document_with_foreword(template_path, foreword_text, output_path, version_num, worker_signal):
     """발간사가 포함된 한글 문서를 생성하는 함수"""
+    sections = parse_markers(foreword_text, families=(TITLE, PAIR))
+    for problem in sections.problems():
+        worker_signal.emit(f"   - 경고: {version_num}번째 발간사 {problem}")
+    title_map = sections.titles()
+    possible_markers = [f"{char}{char}" for char in string.ascii_uppercase]
+
+    # HWPX 템플릿은 한/글 실행 없이 직접 작성 (잔여 마커는 빈 문자열로 치환)
+    if is_hwpx(template_path):
+        try:
+            output_path = hwpx_output_path(output_path)
+            marker_map = {marker: "" for marker in possible_markers}
+            marker_map.update(title_map)
+            worker_signal.emit(f"\n   - HWPX 파일에 {version_num}번째 답변 직접 삽입 중...")
+            counts = render_hwpx(template_path, output_path, marker_map)
+            for marker in title_map:
+                if counts.get(marker):
+                    worker_signal.emit(f"     ✓ '{marker}' 위치에 '{title_map[marker][:20]}...' 삽입 완료.")
+            return True, f"성공적으로 저장됨: {output_path}"
+        except Exception as e:
+            return False, f"오류 발생: {e}"
+
     hwp = None
     try:
         hwp = pyhwpx.Hwp(visible=False)
@@ -67,24 +121,14 @@ def create_hwp_document_with_foreword(template_path, foreword_text, output_path,
             worker_signal.emit("   - 새 문서 생성")
         
         hwp.MoveDocBegin()
-        
-        sections = re.split(r'##\s*([A-Z]{2,})', foreword_text)
-        content_map = {sections[i].strip(): sections[i+1].strip() for i in range(1, len(sections), 2)}
 
         worker_signal.emit(f"\n   - HWPX 파일에 {version_num}번째 답변 삽입 중...")
-        for marker, full_content in content_map.items():
-            title_only = full_content.split('\n')[0].strip()
-            hwp.MoveDocBegin()
-            if hwp.find(marker, direction='AllDoc'):
-                hwp.insert_text(title_only)
-                worker_signal.emit(f"     ✓ '{marker}' 위치에 '{title_only[:20]}...' 삽입 완료.")
+        counts = replace_markers_with_hwp(hwp, title_map, log=None)
+        for marker in counts:
+            worker_signal.emit(f"     ✓ '{marker}' 위치에 '{title_map[marker][:20]}...' 삽입 완료.")
         
         worker_signal.emit("   - 문서 내 잔여 파싱 마커 제거 중...")
-        hwp.MoveDocBegin()
-        possible_markers = [f"{char}{char}" for char in string.ascii_uppercase]
-        for marker in possible_markers:
-            while hwp.find(marker, direction='AllDoc'):
-                hwp.Delete()
+        sweep_residual_markers(hwp, possible_markers, log=lambda line: worker_signal.emit(f"   {line}"))
         
         hwp.SaveAs(output_path)
         return True, f"성공적으로 저장됨: {output_path}"
@@ -97,6 +141,12 @@ def create_hwp_document_with_foreword(template_path, foreword_text, output_path,
             except:
                 pass
 
+def render_foreword_document(template_path, foreword_text, output_path, version_num):
+    """작성기 프로세스에서 문서를 만들고 로그를 함께 반환하는 함수"""
+    log = LogBuffer()
+    success, message = create_hwp_document_with_foreword(template_path, foreword_text, output_path, version_num, log)
+    return success, message, log.lines
+
 #==============================================================================
 # PyQt6 Worker 클래스 (백그라운드 작업 처리)
 #==============================================================================
@@ -110,6 +160,11 @@ class Worker(QObject):
         super().__init__()
         self.settings = settings
         self.uploaded_files = []
+        self.active_files = []
+        # LLM 제공자 (환경 변수 LLM_PROVIDER=local 이면 네트워크 없이 가짜 응답으로 실행)
+        self.provider = create_provider()
+        self.uploader = ReusableUploader(files_api=self.provider)
+        self.response_cache = ResponseCache()
 
     def run(self):
         try:
@@ -122,53 +177,20 @@ class Worker(QObject):
             self._cleanup()
 
     def _cleanup(self):
-        if self.uploaded_files:
+        export_requested(log=self.progress.emit)
+        if self.uploaded_files and not self.settings.get('delete_uploaded_files'):
+            self.progress.emit(f"\n업로드된 파일 {len(self.uploaded_files)}개를 다음 실행에서 재사용하도록 유지합니다.")
+        elif self.uploaded_files:
             self.progress.emit("\n프로그램 정리 작업 시작...")
             self.progress.emit("업로드된 임시 파일들을 삭제합니다...")
             for file in self.uploaded_files:
                 try:
-                    genai.delete_file(file.name)
+                    self.uploader.delete(file)
                     self.progress.emit(f"   ✓ 삭제: {file.display_name}")
                 except Exception as e:
                     self.progress.emit(f"   ✗ 삭제 실패: {file.display_name} - {e}")
         self.finished.emit(self.settings['output_dir'])
     
-    def _upload_file_concurrently(self, file_path):
-        """단일 파일을 Gemini API에 업로드하고 결과를 반환하는 함수 (스레드에서 실행)"""
-        if not os.path.exists(file_path):
-            self.progress.emit(f"   - 경고: '{os.path.basename(file_path)}' 파일을 찾을 수 없어 건너뜁니다.")
-            return None
-        file_size = os.path.getsize(file_path)
-        if file_size > 200 * 1024 * 1024:
-            self.progress.emit(f"   - 경고: '{os.path.basename(file_path)}' 파일 크기가 200MB를 초과하여 건너뜁니다.")
-            return None
-        self.progress.emit(f"   - 업로드 시작: {os.path.basename(file_path)}")
-        try:
-            file_response = genai.upload_file(path=file_path)
-            self.progress.emit(f"   - 업로드 완료: {file_response.display_name}")
-            return file_response
-        except Exception as e:
-            self.progress.emit(f"   - 업로드 실패: {os.path.basename(file_path)} - {e}")
-            return None
-
-    def _wait_for_file_processing(self, uploaded_files_responses):
-        """업로드된 파일들의 처리 완료를 대기하는 함수"""
-        for file in uploaded_files_responses:
-            start_time = time.time()
-            while file.state.name == "PROCESSING":
-                elapsed = time.time() - start_time
-                if elapsed > 300:
-                    self.progress.emit(f"   - {file.display_name} 처리 시간 초과")
-                    break
-                self.progress.emit(f"   - {file.display_name} 처리 중... 5초 대기 (경과: {elapsed:.0f}초)")
-                time.sleep(5)
-                file = genai.get_file(file.name)
-            
-            if file.state.name == "FAILED":
-                self.progress.emit(f"   - 경고: {file.display_name} 처리 실패")
-            elif file.state.name == "ACTIVE":
-                self.progress.emit(f"   - {file.display_name} 처리 완료")
-
     def _execute_main_logic(self):
         """메인 실행 함수"""
         settings = self.settings
@@ -179,30 +201,27 @@ class Worker(QObject):
         self.progress.emit(f"결과 저장 경로: {settings['output_dir']}")
         self.progress.emit("=" * 60)
         
-        # 1. 텍스트 추출 그룹 처리
-        combined_pdf_text = ""
-        if settings['text_extract_paths']:
+        # 1·2. 텍스트 추출과 파일 업로드를 동시에 진행 (로컬 CPU 작업과 네트워크 대기를 겹침)
+        def extract_group():
             self.progress.emit("\nPDF에서 텍스트를 추출합니다...")
-            combined_pdf_text = combine_pdf_texts(settings['text_extract_paths'], self.progress)
+            return combine_pdf_texts(settings['text_extract_paths'], self.progress, self.progress_bar)
 
-        # 2. 파일 업로드 그룹 처리
-        if settings['file_upload_paths']:
+        def upload_group():
             self.progress.emit("\nPDF 파일을 AI에 직접 업로드합니다 (병렬 처리)...")
-            with ThreadPoolExecutor(max_workers=10) as executor:
-                future_to_file = {executor.submit(self._upload_file_concurrently, fp): fp for fp in settings['file_upload_paths']}
-                for future in as_completed(future_to_file):
-                    file_response = future.result()
-                    if file_response:
-                        self.uploaded_files.append(file_response)
-            
-            if self.uploaded_files:
-                self._wait_for_file_processing(self.uploaded_files)
-                self.progress.emit(f"\n총 {len(self.uploaded_files)}개 파일 업로드 완료")
+            return upload_sources(settings['file_upload_paths'], self.uploader, uploaded=self.uploaded_files,
+                                  log=self.progress.emit, indent="   ")
+
+        combined_pdf_text, uploaded_active = prepare_sources(
+            extract=extract_group if settings['text_extract_paths'] else None,
+            upload=upload_group if settings['file_upload_paths'] else None,
+        )
+        combined_pdf_text = combined_pdf_text or ""
+        self.active_files = uploaded_active or []
 
         # 3. 모델 초기화
         self.progress.emit("\nAI 모델을 초기화합니다...")
         try:
-            model = genai.GenerativeModel(
+            model = self.provider.model(
                 'gemini-1.5-flash', 
                 safety_settings={
                     HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
@@ -223,22 +242,28 @@ class Worker(QObject):
         foreword_variations = settings['foreword_variations']
         fallback_forewords = settings['fallback_forewords']
 
+        # 토큰 예산 안에서 문서별로 공평하게, 정보량이 큰 부분부터 참고 자료 구성
         summarized_text = ""
         if combined_pdf_text:
-            summarized_text = combined_pdf_text[:1000000] 
+            # 설정값이 모델의 분당 토큰 한도(TPM)를 넘지 않도록 한도 비율 이하로 줄인다
+            budget = default_limiter().context_budget(model, settings['context_token_budget'])
+            packed = pack_context(documents_from_corpus(combined_pdf_text), budget)
+            summarized_text = packed.text
+            for line in format_pack_report(packed):
+                self.progress.emit(f"   {line}")
         
         total_steps = len(foreword_variations)
-        for i, variation in enumerate(foreword_variations, 1):
+
+        def generate_foreword(i, variation):
+            """한 버전의 발간사를 생성하고 문서 작성 인자를 반환하는 함수 (생성 스레드에서 실행)"""
             self.progress.emit(f"\n[{i}/{total_steps}] '{variation['focus']}' 발간사 생성 중...")
-            self.progress_bar.emit(int((i / total_steps) * 100))
             
             max_retries = 3
-            success = False
             for retry_count in range(max_retries):
                 try:
                     prompt_parts = []
                     if i == 1 and retry_count == 0:
-                        if self.uploaded_files: prompt_parts.extend(self.uploaded_files)
+                        if self.active_files: prompt_parts.extend(self.active_files)
                         if summarized_text: prompt_parts.append(f"[참고 자료 요약]\n{summarized_text}")
                     
                     prompt_text = f"""
@@ -253,43 +278,64 @@ class Worker(QObject):
                     """
                     prompt_parts.append(prompt_text)
                     
-                    response = model.generate_content(prompt_parts)
+                    # 입력(프롬프트·첨부 파일·설정)이 같으면 캐시된 응답을 사용. 재시도는 항상 새로 생성
+                    response_stream = self.response_cache.stream(
+                        model, prompt_parts,
+                        bypass=settings['bypass_response_cache'] or retry_count > 0,
+                        attachment_hash=self.uploader.digest_for,
+                    )
+                    if response_stream.cached:
+                        self.progress.emit(f"   - [{i}] 캐시된 응답 사용 (입력 변경 없음)")
+
+                    # 응답을 받는 동안 완성된 문장(섹션)부터 로그 창에 바로 표시
+                    parser = SectionParser(LETTER_PAIR_MARKERS)
+                    for chunk in response_stream:
+                        for marker, content in parser.feed(chunk):
+                            self.progress.emit(f"     [{i}] ##{marker} {content}")
+                    for marker, content in parser.close():
+                        self.progress.emit(f"     [{i}] ##{marker} {content}")
                     
-                    if response and hasattr(response, 'text') and len(response.text.strip()) > 200:
-                        foreword_text = response.text.strip()
-                        self.progress.emit(f"   ✓ AI 발간사 생성 완료 ({len(foreword_text)}자)")
+                    if len(parser.text.strip()) > 200:
+                        foreword_text = parser.text.strip()
+                        self.progress.emit(f"   ✓ [{i}] AI 발간사 생성 완료 ({len(foreword_text)}자)")
                         
                         template_path = settings['template_paths'][i-1] if i <= len(settings['template_paths']) else ""
                         output_filename = f"발간사_{i:02d}_{variation['focus'].replace(' ', '_')}.hwpx"
-                        output_path = os.path.join(settings['output_dir'], output_filename)
-                        
-                        success, message = create_hwp_document_with_foreword(template_path, foreword_text, output_path, i, self.progress)
-                        if success:
-                            self.progress.emit(f"   ✓ 한글 파일 생성: {output_filename}")
-                        else:
-                            self.progress.emit(f"   ✗ 한글 파일 생성 실패: {message}")
-                        success = True
-                        break
+                        return template_path, foreword_text, os.path.join(settings['output_dir'], output_filename), i
                     else:
-                        self.progress.emit(f"   ✗ 생성된 내용이 짧거나 유효하지 않음. 재시도 {retry_count+1}/{max_retries}")
+                        self.progress.emit(f"   ✗ [{i}] 생성된 내용이 짧거나 유효하지 않음. 재시도 {retry_count+1}/{max_retries}")
                 except Exception as e:
-                    self.progress.emit(f"   ✗ API 오류 발생: {str(e)[:100]}. 재시도 {retry_count+1}/{max_retries}")
-                    time.sleep(5)
+                    self.progress.emit(f"   ✗ [{i}] API 오류 발생: {str(e)[:100]}. 재시도 {retry_count+1}/{max_retries}")
+                    # 한도 초과(429)는 요청 스케줄러가 Retry-After 만큼 기다려 이미 재시도했다
+                    if not is_rate_limit_error(e):
+                        time.sleep(5)
             
-            if not success:
-                self.progress.emit(f"   ✗ 최종 실패. 하드코딩된 기본 발간사를 사용합니다.")
-                template_foreword = fallback_forewords[i-1]
-                
-                template_path = settings['template_paths'][i-1] if i <= len(settings['template_paths']) else ""
-                output_filename = f"발간사_{i:02d}_{variation['focus'].replace(' ', '_')}_기본.hwpx"
-                output_path = os.path.join(settings['output_dir'], output_filename)
-
-                success, message = create_hwp_document_with_foreword(template_path, template_foreword, output_path, i, self.progress)
-                if success:
-                    self.progress.emit(f"   ✓ 기본 템플릿 파일 생성: {output_filename}")
-
-            if i < total_steps:
-                time.sleep(2) # 다음 요청 전 잠시 대기
+            self.progress.emit(f"   ✗ [{i}] 최종 실패. 하드코딩된 기본 발간사를 사용합니다.")
+            template_path = settings['template_paths'][i-1] if i <= len(settings['template_paths']) else ""
+            output_filename = f"발간사_{i:02d}_{variation['focus'].replace(' ', '_')}_기본.hwpx"
+            return template_path, fallback_forewords[i-1], os.path.join(settings['output_dir'], output_filename), i
+
+        completed = []
+
+        def report_document(i, result, error):
+            """작성기 프로세스의 로그와 결과를 GUI 로그로 전달하는 함수"""
+            completed.append(i)
+            self.progress_bar.emit(int((len(completed) / total_steps) * 100))
+            if error:
+                self.progress.emit(f"   ✗ [{i}] 한글 파일 생성 실패: {error}")
+                return
+            success, message, log_lines = result
+            for line in log_lines:
+                self.progress.emit(line)
+            if success:
+                self.progress.emit(f"   ✓ [{i}] 한글 파일 생성: {message}")
+            else:
+                self.progress.emit(f"   ✗ [{i}] 한글 파일 생성 실패: {message}")
+
+        # 모든 버전을 동시에 생성하고, 끝나는 대로 작성기 풀(프로세스)에서 문서 작성
+        render_variations(foreword_variations, generate_foreword, render_foreword_document,
+                          on_result=report_document)
+        self.progress.emit(f"   - {default_limiter().summary()}")
         
         self.progress_bar.emit(100)
 
@@ -380,6 +426,10 @@ class MainApp(QMainWindow):
         upload_btn_layout.addWidget(add_upload_btn)
         upload_btn_layout.addWidget(remove_upload_btn)
         upload_layout.addLayout(upload_btn_layout)
+        self.delete_uploads_checkbox = QCheckBox("종료 시 업로드 파일 삭제 (해제하면 다음 실행에서 재사용)")
+        upload_layout.addWidget(self.delete_uploads_checkbox)
+        self.bypass_cache_checkbox = QCheckBox("AI 응답 캐시 사용 안 함 (항상 새로 생성)")
+        upload_layout.addWidget(self.bypass_cache_checkbox)
         files_layout.addLayout(upload_layout)
         
         files_group.setLayout(files_layout)
@@ -459,6 +509,9 @@ class MainApp(QMainWindow):
             'template_paths': [os.path.join(template_dir, f"template{i}.hwpx") for i in range(1, 6)],
             'text_extract_paths': [self.text_extract_list.item(i).text() for i in range(self.text_extract_list.count())],
             'file_upload_paths': [self.file_upload_list.item(i).text() for i in range(self.file_upload_list.count())],
+            'delete_uploaded_files': self.delete_uploads_checkbox.isChecked(),
+            'context_token_budget': 800000,
+            'bypass_response_cache': self.bypass_cache_checkbox.isChecked(),
             'output_dir': os.path.join(template_dir, f"발간사_결과_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}"),
             'foreword_variations': [
                 {"focus": "경제 발전 중심", "tone": "역동적이고 진취적인 어조", "emphasis": "울진군의 미래 성장 동력과 경제 발전 전략"},
@@ -505,6 +558,8 @@ class MainApp(QMainWindow):
         self.thread.start()
 
 if __name__ == "__main__":
+    # 작성기 프로세스 풀을 pyinstaller 실행 파일에서도 사용할 수 있도록 설정
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     main_window = MainApp()
     main_window.show()
@@ -1,14 +1,7 @@
 import sys
 import os
-import re
 import datetime
-import json
 import traceback
-import time
-import pyhwpx
-import anthropic
-import google.generativeai as genai
-from google.generativeai.types import HarmCategory, HarmBlockThreshold
 
 from PyQt5.QtWidgets import (QApplication, QWidget, QVBoxLayout, QHBoxLayout, 
                              QLabel, QLineEdit, QPushButton, QTextEdit, 
@@ -17,9 +10,7 @@ from PyQt5.QtCore import QThread, pyqtSignal
 
 # 필수 라이브러리가 없을 경우를 대비한 안내
 try:
-    import google.generativeai as genai
     from google.generativeai.types import HarmCategory, HarmBlockThreshold
-    import pyhwpx
 except ImportError:
     print("="*60)
     print("필수 라이브러리가 설치되지 않았습니다.")
@@ -28,6 +19,17 @@ except ImportError:
     print("="*60)
     sys.exit()
 
+# 저장소 루트의 공용 모듈을 사용하기 위해 상위 폴더를 경로에 추가
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from hwpx_writer import write_document
+from pipeline import PromptStep, run_prompt_steps, start_uploads
+from upload_manifest import ReusableUploader
+from rate_limiter import default_limiter, estimate_request_tokens
+from llm_provider import create_provider
+from marker_grammar import TITLE, extract_json, parse_markers
+from tracing import export_requested
+from template_index import load_template_index
+
 # -----------------------------------------------------------------------------
 # 백그라운드에서 모든 자동화 작업을 처리하는 스레드 클래스
 # -----------------------------------------------------------------------------
@@ -43,31 +45,26 @@ class DocumentProcessor(QThread):
         self.pdf_paths = pdf_paths
 
     def run(self):
-        hwp = None
-        
-        hwp = pyhwpx.Hwp()
+        # 마커→내용 맵을 모아 두었다가 마지막에 한 번에 문서에 반영
+        marker_map = {}
         try:
 
-            genai.configure(api_key=self.api_key)
-            
-            # --- HWP 파일 열기 ---
-            if not os.path.exists(self.hwp_path):
-                hwp.SaveAs(self.hwp_path)
-            hwp.Open(self.hwp_path)
+            # LLM 제공자 (환경 변수 LLM_PROVIDER=local 이면 네트워크 없이 가짜 응답으로 실행)
+            provider = create_provider(api_key=self.api_key)
 
-            # --- PDF 파일 업로드 ---
+            # --- PDF 파일 업로드 (백그라운드 동시 업로드 + 처리 대기, 공용 파이프라인 단계) ---
+            # 모델 초기화·프롬프트 준비는 업로드와 겹쳐 진행하고, 첫 요청만 첨부 파일 준비를 기다린다
             self.progress_update.emit("PDF 파일 업로드를 시작합니다...", 10)
-            uploaded_files = []
-            num_pdfs = len(self.pdf_paths)
-            for i, file_path in enumerate(self.pdf_paths):
-                progress = 10 + int((i / num_pdfs) * 15)
-                self.progress_update.emit(f"  - 업로드 중: {os.path.basename(file_path)}", progress)
-                file_response = genai.upload_file(path=file_path)
-                uploaded_files.append(file_response)
-            self.progress_update.emit("PDF 파일 업로드 완료.", 25)
+            uploads = start_uploads(self.pdf_paths, ReusableUploader(files_api=provider),
+                                    log=lambda message: self.progress_update.emit(message, 15))
+
+            def first_request():
+                attached = uploads.wait(self.pdf_paths)
+                self.progress_update.emit("PDF 파일 업로드 완료.", 30)
+                return [*attached, first_prompt]
 
             # --- 모델 및 채팅 초기화 ---
-            model = genai.GenerativeModel('gemini-2.5-flash', safety_settings={
+            model = provider.model('gemini-2.5-flash', safety_settings={
                 HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
                 HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
                 HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
@@ -78,46 +75,26 @@ class DocumentProcessor(QThread):
             # --- 헬퍼 함수 정의 ---
             def process_text_response(ai_text, progress_start):
                 self.progress_update.emit("AI 답변(대제목) 파싱 및 삽입 중...", progress_start)
-                sections = re.split(r'##\s*([A-Z]{3,})', ai_text)
-                if len(sections) > 1:
-                    for i in range(1, len(sections), 2):
-                        marker = sections[i].strip()
-                        full_content = sections[i+1].strip()
-                        title_only = full_content.split('\n')[0].strip()
-                        hwp.MoveDocBegin()
-                        while hwp.find(marker):
-                            hwp.insert_text(title_only)
-                            time.sleep(0.1)
+                sections = parse_markers(ai_text, families=(TITLE,))
+                for problem in sections.problems():
+                    self.progress_update.emit(f"  - 경고: {problem}", progress_start)
+                marker_map.update(sections.titles())
             
             def process_json_response(ai_text, progress_start):
                 self.progress_update.emit("AI 답변 파싱 및 삽입 중...", progress_start)
-                json_match = re.search(r'\{.*\}', ai_text, re.DOTALL)
-                if json_match:
-                    try:
-                        json_data = json.loads(json_match.group(0))
-                        for marker, content in json_data.items():
-                            if isinstance(content, str):
-                                hwp.MoveDocBegin()
-                                while hwp.find(marker):
-                                    hwp.insert_text(content)
-                                    time.sleep(0.1)
-
-                    except json.JSONDecodeError:
-                        self.progress_update.emit("  - JSON 파싱 오류 발생. 이 단계는 건너뜁니다.", progress_start)
+                json_data = extract_json(ai_text)
+                if json_data is None:
+                    self.progress_update.emit(f"  - JSON 파싱 오류. 이 단계는 건너뜁니다. ({ai_text[:30]}...)", progress_start)
+                    return
+                marker_map.update({marker: content for marker, content in json_data.items() if isinstance(content, str)})
+
             # --- 5. 연도 자동 변경 ---
             self.progress_update.emit("연도를 변경합니다...", 95)
             this_year = datetime.date.today().year
 
-            hwp.MoveDocBegin();
-            while hwp.find('YEAR'):
-                hwp.insert_text(str(this_year + 1))
-
-            hwp.MoveDocBegin();
-            while hwp.find('YDDY'):
-                hwp.insert_text(str(this_year))
+            marker_map.update({'YEAR': str(this_year + 1), 'YDDY': str(this_year)})
 
             # --- 대제목 생성 ---
-            self.progress_update.emit("AI에게 대제목 생성 요청", 30)
             first_prompt =  f"""
                             PDF 내용을 참고하여 중복되는 업무 계획의 대제목을 생성해줘.
                             아래 [식별자 목록] 각각에 가장 적절한 제목을 한 줄로 할당해줘.
@@ -127,11 +104,8 @@ class DocumentProcessor(QThread):
                             [식별자 목록]
                             AAA, BBB, CCC, DDD, EEE, FFF, GGG, HHH, III, JJJ, KKK, LLL, ... 같은 규칙으로 순차적으로 늘어나도록 
                             """
-            response = chat.send_message([*uploaded_files, first_prompt])
-            if response.parts: process_text_response(response.text, 40)
-            
+
             # --- 2. 세부내용 생성 ---
-            self.progress_update.emit("AI에게 세부내용 생성 요청", 50)
             second_prompt = f"""
                             업로드 한 PDF 파일과 이전 답변을 바탕으로, '{self.keyword}' 키워드에 맞게 주제가 무너지지 않는 선에서 조화를 이루도록 세부 내용을 작성 해줘.
 
@@ -208,11 +182,7 @@ class DocumentProcessor(QThread):
                             ``` 이형식 잘 유지해줘
                             """ 
 
-            response = chat.send_message(second_prompt)
-            if response.parts: process_json_response(response.text, 60)
-
             # --- 3. 주요 성과 생성 ---
-            self.progress_update.emit("AI에게 주요 성과 생성 요청", 70)
             third_prompt =   f"""
                             지금까지의 PDF 내용을 종합해서, **2025년의 주요 성과**를 정리해줘.
 
@@ -255,12 +225,8 @@ class DocumentProcessor(QThread):
                             }} 이형식 잘 유지해줘
                             ```
                             """
-            
-            response = chat.send_message(third_prompt)
-            if response.parts: process_json_response(response.text, 80)
-            
+
             # --- 4. 특수시책/핵심과제 생성 ---
-            self.progress_update.emit("AI에게 특수시책/핵심과제 생성 요청", 85)
             fourth_prompt = f"""
                             지금까지의 PDF 내용을 종합해서, 2026년도에 할만한 특수시책이랑 핵심과제에 대해 제시해줘
 
@@ -279,8 +245,25 @@ class DocumentProcessor(QThread):
                             }} 이형식 잘 유지해줘
                             ```
                             """
-            response = chat.send_message(fourth_prompt)
-            if response.parts: process_json_response(response.text, 90)
+
+            # --- 요청은 대화 순서대로 하나씩, 응답 파싱은 다음 요청과 겹쳐서 진행 ---
+            steps = [
+                PromptStep("AI에게 대제목 생성 요청", 30, first_request, process_text_response, 40),
+                PromptStep("AI에게 세부내용 생성 요청", 50, second_prompt, process_json_response, 60),
+                PromptStep("AI에게 주요 성과 생성 요청", 70, third_prompt, process_json_response, 80),
+                PromptStep("AI에게 특수시책/핵심과제 생성 요청", 85, fourth_prompt, process_json_response, 90),
+            ]
+
+            def ask_gemini(step):
+                # 대화 기록도 함께 전송되므로 토큰 추정에 포함 (실제 사용량은 응답 usage 로 보정)
+                response = default_limiter().call(model.model_name, lambda: chat.send_message(step.prompt),
+                                                  tokens=estimate_request_tokens([*chat.history, step.prompt]))
+                return response.text if response.parts else None
+
+            try:
+                run_prompt_steps(steps, ask_gemini, on_progress=self.progress_update.emit)
+            finally:
+                uploads.result()
 
             self.finished.emit(f"모든 작업이 완료되었습니다!\n결과 파일: {self.hwp_path}")
 
@@ -297,8 +280,10 @@ class DocumentProcessor(QThread):
                 output_path = f"{base}_결과 ({counter}){ext}"
                 counter += 1
             
-            hwp.save_as(output_path)
-            # hwp.Quit()
+            # 모아 둔 내용을 한 번에 반영 (.hwpx 는 한/글 실행 없이 직접 저장)
+            write_document(self.hwp_path, output_path, marker_map, log=None,
+                           index=load_template_index(self.hwp_path, log=None))
+            export_requested(log=lambda message: self.progress_update.emit(message, 100))
 
 # -----------------------------------------------------------------------------
 # PyQT5 메인 GUI 애플리케이션 클래스
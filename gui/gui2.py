@@ -1,28 +1,25 @@
 import sys
 import os
-import re
 import datetime
-import json
 import traceback
-import time
 
 from PyQt5.QtWidgets import (QApplication, QWidget, QVBoxLayout, QHBoxLayout, 
                              QLabel, QLineEdit, QPushButton, QTextEdit, 
                              QProgressBar, QFileDialog, QGroupBox, QComboBox)
 from PyQt5.QtCore import QThread, pyqtSignal
 
-# 필수 라이브러리가 없을 경우를 대비한 안내
-try:
-    import anthropic
-    from pypdf import PdfReader
-    import pyhwpx
-except ImportError:
-    print("="*60)
-    print("필수 라이브러리가 설치되지 않았습니다.")
-    print("터미널(명령 프롬프트)에 아래 명령어를 입력하여 설치해주세요.")
-    print("pip install PyQt5 anthropic pypdf pyhwpx")
-    print("="*60)
-    sys.exit()
+# 저장소 루트의 공용 모듈을 사용하기 위해 상위 폴더를 경로에 추가
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from hwpx_writer import write_document
+from pdf_extract import load_pdf_pages
+from retrieval_index import RetrievalIndex, format_passages
+from pipeline import PromptStep, run_prompt_steps
+from section_stream import TITLE_MARKERS, parse_sections
+from rate_limiter import default_limiter, estimate_request_tokens
+from llm_provider import create_provider
+from marker_grammar import TITLE, extract_json, parse_markers
+from tracing import export_requested
+from template_index import load_template_index
 
 # -----------------------------------------------------------------------------
 # 백그라운드에서 모든 자동화 작업을 처리하는 스레드 클래스
@@ -40,28 +37,22 @@ class DocumentProcessor(QThread):
         self.model_name = model_name
 
     def run(self):
-        hwp = None
+        # 마커→내용 맵을 모아 두었다가 마지막에 한 번에 문서에 반영
+        marker_map = {}
         try:
-            hwp = pyhwpx.Hwp()
-            self.progress_update.emit("한/글 프로그램을 시작합니다...", 5)
-            
-            client = anthropic.Anthropic(api_key=self.api_key)
-
-            if not os.path.exists(self.hwp_path):
-                hwp.SaveAs(self.hwp_path)
-            hwp.Open(self.hwp_path)
+            # LLM 제공자 (기본 Claude, 환경 변수 LLM_PROVIDER=local 이면 네트워크 없이 가짜 응답으로 실행)
+            provider = create_provider(os.getenv("LLM_PROVIDER", "claude"), api_key=self.api_key)
+            model = provider.model(self.model_name)
 
             self.progress_update.emit("PDF 파일에서 텍스트를 추출합니다...", 10)
-            pdf_context = ""
+            # 페이지 단위 검색 인덱스: 요청마다 관련도가 높은 조각만 첨부한다
+            pdf_index = RetrievalIndex()
             num_pdfs = len(self.pdf_paths)
             for i, file_path in enumerate(self.pdf_paths):
                 progress = 10 + int((i / num_pdfs) * 15)
                 self.progress_update.emit(f"  - 처리 중: {os.path.basename(file_path)}", progress)
                 try:
-                    reader = PdfReader(file_path)
-                    for page in reader.pages:
-                        if page.extract_text():
-                            pdf_context += page.extract_text() + "\n\n"
+                    pdf_index.add_pages(os.path.basename(file_path), load_pdf_pages(file_path).cleaned)
                 except Exception as e:
                     self.progress_update.emit(f"  - '{os.path.basename(file_path)}' 처리 오류: {e}", progress)
             self.progress_update.emit("PDF 텍스트 추출 완료.", 25)
@@ -71,75 +62,74 @@ class DocumentProcessor(QThread):
             # --- 헬퍼 함수 정의 ---
             def process_text_response(ai_text, progress_start):
                 self.progress_update.emit("AI 답변(대제목) 파싱 및 삽입 중...", progress_start)
-                sections = re.split(r'##\s*([A-Z]{3,})', ai_text)
-                if len(sections) > 1:
-                    for i in range(1, len(sections), 2):
-                        marker = sections[i].strip()
-                        full_content = sections[i+1].strip()
-                        title_only = full_content.split('\n')[0].strip()
-                        hwp.MoveDocBegin()
-                        while hwp.find(marker):
-                            hwp.insert_text(title_only)
-                            time.sleep(0.1)
+                sections = parse_markers(ai_text, families=(TITLE,))
+                for problem in sections.problems():
+                    self.progress_update.emit(f"  - 경고: {problem}", progress_start)
+                marker_map.update(sections.titles())
             
             def process_json_response(ai_text, progress_start):
                 self.progress_update.emit("AI 답변(JSON) 파싱 및 삽입 중...", progress_start)
-                json_match = re.search(r'\{.*\}', ai_text, re.DOTALL)
-                if json_match:
-                    try:
-                        json_data = json.loads(json_match.group(0))
-                        for marker, content in json_data.items():
-                            if isinstance(content, str):
-                                hwp.MoveDocBegin()
-                                while hwp.find(marker):
-                                    hwp.insert_text(content)
-                                    time.sleep(0.1)
-                    except json.JSONDecodeError:
-                        self.progress_update.emit(f"  - JSON 파싱 오류. ({ai_text[:30]}...)", progress_start)
-
-            def ask_claude(prompt_text, progress_start):
+                json_data = extract_json(ai_text)
+                if json_data is None:
+                    self.progress_update.emit(f"  - JSON 파싱 오류. 이 단계는 건너뜁니다. ({ai_text[:30]}...)", progress_start)
+                    return
+                marker_map.update({marker: content for marker, content in json_data.items() if isinstance(content, str)})
+
+            def ask_claude(prompt_text, progress_start, queries=None, k=5):
                 self.progress_update.emit(f"{progress_start}%. AI에게 요청 전송...", progress_start)
                 
-                if not conversation_history:
-                    user_content = f"### 참고 문서:\n{pdf_context}\n\n### 첫 번째 요청:\n{prompt_text}"
+                # 요청(섹션)별 질의로 찾은 상위 k개 조각만 참고 문서로 첨부
+                passages = pdf_index.search_sections(queries or [prompt_text], k=k)
+                if passages:
+                    user_content = f"### 참고 문서:\n{format_passages(passages)}\n\n### 요청:\n{prompt_text}"
                 else:
                     user_content = prompt_text
                 
                 conversation_history.append({"role": "user", "content": user_content})
 
-                response = client.messages.create(
-                    model=self.model_name,
-                    max_tokens=4096,
-                    messages=conversation_history
+                # 모델별 분당 요청·토큰 한도에 맞춰 보내고, 한도 초과 시 Retry-After 만큼 기다려 다시 보냄
+                response = default_limiter().call(
+                    model.model_name,
+                    lambda: model.generate_content(conversation_history, generation_config={"max_output_tokens": 4096}),
+                    tokens=estimate_request_tokens(conversation_history),
                 )
-                ai_text = response.content[0].text
+                ai_text = response.text
                 conversation_history.append({"role": "assistant", "content": ai_text})
                 return ai_text
 
             # --- 다단계 AI 요청 수행 ---
+            # 요청은 대화 순서대로 하나씩, 응답 파싱은 다음 요청과 겹쳐서 진행 (공용 파이프라인)
+            def title_queries():
+                # 대제목마다 추진배경·성과목표·추진방향 관련 조각만 검색
+                # (파싱 단계와 겹쳐 실행되므로 대제목은 직전 응답에서 바로 읽는다)
+                titles = [content.split('\n')[0].strip()
+                          for _, content in parse_sections(conversation_history[-1]["content"], TITLE_MARKERS)]
+                queries = [f"{self.keyword} {title} {aspect}" for title in titles for aspect in ("추진배경", "성과목표", "추진방향")]
+                return queries or [self.keyword]
+
             first_prompt = f"참고 문서를 바탕으로 중복되는 업무 계획의 대제목을 생성해줘. 반드시 '## 식별자 제목' 형식으로만 답변하고, 식별자는 AAA, BBB 순서로 사용해줘."
-            ai_response = ask_claude(first_prompt, 30)
-            process_text_response(ai_response, 40)
-            
             second_prompt = f"이전 답변과 참고 문서를 바탕으로, '{self.keyword}' 키워드에 맞는 세부 내용을 순수한 JSON 형식으로만 작성해줘. 키는 이전 답변의 대제목에 맞춰 AA1, AA2, BB1... 형식을 사용해줘."
-            ai_response = ask_claude(second_prompt, 50)
-            process_json_response(ai_response, 60)
-
             third_prompt = "지금까지의 대화와 참고 문서를 종합해서, 2025년의 주요 성과를 순수한 JSON 형식으로만 정리해줘. 키는 AC1, AC2... 형식을 사용해줘."
-            ai_response = ask_claude(third_prompt, 70)
-            process_json_response(ai_response, 80)
-            
             fourth_prompt = "지금까지의 대화와 참고 문서를 종합해서, 2026년도 특수시책과 핵심과제를 순수한 JSON 형식으로만 제시해줘. 키는 J1(핵심과제), H1(특수시책) 형식을 사용해줘."
-            ai_response = ask_claude(fourth_prompt, 85)
-            process_json_response(ai_response, 90)
+
+            # prompt: (요청, 검색 질의 목록 또는 질의를 만드는 함수, 질의당 조각 수)
+            steps = [
+                PromptStep(None, 30, (first_prompt, [f"{self.keyword} 주요 업무 계획", "중점 추진 사업 계획", "주요 사업 추진 방향"], 10), process_text_response, 40),
+                PromptStep(None, 50, (second_prompt, title_queries, 3), process_json_response, 60),
+                PromptStep(None, 70, (third_prompt, ["2025년 주요 성과", "성과 달성 실적", "추진 결과 성과 확립"], 8), process_json_response, 80),
+                PromptStep(None, 85, (fourth_prompt, ["2026년 핵심과제", "2026년 특수시책", "신규 시책 추진 계획"], 8), process_json_response, 90),
+            ]
+
+            def ask_step(step):
+                prompt_text, queries, k = step.prompt
+                return ask_claude(prompt_text, step.progress, queries() if callable(queries) else queries, k=k)
+
+            run_prompt_steps(steps, ask_step)
 
             # --- 연도 자동 변경 ---
             self.progress_update.emit("5. 연도를 자동으로 변경합니다...", 95)
             this_year = datetime.date.today().year
-            hwp.MoveDocBegin();
-            while hwp.find('YEAR'): hwp.insert_text(str(this_year + 1))
-            hwp.MoveDocBegin();
-            while hwp.find('YDDY'): hwp.insert_text(str(this_year))
+            marker_map.update({'YEAR': str(this_year + 1), 'YDDY': str(this_year)})
 
             # --- 결과 파일 저장 (파일명 중복 방지) ---
             base, ext = os.path.splitext(self.hwp_path)
@@ -149,7 +139,9 @@ class DocumentProcessor(QThread):
                 output_path = f"{base}_결과 ({counter}){ext}"
                 counter += 1
             
-            hwp.save_as(output_path)
+            # 모아 둔 내용을 한 번에 반영 (.hwpx 는 한/글 실행 없이 직접 저장)
+            output_path, _ = write_document(self.hwp_path, output_path, marker_map, log=None,
+                                            index=load_template_index(self.hwp_path, log=None))
             self.progress_update.emit(f"결과 파일 저장 완료: {os.path.basename(output_path)}", 100)
             
             self.finished.emit(f"모든 작업이 완료되었습니다!\n결과 파일: {output_path}")
@@ -158,8 +150,7 @@ class DocumentProcessor(QThread):
             error_message = f"오류 발생:\n{traceback.format_exc()}"
             self.finished.emit(error_message)
         finally:
-            if hwp and hwp.api:
-                hwp.Quit()
+            export_requested(log=lambda message: self.progress_update.emit(message, 100))
 
 # -----------------------------------------------------------------------------
 # PyQT5 메인 GUI 애플리케이션 클래스
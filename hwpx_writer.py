@@ -0,0 +1,450 @@
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+from bisect import bisect_right
+from collections import namedtuple
+from xml.sax.saxutils import escape
+
+from marker_grammar import is_placeholder
+from marker_replace import (MarkerMatcher, erase_marker_line, iter_markers_in_xml, replace_markers_in_xml,
+                            replace_markers_with_hwp, sweep_residual_markers)
+from tracing import span
+
+#==============================================================================
+# HWPX(OWPML) 직접 작성기
+#   - .hwpx 템플릿은 zip 패키지이므로 한/글 프로그램 없이 Contents/section*.xml 만
+#     열어서 마커를 치환하고 새 패키지로 저장한다.
+#   - 리눅스 서버 등 한/글이 없는 환경에서도 동작한다.
+#   - 스트리밍 생성용 섹션 작성기(open_section_writer)는 생성 중에 섹션을
+#     하나씩 받아 넣고, 생성이 끝나면 바로 저장한다.
+#   - erase 로 준 마커는 끝까지 값을 받지 못하면 마커가 든 문단째 지운다
+#     (.hwp 경로에서 마커 줄을 DeleteLine 으로 지우는 것과 같은 결과).
+#==============================================================================
+
+SECTION_PATTERN = re.compile(r'^Contents/section\d+\.xml$')
+
+_XML_TOKEN_PATTERN = re.compile(r'<[^>]*>|[^<]+')
+_TAG_NAME_PATTERN = re.compile(r'</?([\w:]+)')
+# 지워도 되는 '글자만 있는 문단' 에 나올 수 있는 요소 (표·그림·구역 설정 등이 있으면 지우지 않음)
+_LINE_TAGS = {"hp:p", "hp:run", "hp:t", "hp:linesegarray", "hp:lineseg"}
+
+# markers: 문단에 있는 지울 수 있는 마커, pieces: 문단 XML 을 나눈 조각 (HwpxSectionWriter._compile)
+_Line = namedtuple("_Line", ["markers", "pieces"])
+
+
+def is_hwpx(path):
+    """HWPX(zip) 템플릿인지 확인하는 함수"""
+    return bool(path) and path.lower().endswith('.hwpx') and os.path.exists(path) and zipfile.is_zipfile(path)
+
+
+def hwpx_output_path(output_path):
+    """출력 파일 확장자를 .hwpx 로 맞추는 함수"""
+    return os.path.splitext(output_path)[0] + '.hwpx'
+
+
+def _paragraphs(xml_text):
+    """문단 (시작, 끝, 상위 칸) 목록 (시작 위치 순, 상위 칸은 표 칸(subList)의 시작 위치이며 본문은 -1)"""
+    paragraphs = []
+    stack = []  # 열린 (요소, 시작 위치) - 표 안의 문단은 중첩된다
+    for token in _XML_TOKEN_PATTERN.finditer(xml_text):
+        value = token.group()
+        if value.startswith('<hp:p ') or value == '<hp:p>' or value.startswith('<hp:subList'):
+            kind = "hp:p" if value.startswith('<hp:p') else "hp:subList"
+            if value.endswith('/>'):
+                continue
+            stack.append((kind, token.start()))
+        elif value in ('</hp:p>', '</hp:subList>'):
+            kind = value[2:-1]
+            while stack and stack[-1][0] != kind:
+                stack.pop()
+            if not stack:
+                continue
+            _, start = stack.pop()
+            if kind == "hp:p":
+                container = next((position for name, position in reversed(stack) if name == "hp:subList"), -1)
+                paragraphs.append((start, token.end(), container))
+    paragraphs.sort()
+    return paragraphs
+
+
+def _is_blank_line(fragment):
+    """글자가 없고 표·그림 같은 개체도 없는 문단 조각인지 확인하는 함수"""
+    if any(name not in _LINE_TAGS for name in _TAG_NAME_PATTERN.findall(fragment)):
+        return False
+    return not "".join(token for token in _XML_TOKEN_PATTERN.findall(fragment) if not token.startswith('<')).strip()
+
+
+def marker_lines(xml_text, spans, erasable):
+    """erasable 마커만 들어 있는 문단을 (시작, 끝, 마커 위치 목록) 으로 반환하는 함수
+
+    spans 는 (시작, 끝, 마커) 목록이다. 마커를 빼면 글자가 남지 않고 표·그림 같은 개체도 없는
+    문단만 고르며, 바로 뒤에 빈 문단이 이어지면 함께 지운다 (.hwp 경로의 DeleteLine 두 번과 같게).
+    지우고 나면 본문이나 표 칸에 문단이 하나도 남지 않는 경우에는 그 칸의 문단은 지우지 않는다.
+    """
+    paragraphs = _paragraphs(xml_text)
+    starts = [paragraph[0] for paragraph in paragraphs]
+    grouped = {}
+    for span_ in spans:
+        if span_[2] not in erasable:
+            continue
+        number = bisect_right(starts, span_[0]) - 1
+        while number >= 0 and paragraphs[number][1] < span_[1]:
+            number -= 1
+        if number >= 0:
+            grouped.setdefault(number, []).append(span_)
+
+    by_start = {paragraph[0]: number for number, paragraph in enumerate(paragraphs)}
+    lines = []
+    removed = {}
+    for number, inner in sorted(grouped.items()):
+        start, end, container = paragraphs[number]
+        pieces, last = [], start
+        for marker_start, marker_end, _ in inner:
+            pieces.append(xml_text[last:marker_start])
+            last = marker_end
+        pieces.append(xml_text[last:end])
+        if not _is_blank_line("".join(pieces)):
+            continue
+        count = 1
+        following = by_start.get(end)
+        if following is not None and following not in grouped and paragraphs[following][2] == container:
+            following_end = paragraphs[following][1]
+            if _is_blank_line(xml_text[end:following_end]):
+                end = following_end
+                count += 1
+        lines.append((start, end, inner, container))
+        removed[container] = removed.get(container, 0) + count
+
+    totals = {}
+    for _, _, container in paragraphs:
+        totals[container] = totals.get(container, 0) + 1
+    return [(start, end, inner) for start, end, inner, container in lines if removed[container] < totals[container]]
+
+
+def erase_lines_in_xml(xml_text, markers, counts=None):
+    """markers 만 들어 있는 문단을 section XML 에서 지우는 함수 (지울 수 없는 문단의 마커는 그대로 둠)"""
+    if counts is None:
+        counts = {}
+    spans = list(iter_markers_in_xml(xml_text, MarkerMatcher(markers)))
+    pieces = []
+    last = 0
+    for start, end, inner in marker_lines(xml_text, spans, set(markers)):
+        pieces.append(xml_text[last:start])
+        last = end
+        for _, _, marker in inner:
+            counts[marker] = counts.get(marker, 0) + 1
+    if not pieces:
+        return xml_text, counts
+    pieces.append(xml_text[last:])
+    return "".join(pieces), counts
+
+
+def render_hwpx(template_path, output_path, marker_map, erase=()):
+    """HWPX 템플릿의 마커를 치환하여 새 HWPX 파일로 저장하는 함수
+
+    section XML 외의 항목은 압축 해제 없이 그대로 복사하며, mimetype 을 포함한
+    항목 순서와 압축 방식을 유지한다. erase 중 marker_map 에 없는 마커는 문단째 지우고,
+    지울 수 없는 문단에 있으면 빈 문자열로 치환한다. 반환값은 마커별 치환 횟수이다.
+    """
+    unfilled = [marker for marker in erase if marker not in marker_map]
+    if unfilled:
+        marker_map = {**marker_map, **{marker: "" for marker in unfilled}}
+    matcher = MarkerMatcher(marker_map.keys())
+    counts = {}
+
+    out_dir = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(out_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(suffix='.hwpx', dir=out_dir)
+    os.close(fd)
+    try:
+        with zipfile.ZipFile(template_path, 'r') as zin, zipfile.ZipFile(tmp_path, 'w') as zout:
+            for info in zin.infolist():
+                if SECTION_PATTERN.match(info.filename):
+                    xml_text = zin.read(info).decode('utf-8')
+                    if unfilled:
+                        xml_text, _ = erase_lines_in_xml(xml_text, unfilled, counts)
+                    xml_text, _ = replace_markers_in_xml(xml_text, marker_map, matcher, counts)
+                    zout.writestr(info, xml_text.encode('utf-8'))
+                else:
+                    with zin.open(info) as src, zout.open(info, 'w') as dst:
+                        shutil.copyfileobj(src, dst)
+        os.replace(tmp_path, output_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return counts
+
+
+def write_document(template_path, output_path, marker_map, log=print, index=None, erase=()):
+    """템플릿에 마커 맵을 적용해 문서를 저장하는 함수 (HWPX 우선, 한/글 COM 대체)
+
+    .hwpx 템플릿은 직접 작성하고, 그 외(.hwp 또는 템플릿 없음)에만 한/글을 실행한다.
+    index(템플릿 자리 표시자 색인)를 주면 한/글에서는 템플릿에 있는 마커만 찾는다.
+    erase 중 marker_map 에 없는 마커는 마커가 든 줄째 지운다.
+    실제로 저장된 경로와 마커별 치환 횟수를 반환한다.
+    """
+    if is_hwpx(template_path):
+        output_path = hwpx_output_path(output_path)
+        with span("document.write", file=os.path.basename(output_path), markers=len(marker_map)) as attrs:
+            counts = render_hwpx(template_path, output_path, marker_map, erase)
+            attrs["replaced"] = sum(counts.values())
+        if log:
+            log(f"  - HWPX 직접 저장: {os.path.basename(output_path)} ({sum(counts.values())}개 마커 치환)")
+        return output_path, counts
+
+    import pyhwpx
+
+    hwp = None
+    try:
+        hwp = pyhwpx.Hwp(visible=False)
+        if template_path and os.path.exists(template_path):
+            hwp.Open(template_path)
+        else:
+            hwp.XHwpDocuments.Add()
+        unfilled = [marker for marker in erase if marker not in marker_map]
+        if index is not None:
+            unfilled = [marker for marker in unfilled if index.may_contain(marker)]
+            marker_map = index.select(marker_map, log=None)
+        counts = replace_markers_with_hwp(hwp, marker_map, log=None)
+        if unfilled:
+            report = sweep_residual_markers(hwp, unfilled, remove=erase_marker_line, log=None)
+            for marker, count in report.removed.items():
+                counts[marker] = counts.get(marker, 0) + count
+        with span("document.save", file=os.path.basename(output_path)):
+            hwp.SaveAs(output_path)
+        if log:
+            log(f"  - 한/글 저장: {os.path.basename(output_path)} ({sum(counts.values())}개 마커 치환)")
+        return output_path, counts
+    finally:
+        if hwp:
+            try:
+                hwp.Quit()
+            except:
+                pass
+
+
+class HwpxSectionWriter:
+    """섹션이 도착하는 대로 마커 값을 채우는 HWPX 작성기
+
+    열 때 템플릿을 읽어 section XML 을 '고정 조각 + 마커 자리' 목록으로 미리 나눠 두므로,
+    add 는 자리만 채우고 save 는 조각을 이어 붙여 한 번에 저장한다.
+    defaults 에 있는 마커는 끝까지 받지 못하면 그 값(예: 잔여 마커는 "")으로 채운다.
+    erase 에 있는 마커는 끝까지 받지 못하면 마커가 든 문단째 지운다 (marker_lines 로 고른 문단만,
+    그 밖의 자리는 defaults 값 또는 빈 문자열).
+    index(template_index.TemplateIndex)를 주면 자리 표시자는 색인의 위치로 바로 나누고,
+    '#' 처럼 자리 표시자 문법에 없는 마커만 템플릿에서 찾는다.
+    """
+
+    def __init__(self, template_path, output_path, markers, defaults=None, log=print, index=None, erase=()):
+        self.template_path = template_path
+        self.output_path = hwpx_output_path(output_path)
+        self.defaults = {**{marker: "" for marker in erase}, **(defaults or {})}
+        self.values = {}
+        self.log = log
+        erase = set(erase)
+        wanted = list(dict.fromkeys(list(markers) + list(self.defaults)))
+        if index is None:
+            matcher = MarkerMatcher(wanted)
+        else:
+            matcher = MarkerMatcher([marker for marker in wanted if not is_placeholder(marker)])
+            wanted = set(wanted)
+        self._sections = {}
+        with span("document.template", file=os.path.basename(template_path), indexed=index is not None), \
+                zipfile.ZipFile(template_path, 'r') as zin:
+            for info in zin.infolist():
+                if SECTION_PATTERN.match(info.filename):
+                    xml_text = zin.read(info).decode('utf-8')
+                    spans = list(iter_markers_in_xml(xml_text, matcher))
+                    if index is not None:
+                        spans.extend((p.offset, p.offset + len(p.marker), p.marker)
+                                     for p in index.in_part(info.filename) if p.marker in wanted)
+                        spans.sort()
+                    lines = marker_lines(xml_text, spans, erase) if erase else []
+                    self._sections[info.filename] = self._compile(xml_text, spans, lines)
+        if log:
+            slots = sum(len(piece.markers) if isinstance(piece, _Line) else isinstance(piece, tuple)
+                        for pieces in self._sections.values() for piece in pieces)
+            log(f"  - HWPX 템플릿 준비: {os.path.basename(template_path)} (마커 자리 {slots}개)")
+
+    @staticmethod
+    def _compile(xml_text, spans, lines=()):
+        """section XML 을 고정 조각(str), 마커 자리((마커,)), 지울 수 있는 문단(_Line) 목록으로 나누는 함수"""
+        pieces = []
+        last = 0
+        lines = iter(lines)
+        line = next(lines, None)
+        for start, end, marker in spans:
+            if start < last:
+                continue
+            if line is not None and line[0] <= start:
+                line_start, line_end, inner = line
+                pieces.append(xml_text[last:line_start])
+                inner = [(s - line_start, e - line_start, m) for s, e, m in inner]
+                pieces.append(_Line(tuple(m for _, _, m in inner),
+                                    HwpxSectionWriter._compile(xml_text[line_start:line_end], inner)))
+                last = line_end
+                line = next(lines, None)
+                continue
+            pieces.append(xml_text[last:start])
+            pieces.append((marker,))
+            last = end
+        pieces.append(xml_text[last:])
+        return pieces
+
+    def add(self, marker, content):
+        with span("document.insert", marker=marker, chars=len(str(content))):
+            self.values[marker] = escape(str(content))
+
+    def _render(self, pieces, counts):
+        parts = []
+        for piece in pieces:
+            if isinstance(piece, _Line):
+                if any(marker in self.values for marker in piece.markers):
+                    parts.append(self._render(piece.pieces, counts))
+                else:
+                    # 받지 못한 마커만 있는 문단은 통째로 지운다
+                    for marker in piece.markers:
+                        counts[marker] = counts.get(marker, 0) + 1
+                continue
+            if not isinstance(piece, tuple):
+                parts.append(piece)
+                continue
+            marker = piece[0]
+            if marker in self.values:
+                parts.append(self.values[marker])
+            elif marker in self.defaults:
+                parts.append(escape(str(self.defaults[marker])))
+            else:
+                parts.append(marker)
+                continue
+            counts[marker] = counts.get(marker, 0) + 1
+        return "".join(parts)
+
+    def save(self):
+        """받은 섹션으로 문서를 저장하고 마커별 치환 횟수를 반환하는 함수"""
+        counts = {}
+        out_dir = os.path.dirname(os.path.abspath(self.output_path))
+        os.makedirs(out_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(suffix='.hwpx', dir=out_dir)
+        os.close(fd)
+        try:
+            with span("document.save", file=os.path.basename(self.output_path)) as attrs:
+                with zipfile.ZipFile(self.template_path, 'r') as zin, zipfile.ZipFile(tmp_path, 'w') as zout:
+                    for info in zin.infolist():
+                        if info.filename in self._sections:
+                            zout.writestr(info, self._render(self._sections[info.filename], counts).encode('utf-8'))
+                        else:
+                            with zin.open(info) as src, zout.open(info, 'w') as dst:
+                                shutil.copyfileobj(src, dst)
+                os.replace(tmp_path, self.output_path)
+                attrs["bytes"] = os.path.getsize(self.output_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        if self.log:
+            self.log(f"  - HWPX 직접 저장: {os.path.basename(self.output_path)} ({sum(counts.values())}개 마커 치환)")
+        return counts
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class HwpSectionWriter:
+    """섹션이 도착하는 즉시 한/글 문서에 삽입하는 COM(pyhwpx) 작성기 (.hwp 템플릿용)
+
+    한/글 찾기·삽입은 느리므로 생성과 겹쳐서 진행한다. COM 객체는 만든 스레드에서만
+    사용해야 하므로 add/save/close 는 같은 스레드에서 호출한다.
+    cleanup(hwp) 는 저장 직전에 잔여 마커 제거 등에 사용한다.
+    erase 에 있는 마커는 끝까지 받지 못하면 저장 직전에 마커 줄째 지운다.
+    index(template_index.TemplateIndex)를 주면 템플릿에 없는 자리 표시자는 찾지 않는다.
+    """
+
+    def __init__(self, template_path, output_path, defaults=None, cleanup=None, visible=False, log=print, index=None,
+                 erase=()):
+        import pyhwpx
+
+        self.output_path = output_path
+        self.defaults = dict(defaults or {})
+        self.erase = list(erase)
+        self.cleanup = cleanup
+        self.index = index
+        self.values = {}
+        self.counts = {}
+        self.log = log
+        self.hwp = pyhwpx.Hwp(visible=visible)
+        if template_path and os.path.exists(template_path):
+            self.hwp.Open(template_path)
+            if log:
+                log(f"  - 템플릿 파일 열기: {os.path.basename(template_path)}")
+        else:
+            self.hwp.XHwpDocuments.Add()
+            if log:
+                log("  - 새 문서 생성")
+
+    def _in_template(self, marker):
+        return self.index is None or self.index.may_contain(marker)
+
+    def add(self, marker, content):
+        self.values[marker] = content
+        if not self._in_template(marker):
+            return
+        for key, count in replace_markers_with_hwp(self.hwp, {marker: content}, log=None).items():
+            self.counts[key] = self.counts.get(key, 0) + count
+
+    def save(self):
+        remaining = {marker: value for marker, value in self.defaults.items()
+                     if marker not in self.values and marker not in self.erase and self._in_template(marker)}
+        for key, count in replace_markers_with_hwp(self.hwp, remaining, log=None).items():
+            self.counts[key] = self.counts.get(key, 0) + count
+        unfilled = [marker for marker in self.erase if marker not in self.values and self._in_template(marker)]
+        if unfilled:
+            report = sweep_residual_markers(self.hwp, unfilled, remove=erase_marker_line, log=None)
+            for key, count in report.removed.items():
+                self.counts[key] = self.counts.get(key, 0) + count
+        if self.cleanup:
+            self.hwp.MoveDocBegin()
+            self.cleanup(self.hwp)
+        with span("document.save", file=os.path.basename(self.output_path)):
+            self.hwp.SaveAs(self.output_path)
+        if self.log:
+            self.log(f"  - 한/글 저장: {os.path.basename(self.output_path)} ({sum(self.counts.values())}개 마커 치환)")
+        return dict(self.counts)
+
+    def close(self):
+        if self.hwp:
+            try:
+                self.hwp.Quit()
+            except:
+                pass
+            self.hwp = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def open_section_writer(template_path, output_path, markers=(), defaults=None, cleanup=None, visible=False, log=print,
+                        index=None, erase=()):
+    """스트리밍 생성용 섹션 작성기를 여는 함수 (HWPX 템플릿은 직접 작성, 그 외는 한/글 COM)
+
+    markers 는 받을 수 있는 섹션 마커 목록이다 (HWPX 템플릿을 미리 나눌 때 사용).
+    index 는 템플릿 자리 표시자 색인이다 (template_index.load_template_index, 없으면 None).
+    erase 는 끝까지 받지 못하면 마커 줄째 지울 마커 목록이다 (두 작성기 모두 같은 결과).
+    반환된 작성기는 add(마커, 내용) 으로 섹션을 넣고 save() 로 저장하며, with 문으로 닫는다.
+    """
+    if is_hwpx(template_path):
+        return HwpxSectionWriter(template_path, output_path, markers, defaults, log=log, index=index, erase=erase)
+    return HwpSectionWriter(template_path, output_path, defaults, cleanup=cleanup, visible=visible, log=log,
+                            index=index, erase=erase)
@@ -0,0 +1,316 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from rate_limiter import PRIORITY_NORMAL, default_limiter, estimate_request_tokens
+from tracing import get_tracer
+
+#==============================================================================
+# LLM 응답 디스크 캐시
+#   - 모델 이름, 프롬프트 텍스트, 첨부 파일 내용 해시, GenerationConfig 를 키로
+#     생성 결과를 저장한다. 입력이 같으면 다시 생성하지 않고 바로 돌려준다.
+#   - 최근 사용 순(LRU)으로 항목 수와 전체 크기를 제한한다. 항목 목록은 처음 쓸 때 한 번만
+#     디렉터리를 훑어 만들고, 이후에는 메모리에서 항목 수·크기를 갱신한다.
+#   - bypass=True (또는 환경 변수 LLM_CACHE_BYPASS=1) 이면 캐시를 읽지 않고 새로 생성한다.
+#   - stream 은 스트리밍 응답을 조각 단위로 넘기고, 끝까지 받은 응답만 저장한다.
+#   - 캐시에 없어 실제로 보내는 요청만 요청 한도 스케줄러(rate_limiter)를 거친다.
+#==============================================================================
+
+DEFAULT_CACHE_DIR = os.getenv(
+    "LLM_RESPONSE_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".llm_docwriter_cache", "responses"),
+)
+DEFAULT_MAX_ENTRIES = 500
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+
+# 키 형식을 바꾸면 올려서 기존 항목을 무효화한다.
+KEY_VERSION = 1
+
+ENTRY_SUFFIX = ".json"
+# 쓰는 중인 임시 파일 (항목 목록·정리 대상에서 제외)
+TEMP_SUFFIX = ".tmp"
+
+_CONFIG_FIELDS = ("candidate_count", "stop_sequences", "max_output_tokens", "temperature",
+                  "top_p", "top_k", "response_mime_type")
+
+
+def bypass_requested():
+    """환경 변수로 캐시 우회를 요청했는지 확인하는 함수"""
+    return os.getenv("LLM_CACHE_BYPASS", "").lower() in ("1", "true", "yes")
+
+
+def describe_config(generation_config):
+    """GenerationConfig(객체 또는 dict)에서 결과에 영향을 주는 값만 뽑는 함수"""
+    if generation_config is None:
+        return {}
+    values = {}
+    for field in _CONFIG_FIELDS:
+        if isinstance(generation_config, dict):
+            value = generation_config.get(field)
+        else:
+            value = getattr(generation_config, field, None)
+        if value is not None:
+            values[field] = list(value) if isinstance(value, (list, tuple)) else value
+    return values
+
+
+def describe_part(part, attachment_hash=None):
+    """프롬프트 조각 하나를 키에 넣을 수 있는 값으로 바꾸는 함수
+
+    문자열은 그대로, 업로드 파일은 내용 해시(attachment_hash 결과, 파일의 sha256_hash,
+    그것도 없으면 원격 이름)로 나타낸다.
+    """
+    if isinstance(part, str):
+        return ["text", part]
+    if isinstance(part, bytes):
+        return ["bytes", hashlib.sha256(part).hexdigest()]
+    digest = attachment_hash(part) if attachment_hash else None
+    if not digest:
+        raw = getattr(part, "sha256_hash", None)
+        if isinstance(raw, bytes):
+            digest = raw.hex()
+        elif raw:
+            digest = str(raw)
+    return ["file", digest or getattr(part, "name", repr(part))]
+
+
+def cache_key(model_name, prompt_parts, generation_config=None, attachment_hash=None):
+    """모델·프롬프트·첨부·설정으로 캐시 키(SHA-256)를 만드는 함수"""
+    if isinstance(prompt_parts, (str, bytes)) or not hasattr(prompt_parts, "__iter__"):
+        prompt_parts = [prompt_parts]
+    payload = {
+        "version": KEY_VERSION,
+        "model": model_name,
+        "parts": [describe_part(part, attachment_hash) for part in prompt_parts],
+        "config": describe_config(generation_config),
+    }
+    encoded = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class CachedResponse:
+    """캐시에서 꺼낸 응답 (generate_content 응답처럼 text 를 가짐)"""
+
+    cached = True
+
+    def __init__(self, text):
+        self.text = text
+        self.parts = [text] if text else []
+
+
+class ResponseStream:
+    """스트리밍 응답 (텍스트 조각을 도착하는 대로 내보냄)
+
+    끝까지 읽으면 text 에 전체 텍스트가 남고 on_complete(text) 가 호출된다.
+    캐시 적중이면 저장된 텍스트 전체를 한 조각으로 내보낸다 (cached=True).
+    """
+
+    def __init__(self, chunks, cached=False, on_complete=None):
+        self.cached = cached
+        self._chunks = chunks
+        self._on_complete = on_complete
+        self._pieces = []
+
+    @property
+    def text(self):
+        return "".join(self._pieces)
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            try:
+                piece = chunk if isinstance(chunk, str) else chunk.text
+            except Exception:
+                continue  # 텍스트가 없는 조각 (안전 필터로 막힌 후보 등)
+            if piece:
+                self._pieces.append(piece)
+                yield piece
+        if self._on_complete:
+            self._on_complete(self.text)
+
+
+class ResponseCache:
+    """LRU·크기 제한이 있는 디스크 응답 캐시"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES,
+                 limiter=None):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.limiter = limiter if limiter is not None else default_limiter()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = None  # 항목 경로 → 크기 (오래 사용하지 않은 순), 처음 쓸 때 만든다
+        self._total = 0
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}{ENTRY_SUFFIX}")
+
+    def _load_entries(self):
+        """캐시 디렉터리를 한 번 훑어 항목 목록을 만드는 함수 (self._lock 을 잡은 상태에서 호출)"""
+        if self._entries is not None:
+            return
+        found = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(ENTRY_SUFFIX):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                found.append((stat.st_mtime, stat.st_size, path))
+        found.sort()
+        self._entries = OrderedDict((path, size) for _, size, path in found)
+        self._total = sum(self._entries.values())
+
+    def _forget(self, path):
+        # self._lock 을 잡은 상태에서 호출한다.
+        if self._entries is not None:
+            self._total -= self._entries.pop(path, 0)
+
+    def get(self, key):
+        """저장된 텍스트를 읽는 함수 (없으면 None). 읽은 항목은 최근 사용으로 표시한다."""
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(entry_path)  # 수정 시각을 최근 사용 시각으로 사용 (다음 실행의 정리 순서)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+            if self._entries is not None and entry_path in self._entries:
+                self._entries.move_to_end(entry_path)
+        return entry.get("text")
+
+    def put(self, key, text, model_name=""):
+        entry_path = self._entry_path(key)
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        entry = {"key": key, "model": model_name, "created": time.time(), "text": text}
+        fd, tmp_path = tempfile.mkstemp(suffix=TEMP_SUFFIX, dir=os.path.dirname(entry_path))
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, entry_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        with self._lock:
+            self._load_entries()
+            self._forget(entry_path)
+            self._entries[entry_path] = size
+            self._total += size
+            self._evict()
+
+    def discard(self, key):
+        entry_path = self._entry_path(key)
+        try:
+            os.remove(entry_path)
+        except OSError:
+            pass
+        with self._lock:
+            self._forget(entry_path)
+
+    def evict(self):
+        """오래 사용하지 않은 항목부터 지워 항목 수·전체 크기 제한을 맞추는 함수"""
+        with self._lock:
+            self._load_entries()
+            self._evict()
+
+    def _evict(self):
+        # self._lock 을 잡은 상태에서 호출한다.
+        while self._entries and (len(self._entries) > self.max_entries or self._total > self.max_bytes):
+            path, size = self._entries.popitem(last=False)
+            self._total -= size
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def generate(self, model, prompt_parts, generation_config=None, bypass=False, attachment_hash=None,
+                 priority=PRIORITY_NORMAL, **kwargs):
+        """model.generate_content 를 캐시를 거쳐 호출하는 함수
+
+        적중하면 CachedResponse 를, 아니면 실제 응답을 반환한다 (텍스트가 있는 응답만 저장).
+        priority 는 요청 한도 스케줄러에서의 우선순위(작을수록 먼저)이다.
+        """
+        tracer = get_tracer()
+        started = tracer.now()
+        model_name = getattr(model, "model_name", type(model).__name__)
+        key = cache_key(model_name, prompt_parts, generation_config, attachment_hash)
+        if not (bypass or bypass_requested()):
+            text = self.get(key)
+            if text is not None:
+                tracer.record("llm.generate", started, model=model_name, cached=True, chars=len(text))
+                return CachedResponse(text)
+
+        if generation_config is not None:
+            kwargs["generation_config"] = generation_config
+        tokens = estimate_request_tokens(prompt_parts)
+        try:
+            response = self.limiter.call(model_name, lambda: model.generate_content(prompt_parts, **kwargs),
+                                         tokens=tokens, priority=priority)
+        except Exception as e:
+            tracer.record("llm.generate", started, error=e, model=model_name, tokens=tokens, cached=False)
+            raise
+        try:
+            text = response.text
+        except Exception:
+            text = None
+        tracer.record("llm.generate", started, model=model_name, tokens=tokens, cached=False, chars=len(text or ""))
+        if text:
+            try:
+                self.put(key, text, model_name)
+            except OSError as e:
+                print(f"  - 경고: 응답 캐시 저장 실패: {e}")
+        return response
+
+    def stream(self, model, prompt_parts, generation_config=None, bypass=False, attachment_hash=None,
+               priority=PRIORITY_NORMAL, **kwargs):
+        """generate 의 스트리밍 판. ResponseStream 을 반환하며, 끝까지 받은 응답만 캐시에 저장한다."""
+        tracer = get_tracer()
+        started = tracer.now()
+        model_name = getattr(model, "model_name", type(model).__name__)
+        key = cache_key(model_name, prompt_parts, generation_config, attachment_hash)
+        if not (bypass or bypass_requested()):
+            text = self.get(key)
+            if text is not None:
+                tracer.record("llm.stream", started, model=model_name, cached=True, chars=len(text))
+                return ResponseStream([text], cached=True)
+        tokens = estimate_request_tokens(prompt_parts)
+
+        def _store(text):
+            # span 은 요청 시작부터 마지막 조각을 받을 때까지이다
+            tracer.record("llm.stream", started, model=model_name, tokens=tokens, cached=False, chars=len(text))
+            if not text:
+                return
+            try:
+                self.put(key, text, model_name)
+            except OSError as e:
+                print(f"  - 경고: 응답 캐시 저장 실패: {e}")
+
+        if generation_config is not None:
+            kwargs["generation_config"] = generation_config
+        chunks = self.limiter.call(model_name, lambda: model.generate_content(prompt_parts, stream=True, **kwargs),
+                                   tokens=tokens, priority=priority, usage=None)
+        return ResponseStream(chunks, on_complete=_store)
+
+
+_default_cache = None
+
+
+def default_cache():
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ResponseCache()
+    return _default_cache
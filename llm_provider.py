@@ -0,0 +1,409 @@
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from types import SimpleNamespace
+
+from llm_cache import describe_config
+from marker_grammar import SECTION_FAMILIES, marker_pattern
+from rate_limiter import estimate_request_tokens, normalize_model_name
+from upload_manifest import GeminiFilesApi, LocalFilesApi
+
+#==============================================================================
+# LLM 제공자 추상화 (Gemini / Claude / 로컬 가짜 서버)
+#   - 스크립트와 GUI 는 제공자의 generate·stream·upload·delete 만 사용한다.
+#   - provider.model(이름) 은 Gemini GenerativeModel 과 같은 generate_content /
+#     start_chat 인터페이스를 가지므로 ResponseCache·요청 스케줄러를 그대로 쓸 수 있다.
+#   - LocalProvider 는 네트워크 없이 프롬프트의 마커 형식에 맞춘 응답을 결정적으로
+#     만들고, 지연 시간을 흉내 내어 파이프라인 처리량을 재현 가능하게 측정할 수 있다.
+#   - 환경 변수 LLM_PROVIDER=gemini|claude|local 로 제공자를 고른다.
+#==============================================================================
+
+PROVIDER_ENV = "LLM_PROVIDER"
+DEFAULT_PROVIDER = "gemini"
+DEFAULT_MAX_TOKENS = 4096
+
+
+class ProviderResponse:
+    """제공자 공통 응답 (Gemini 응답처럼 text·parts·usage_metadata 를 가짐)"""
+
+    def __init__(self, text, prompt_tokens=None, prompt_feedback=None):
+        self.text = text
+        self.parts = [text] if text else []
+        self.usage_metadata = SimpleNamespace(prompt_token_count=prompt_tokens)
+        self.prompt_feedback = prompt_feedback
+
+
+def is_messages(prompt_parts):
+    """요청 내용이 [{'role', 'content'}] 대화 목록인지 확인하는 함수"""
+    return isinstance(prompt_parts, list) and bool(prompt_parts) and all(
+        isinstance(part, dict) and "role" in part for part in prompt_parts)
+
+
+def as_messages(prompt_parts):
+    """요청 내용을 [{'role', 'content'}] 대화 목록으로 바꾸는 함수 (이미 대화 목록이면 그대로)"""
+    if is_messages(prompt_parts):
+        return prompt_parts
+    if isinstance(prompt_parts, (str, dict)) or not hasattr(prompt_parts, "__iter__"):
+        prompt_parts = [prompt_parts]
+    return [{"role": "user", "content": list(prompt_parts)}]
+
+
+def content_parts(content):
+    """메시지 content 를 조각 목록으로 바꾸는 함수"""
+    if isinstance(content, (str, dict)) or not hasattr(content, "__iter__"):
+        return [content]
+    return list(content)
+
+
+def prompt_text(prompt_parts):
+    """요청 내용 중 텍스트 조각만 이어 붙인 문자열"""
+    texts = []
+    for message in as_messages(prompt_parts):
+        texts.extend(part for part in content_parts(message["content"]) if isinstance(part, str))
+    return "\n".join(texts)
+
+
+class ProviderModel:
+    """제공자의 모델 하나 (Gemini GenerativeModel 과 같은 generate_content 인터페이스)"""
+
+    def __init__(self, provider, model_name, **options):
+        self.provider = provider
+        self.model_name = model_name
+        self.options = options
+
+    def generate_content(self, prompt_parts, stream=False, generation_config=None, **kwargs):
+        call = self.provider.stream if stream else self.provider.generate
+        return call(self, prompt_parts, generation_config=generation_config, **kwargs)
+
+    def start_chat(self, history=None):
+        return ProviderChat(self, history)
+
+
+class ProviderChat:
+    """대화 기록을 직접 들고 매번 전체 대화를 보내는 채팅 세션 (Gemini ChatSession 대용)"""
+
+    def __init__(self, model, history=None):
+        self.model = model
+        self.history = list(history or [])
+
+    def send_message(self, content, **kwargs):
+        messages = self.history + [{"role": "user", "content": content}]
+        response = self.model.generate_content(messages, **kwargs)
+        if response.parts:
+            self.history = messages + [{"role": "assistant", "content": response.text}]
+        return response
+
+
+class LLMProvider(ABC):
+    """LLM 제공자 인터페이스
+
+    generate(model, prompt_parts) 는 응답(text·parts 를 가진 객체)을, stream 은 text 를 가진
+    조각들을 반환한다. upload/get/delete 는 upload_manifest 의 파일 API 와 같은 형태라서
+    ReusableUploader(files_api=provider) 로 그대로 사용할 수 있다.
+    """
+
+    name = ""
+
+    def model(self, model_name, **options):
+        return ProviderModel(self, model_name, **options)
+
+    @abstractmethod
+    def generate(self, model, prompt_parts, generation_config=None, **kwargs):
+        """응답 하나를 생성해 반환하는 함수"""
+
+    @abstractmethod
+    def stream(self, model, prompt_parts, generation_config=None, **kwargs):
+        """응답을 text 를 가진 조각들로 내보내는 함수"""
+
+    @abstractmethod
+    def upload(self, path):
+        """파일을 올리고 원격 파일 객체를 반환하는 함수"""
+
+    @abstractmethod
+    def get(self, name):
+        """원격 파일 객체(state 포함)를 조회하는 함수"""
+
+    @abstractmethod
+    def delete(self, name):
+        """원격 파일을 삭제하는 함수"""
+
+
+#==============================================================================
+# Gemini (google.generativeai)
+#==============================================================================
+
+class GeminiProvider(LLMProvider):
+    name = "gemini"
+
+    def __init__(self, api_key=None, genai_module=None):
+        if genai_module is None:
+            import google.generativeai as genai_module
+        self.genai = genai_module
+        self.files = GeminiFilesApi(genai_module)
+        if api_key:
+            self.genai.configure(api_key=api_key)
+
+    def _native(self, model):
+        native = getattr(model, "_native", None)
+        if native is None:
+            native = model._native = self.genai.GenerativeModel(model.model_name, **model.options)
+        return native
+
+    def _contents(self, prompt_parts):
+        if not is_messages(prompt_parts):
+            return prompt_parts  # 단일 요청은 원래 형태 그대로 전달
+        return [{"role": "model" if message["role"] == "assistant" else "user",
+                 "parts": content_parts(message["content"])} for message in prompt_parts]
+
+    def generate(self, model, prompt_parts, generation_config=None, **kwargs):
+        if generation_config is not None:
+            kwargs["generation_config"] = generation_config
+        return self._native(model).generate_content(self._contents(prompt_parts), **kwargs)
+
+    def stream(self, model, prompt_parts, generation_config=None, **kwargs):
+        if generation_config is not None:
+            kwargs["generation_config"] = generation_config
+        return self._native(model).generate_content(self._contents(prompt_parts), stream=True, **kwargs)
+
+    def upload(self, path):
+        return self.files.upload(path)
+
+    def get(self, name):
+        return self.files.get(name)
+
+    def delete(self, name):
+        self.files.delete(name)
+
+
+#==============================================================================
+# Claude (anthropic)
+#==============================================================================
+
+# 업로드 파일을 메시지에 첨부할 때 필요한 베타 기능 이름
+CLAUDE_FILES_BETA = "files-api-2025-04-14"
+
+
+class ClaudeProvider(LLMProvider):
+    name = "claude"
+
+    def __init__(self, api_key=None, client=None, max_tokens=DEFAULT_MAX_TOKENS):
+        self.api_key = api_key
+        self.max_tokens = max_tokens
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            import anthropic
+            self._client = anthropic.Anthropic(api_key=self.api_key) if self.api_key else anthropic.Anthropic()
+        return self._client
+
+    def _request(self, model, prompt_parts, generation_config):
+        config = describe_config(generation_config)
+        uses_files = False
+        messages = []
+        for message in as_messages(prompt_parts):
+            blocks = []
+            for part in content_parts(message["content"]):
+                if isinstance(part, str):
+                    blocks.append({"type": "text", "text": part})
+                elif isinstance(part, dict):
+                    blocks.append(part)
+                else:
+                    uses_files = True
+                    blocks.append({"type": "document", "source": {"type": "file", "file_id": part.name}})
+            messages.append({"role": message["role"], "content": blocks})
+        request = {
+            "model": model.model_name,
+            "max_tokens": config.get("max_output_tokens", self.max_tokens),
+            "messages": messages,
+        }
+        for source, target in (("temperature", "temperature"), ("top_p", "top_p"), ("top_k", "top_k"),
+                               ("stop_sequences", "stop_sequences")):
+            if source in config:
+                request[target] = config[source]
+        if uses_files:
+            request["betas"] = [CLAUDE_FILES_BETA]
+        return request, uses_files
+
+    def generate(self, model, prompt_parts, generation_config=None, **kwargs):
+        request, uses_files = self._request(model, prompt_parts, generation_config)
+        api = self.client.beta.messages if uses_files else self.client.messages
+        response = api.create(**request)
+        text = "".join(block.text for block in response.content if getattr(block, "type", "text") == "text")
+        return ProviderResponse(text, prompt_tokens=response.usage.input_tokens)
+
+    def stream(self, model, prompt_parts, generation_config=None, **kwargs):
+        request, uses_files = self._request(model, prompt_parts, generation_config)
+        api = self.client.beta.messages if uses_files else self.client.messages
+        with api.stream(**request) as events:
+            for text in events.text_stream:
+                yield ProviderResponse(text)
+
+    @staticmethod
+    def _file(metadata):
+        return SimpleNamespace(
+            name=metadata.id,
+            display_name=getattr(metadata, "filename", metadata.id),
+            size_bytes=getattr(metadata, "size_bytes", 0),
+            expiration_time=None,  # Claude 파일은 삭제할 때까지 보관된다
+            state=SimpleNamespace(name="ACTIVE"),
+        )
+
+    def upload(self, path):
+        with open(path, 'rb') as f:
+            metadata = self.client.beta.files.upload(file=(os.path.basename(path), f, "application/pdf"))
+        return self._file(metadata)
+
+    def get(self, name):
+        return self._file(self.client.beta.files.retrieve_metadata(name))
+
+    def delete(self, name):
+        self.client.beta.files.delete(name)
+
+
+#==============================================================================
+# 로컬 가짜 제공자 (네트워크 없이 결정적인 응답, 시험·벤치마크용)
+#==============================================================================
+
+_PHRASES = [
+    "군민 여러분의 성원에 힘입어", "지역 경제의 새로운 활력을 위해", "미래 성장 동력을 확보하고자",
+    "모두가 함께하는 공동체를 만들기 위해", "청정 자연과 관광 자원을 바탕으로", "안전하고 살기 좋은 지역을 향해",
+]
+_ACTIONS = [
+    "다양한 사업을 차질 없이 추진하였습니다.", "현장 중심의 정책을 꾸준히 펼쳐 나가겠습니다.",
+    "괄목할 만한 성과를 거두었습니다.", "지속 가능한 발전의 기반을 다졌습니다.",
+    "군민의 삶의 질을 높이는 데 최선을 다하겠습니다.", "새로운 도약을 준비하고 있습니다.",
+]
+
+_JSON_KEY_PATTERN = re.compile(r'"([A-Z]{1,3}[0-9]?)"\s*:')
+_MARKER_PATTERN = marker_pattern(*SECTION_FAMILIES)
+_BARE_MARKER_PATTERN = re.compile(r'(?<![A-Za-z0-9])(([A-Z])\2{1,2})(?![A-Za-z0-9])')
+
+
+def marker_sequence(example, count):
+    """예시 마커와 같은 규칙의 마커 count 개 (A1 → A1..A9, B1.., AA → AA, BB.., AAA → AAA, BBB..)"""
+    if re.fullmatch(r'[A-Z][0-9]', example):
+        return [f"{chr(ord('A') + i // 9)}{i % 9 + 1}" for i in range(min(count, 26 * 9))]
+    if re.fullmatch(r'([A-Z])\1+', example):
+        return [chr(ord('A') + i) * len(example) for i in range(min(count, 26))]
+    return [example]
+
+
+def fake_response_text(prompt, sections=10, sentences=2, seed=0):
+    """프롬프트가 요구하는 형식(JSON 키 또는 ##마커)에 맞춘 결정적인 가짜 응답
+
+    같은 프롬프트·seed 에는 항상 같은 응답을 만든다.
+    """
+    rng = random.Random(int(hashlib.sha256(f"{seed}:{prompt}".encode("utf-8")).hexdigest()[:16], 16))
+
+    def _content():
+        return " ".join(f"{rng.choice(_PHRASES)} {rng.choice(_ACTIONS)}" for _ in range(sentences))
+
+    keys = list(dict.fromkeys(_JSON_KEY_PATTERN.findall(prompt)))
+    if keys and "json" in prompt.lower():
+        body = json.dumps({key: _content() for key in keys}, ensure_ascii=False, indent=2)
+        return f"```json\n{body}\n```"
+
+    match = _MARKER_PATTERN.search(prompt) or _BARE_MARKER_PATTERN.search(prompt)
+    if not match:
+        return _content()
+    return "\n".join(f"## {marker} {_content()}" for marker in marker_sequence(match.group(1), sections))
+
+
+class LocalProvider(LLMProvider):
+    """네트워크 없이 동작하는 가짜 제공자
+
+    script 가 없으면 fake_response_text 로 응답을 만들고, 문자열이면 항상 그 응답을,
+    목록이면 호출 순서대로 돌아가며, 함수면 script(프롬프트 텍스트) 결과를 응답으로 쓴다.
+    latency 는 첫 조각까지의 지연(초), chunk_delay 는 조각 사이 지연(초)이다.
+    모델 이름 앞에 'local/' 을 붙여 실제 모델의 캐시·요청 한도와 섞이지 않게 한다.
+    """
+
+    name = "local"
+
+    def __init__(self, script=None, latency=0.0, chunk_delay=0.0, chunk_chars=40, sections=10,
+                 sentences=2, seed=0, files_api=None):
+        self.script = script
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.chunk_chars = max(1, chunk_chars)
+        self.sections = sections
+        self.sentences = sentences
+        self.seed = seed
+        self.files = files_api if files_api is not None else LocalFilesApi()
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def model(self, model_name="fake", **options):
+        return ProviderModel(self, f"local/{normalize_model_name(model_name)}", **options)
+
+    def respond(self, prompt_parts):
+        """요청에 대한 응답 텍스트"""
+        with self._lock:
+            call = self.calls
+            self.calls += 1
+        text = prompt_text(prompt_parts)
+        if callable(self.script):
+            return self.script(text)
+        if isinstance(self.script, str):
+            return self.script
+        if self.script:
+            return self.script[call % len(self.script)]
+        return fake_response_text(text, self.sections, self.sentences, self.seed)
+
+    def _chunks(self, text):
+        return [text[start:start + self.chunk_chars] for start in range(0, len(text), self.chunk_chars)]
+
+    def generate(self, model, prompt_parts, generation_config=None, **kwargs):
+        text = self.respond(prompt_parts)
+        time.sleep(self.latency + self.chunk_delay * max(0, len(self._chunks(text)) - 1))
+        return ProviderResponse(text, prompt_tokens=estimate_request_tokens(prompt_parts))
+
+    def stream(self, model, prompt_parts, generation_config=None, **kwargs):
+        text = self.respond(prompt_parts)
+
+        def _generate():
+            time.sleep(self.latency)
+            for k, chunk in enumerate(self._chunks(text)):
+                if k and self.chunk_delay:
+                    time.sleep(self.chunk_delay)
+                yield ProviderResponse(chunk)
+
+        return _generate()
+
+    def upload(self, path):
+        return self.files.upload(path)
+
+    def get(self, name):
+        return self.files.get(name)
+
+    def delete(self, name):
+        self.files.delete(name)
+
+
+PROVIDERS = {
+    "gemini": GeminiProvider,
+    "claude": ClaudeProvider,
+    "local": LocalProvider,
+}
+
+
+def create_provider(kind=None, api_key=None, **options):
+    """제공자를 만드는 함수 (kind 가 없으면 환경 변수 LLM_PROVIDER, 그것도 없으면 gemini)
+
+    로컬 제공자의 지연 시간은 LOCAL_LLM_LATENCY, LOCAL_LLM_CHUNK_DELAY 환경 변수로도 정할 수 있다.
+    """
+    kind = (kind or os.getenv(PROVIDER_ENV) or DEFAULT_PROVIDER).lower()
+    if kind not in PROVIDERS:
+        raise ValueError(f"알 수 없는 LLM 제공자입니다: {kind} (가능: {', '.join(PROVIDERS)})")
+    if kind == "local":
+        options.setdefault("latency", float(os.getenv("LOCAL_LLM_LATENCY", "0")))
+        options.setdefault("chunk_delay", float(os.getenv("LOCAL_LLM_CHUNK_DELAY", "0")))
+        return LocalProvider(**options)
+    return PROVIDERS[kind](api_key=api_key, **options)
@@ -0,0 +1,203 @@
+import json
+import re
+from collections import namedtuple
+
+#==============================================================================
+# 파싱 마커 문법
+#   - 응답의 '## 식별자' 마커를 한 번의 정규식 탐색(finditer)으로 모두 찾아
+#     식별자 종류별로 구분된 섹션 맵을 만든다. re.split 처럼 전체를 다시 나눠
+#     중간 목록을 만들지 않으므로 응답이 길어져도 비용은 길이에 비례한다.
+#   - 식별자 종류 (family)
+#       TITLE        AAA, BBB ...  (대제목)
+#       PAIR_DIGIT   AA1, AC1 ...  (세부내용, 주요성과)
+#       PAIR         AA, BB ...    (발간사 문단)
+#       LETTER_DIGIT A1, J1, H1 ...(시장연설문 문단, 특수시책·핵심과제)
+#       DATE         YEAR, YDDY, YYYY, YYYD (템플릿 연도 자리)
+#   - 식별자 바로 뒤에 영문·숫자가 이어지면 마커로 보지 않는다 ('##AA1' 이 'AA' + '1' 로 잘리지 않음).
+#   - 템플릿 본문의 자리 표시자('##' 없음)는 placeholder_pattern 으로 찾는다 (template_index).
+#==============================================================================
+
+TITLE = "title"
+PAIR_DIGIT = "pair_digit"
+PAIR = "pair"
+LETTER_DIGIT = "letter_digit"
+DATE = "date"
+
+# 먼저 나온 종류가 우선한다 (YEAR 는 TITLE 이 아니라 DATE)
+_FAMILY_PATTERNS = (
+    (DATE, r'YEAR|YDDY|YYYY|YYYD'),
+    (TITLE, r'[A-Z]{3,}'),
+    (PAIR_DIGIT, r'[A-Z]{2}[0-9]'),
+    (PAIR, r'[A-Z]{2}'),
+    (LETTER_DIGIT, r'[A-Z][0-9]'),
+)
+ALL_FAMILIES = tuple(name for name, _ in _FAMILY_PATTERNS)
+
+# 응답 본문에 나오는 섹션 마커 (DATE 는 템플릿에만 있으므로 기본에서 뺀다)
+SECTION_FAMILIES = (TITLE, PAIR_DIGIT, PAIR, LETTER_DIGIT)
+
+# 템플릿 본문의 자리 표시자 (앞에 '##' 없이 쓰이고, 대제목·발간사 마커는 같은 글자 반복)
+_PLACEHOLDER_PATTERNS = (
+    (DATE, r'YEAR|YDDY|YYYY|YYYD'),
+    (TITLE, r'(?P<t>[A-Z])(?P=t){2}'),
+    (PAIR_DIGIT, r'[A-Z]{2}[0-9]'),
+    (PAIR, r'(?P<p>[A-Z])(?P=p)'),
+    (LETTER_DIGIT, r'[A-Z][0-9]'),
+)
+
+_pattern_cache = {}
+
+# marker: 식별자, family: 식별자 종류, content: 앞뒤 공백을 뺀 내용,
+# start/end: 원문에서 마커('##' 포함) 시작 위치와 내용 끝 위치
+Section = namedtuple("Section", ["marker", "family", "content", "start", "end"])
+
+
+def marker_pattern(*families):
+    """주어진 종류의 '## 식별자' 마커를 찾는 컴파일된 정규식 (1번 그룹이 식별자)
+
+    종류별 이름 그룹으로 어떤 종류인지도 알 수 있다. 같은 조합은 한 번만 컴파일한다.
+    """
+    families = tuple(families) or SECTION_FAMILIES
+    pattern = _pattern_cache.get(families)
+    if pattern is None:
+        unknown = [family for family in families if family not in ALL_FAMILIES]
+        if unknown:
+            raise ValueError(f"알 수 없는 마커 종류: {', '.join(unknown)}")
+        alternatives = "|".join(f"(?P<{name}>{body})" for name, body in _FAMILY_PATTERNS if name in families)
+        pattern = re.compile(rf'##\s*((?:{alternatives}))(?![A-Za-z0-9])')
+        _pattern_cache[families] = pattern
+    return pattern
+
+
+def marker_family(match):
+    """marker_pattern 검색 결과가 어느 종류의 식별자인지 반환하는 함수"""
+    for name, _ in _FAMILY_PATTERNS:
+        if name in match.re.groupindex and match.group(name) is not None:
+            return name
+    return None
+
+
+_placeholder_pattern = None
+
+
+def placeholder_pattern():
+    """템플릿의 자리 표시자(AAA, AA1, AC1, AA, A1, J1, YEAR 등)를 찾는 컴파일된 정규식
+
+    앞뒤에 영문·숫자가 붙은 경우(CCTV, A10 등)는 자리 표시자로 보지 않는다.
+    marker_family 로 종류를 알 수 있다.
+    """
+    global _placeholder_pattern
+    if _placeholder_pattern is None:
+        alternatives = "|".join(f"(?P<{name}>{body})" for name, body in _PLACEHOLDER_PATTERNS)
+        _placeholder_pattern = re.compile(rf'(?<![A-Za-z0-9])(?:{alternatives})(?![A-Za-z0-9])')
+    return _placeholder_pattern
+
+
+def is_placeholder(marker):
+    """marker 가 자리 표시자 문법으로 표현되는 식별자인지 ('#' 같은 강조 문자는 False)"""
+    return placeholder_pattern().fullmatch(marker) is not None
+
+
+class SectionMap:
+    """마커 → Section 맵과 검사 결과 (중복, 누락)
+
+    같은 마커가 여러 번 나오면 기존 동작처럼 마지막 섹션을 쓰고, 앞의 것은 duplicates 에 남긴다.
+    """
+
+    def __init__(self, sections, duplicates, missing, preamble):
+        self.sections = sections
+        self.duplicates = duplicates
+        self.missing = missing
+        self.preamble = preamble  # 첫 마커 앞의 텍스트
+
+    def __getitem__(self, marker):
+        return self.sections[marker]
+
+    def __contains__(self, marker):
+        return marker in self.sections
+
+    def __iter__(self):
+        return iter(self.sections)
+
+    def __len__(self):
+        return len(self.sections)
+
+    def items(self):
+        return self.sections.items()
+
+    def contents(self):
+        """마커 → 내용 dict"""
+        return {marker: section.content for marker, section in self.sections.items()}
+
+    def titles(self):
+        """마커 → 내용 첫 줄(제목) dict"""
+        return {marker: section.content.split('\n')[0].strip() for marker, section in self.sections.items()}
+
+    def by_family(self, family):
+        return {marker: section for marker, section in self.sections.items() if section.family == family}
+
+    def problems(self):
+        """중복·누락 마커를 사람이 읽을 문장 목록으로 정리하는 함수 (없으면 빈 목록)"""
+        lines = []
+        if self.duplicates:
+            lines.append(f"중복 마커: {', '.join(dict.fromkeys(section.marker for section in self.duplicates))}")
+        if self.missing:
+            lines.append(f"누락 마커: {', '.join(self.missing)}")
+        return lines
+
+
+def parse_markers(text, families=SECTION_FAMILIES, expected=()):
+    """응답 텍스트를 한 번 훑어 SectionMap 으로 나누는 함수
+
+    families 에 없는 종류의 식별자는 마커로 보지 않고 내용에 남긴다.
+    expected 에 있는데 나오지 않은 마커는 missing 에 담긴다.
+    """
+    pattern = marker_pattern(*families)
+    sections = {}
+    duplicates = []
+    current = None  # (마커, 종류, 마커 시작, 내용 시작)
+    preamble_end = len(text)
+
+    def _close(end):
+        marker, family, start, content_start = current
+        section = Section(marker, family, text[content_start:end].strip(), start, end)
+        if marker in sections:
+            duplicates.append(sections.pop(marker))
+        sections[marker] = section
+
+    for match in pattern.finditer(text):
+        if current is None:
+            preamble_end = match.start()
+        else:
+            _close(match.start())
+        current = (match.group(1), marker_family(match), match.start(), match.end())
+    if current is not None:
+        _close(len(text))
+
+    missing = [marker for marker in expected if marker not in sections]
+    return SectionMap(sections, duplicates, missing, text[:preamble_end].strip())
+
+
+_FENCED_JSON = re.compile(r'```(?:json)?\s*(\{)', re.IGNORECASE)
+
+
+def extract_json(text):
+    """응답에서 첫 번째 JSON 객체를 찾아 dict 로 반환하는 함수 (없으면 None)
+
+    ```json 코드 블록을 먼저 보고, 없으면 처음 나오는 '{' 부터 해석한다.
+    '{ … }' 를 탐욕적으로 잘라내던 방식과 달리 JSON 뒤에 설명 문장이나 중괄호가 더 있어도 된다.
+    """
+    if not text:
+        return None
+    decoder = json.JSONDecoder()
+    fenced = _FENCED_JSON.search(text)
+    for start in dict.fromkeys(([fenced.start(1)] if fenced else []) + [text.find('{')]):
+        if start < 0:
+            continue
+        try:
+            value, _ = decoder.raw_decode(text, start)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(value, dict):
+            return value
+    return None
@@ -0,0 +1,245 @@
+import re
+from collections import deque, namedtuple
+from xml.sax.saxutils import escape
+
+from tracing import get_tracer
+
+#==============================================================================
+# 마커 일괄 치환 엔진
+#   - 마커→텍스트 맵 전체를 Aho–Corasick 오토마톤 하나로 만들어
+#     문서를 한 번만 훑으면서 모든 마커를 치환한다.
+#   - HWPX 섹션 XML에는 replace_markers_in_xml 을,
+#     한/글 COM(pyhwpx) 객체에는 replace_markers_with_hwp 를 사용한다 (대체 경로).
+#   - 한/글 문서의 잔여 마커는 sweep_residual_markers 로 문서 텍스트를 한 번 훑어
+#     실제로 남아 있는 마커만 찾아 지운다.
+#==============================================================================
+
+# XML 태그 사이의 텍스트 노드만 골라내기 위한 패턴
+_XML_TEXT_PATTERN = re.compile(r'>([^<]+)<')
+# 텍스트 노드 안의 엔티티·문자 참조 (&amp; &#9; &#x9; 등) - 마커 검색에서 제외한다
+_XML_ENTITY_PATTERN = re.compile(r'&(?:#[0-9]+|#x[0-9a-fA-F]+|[A-Za-z_][\w.-]*);')
+
+
+class MarkerMatcher:
+    """여러 마커를 한 번의 스캔으로 찾는 Aho–Corasick 매처"""
+
+    def __init__(self, markers):
+        self.markers = [m for m in dict.fromkeys(markers) if m]
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]  # 각 상태에서 끝나는 마커들의 길이 (긴 것부터)
+        for marker in self.markers:
+            self._add(marker)
+        self._build()
+
+    def _add(self, marker):
+        state = 0
+        for ch in marker:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append(len(marker))
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = sorted(set(self._out[nxt] + self._out[self._fail[nxt]]), reverse=True)
+
+    def finditer(self, text):
+        """겹치지 않는 (시작, 끝, 마커) 를 왼쪽부터, 같은 위치에서는 가장 긴 마커 우선으로 반환"""
+        if not self.markers:
+            return
+        longest_at = {}
+        state = 0
+        goto, fail, out = self._goto, self._fail, self._out
+        for pos, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for length in out[state]:
+                start = pos - length + 1
+                if longest_at.get(start, 0) < length:
+                    longest_at[start] = length
+
+        last_end = 0
+        for start in sorted(longest_at):
+            if start < last_end:
+                continue
+            end = start + longest_at[start]
+            yield start, end, text[start:end]
+            last_end = end
+
+
+def replace_markers(text, marker_map, matcher=None, counts=None):
+    """문자열 안의 마커를 marker_map 의 값으로 한 번에 치환하는 함수"""
+    if matcher is None:
+        matcher = MarkerMatcher(marker_map.keys())
+    if counts is None:
+        counts = {}
+
+    pieces = []
+    last = 0
+    for start, end, marker in matcher.finditer(text):
+        pieces.append(text[last:start])
+        pieces.append(marker_map[marker])
+        counts[marker] = counts.get(marker, 0) + 1
+        last = end
+    if not pieces:
+        return text, counts
+    pieces.append(text[last:])
+    return "".join(pieces), counts
+
+
+def replace_markers_in_xml(xml_text, marker_map, matcher=None, counts=None):
+    """HWPX 섹션 XML의 텍스트 노드에 있는 마커만 한 번의 스캔으로 치환하는 함수
+
+    태그 이름이나 속성 값, 엔티티·문자 참조(&#9; 등)는 건드리지 않으며,
+    치환 텍스트는 XML 이스케이프된다.
+    한 마커가 여러 run(<hp:t>)으로 쪼개져 있으면 찾지 못한다.
+    """
+    if matcher is None:
+        matcher = MarkerMatcher(marker_map.keys())
+    if counts is None:
+        counts = {}
+    escaped_map = {marker: escape(str(content)) for marker, content in marker_map.items()}
+
+    pieces = []
+    last = 0
+    for start, end, marker in iter_markers_in_xml(xml_text, matcher):
+        pieces.append(xml_text[last:start])
+        pieces.append(escaped_map[marker])
+        counts[marker] = counts.get(marker, 0) + 1
+        last = end
+    if not pieces:
+        return xml_text, counts
+    pieces.append(xml_text[last:])
+    return "".join(pieces), counts
+
+
+def _iter_xml_text(xml_text):
+    """텍스트 노드를 엔티티·문자 참조로 나눈 (시작 위치, 조각) 을 반환하는 함수"""
+    for node in _XML_TEXT_PATTERN.finditer(xml_text):
+        start, end = node.span(1)
+        for entity in _XML_ENTITY_PATTERN.finditer(xml_text, start, end):
+            if entity.start() > start:
+                yield start, xml_text[start:entity.start()]
+            start = entity.end()
+        if start < end:
+            yield start, xml_text[start:end]
+
+
+def iter_markers_in_xml(xml_text, matcher):
+    """섹션 XML 텍스트 노드 안의 마커를 (시작, 끝, 마커) 로 반환하는 함수 (XML 전체 기준 위치)
+
+    엔티티·문자 참조와 겹치는 부분은 마커로 보지 않는다 ('#' 이 '&#9;' 를 깨뜨리지 않도록).
+    """
+    for base, text in _iter_xml_text(xml_text):
+        for start, end, marker in matcher.finditer(text):
+            yield base + start, base + end, marker
+
+
+def replace_markers_with_hwp(hwp, marker_map, log=print):
+    """한/글 COM 객체에 마커 맵 전체를 삽입하는 대체 경로 (pyhwpx)
+
+    HWPX 직접 처리가 불가능한 .hwp 템플릿용이다. 긴 마커부터 처리해
+    'AA' 가 'AAA' 의 일부를 먼저 덮어쓰는 일을 막는다.
+    마커마다 문서 처음에서 앞으로만 찾으므로('AllDoc' 처럼 되돌아가지 않음),
+    삽입한 내용에 같은 마커가 들어 있어도 다시 찾아 무한 반복하지 않는다.
+    """
+    counts = {}
+    tracer = get_tracer()
+    for marker in sorted(marker_map, key=len, reverse=True):
+        content = marker_map[marker]
+        if not marker:
+            continue
+        started = tracer.now()
+        hwp.MoveDocBegin()
+        while hwp.find(marker, direction='Forward'):
+            hwp.insert_text(content)
+            counts[marker] = counts.get(marker, 0) + 1
+            if log:
+                log(f"  - 성공: '{marker}' 위치에 '{content}'을(를) 삽입했습니다.")
+        tracer.record("hwp.insert", started, marker=marker, count=counts.get(marker, 0), chars=len(str(content)))
+    return counts
+
+
+# removed: 마커별 제거 횟수, searches: 한/글 문서 전체 찾기 호출 수,
+# scanned: 문서 텍스트를 미리 훑었는지 (False 면 모든 마커를 하나씩 찾음)
+SweepReport = namedtuple("SweepReport", ["removed", "searches", "scanned"])
+
+
+def _delete_selection(hwp, marker):
+    hwp.Delete()
+
+
+def erase_marker_line(hwp, marker):
+    """찾아서 선택된 마커를 지우고 그 줄과 이어지는 빈 줄까지 지우는 함수 (sweep_residual_markers 의 remove 용)"""
+    hwp.Erase()
+    hwp.DeleteLine()
+    hwp.DeleteLine()
+
+
+def document_text(hwp):
+    """한/글 문서 전체 텍스트를 한 번에 읽는 함수 (읽을 수 없으면 None)"""
+    try:
+        return hwp.GetTextFile("TEXT", "")
+    except Exception:
+        return None
+
+
+def sweep_residual_markers(hwp, markers, remove=_delete_selection, log=print):
+    """한/글 문서에 남은 마커를 한 번에 찾아 지우고 SweepReport 를 반환하는 함수
+
+    마커마다 문서 전체를 찾던 방식(A1~Z9 이면 234번) 대신, 문서 텍스트를 한 번 읽어
+    Aho–Corasick 매처로 남아 있는 마커만 골라낸 뒤 그 마커만 찾아 지운다.
+    remove(hwp, marker) 는 찾아서 선택된 마커 하나를 지우는 함수이다 (기본: 선택 영역 삭제).
+    markers 순서대로 지우므로 '#' 같은 강조 문자는 마지막에 둔다.
+    문서 텍스트를 읽지 못하면 모든 마커를 하나씩 찾는다.
+    """
+    tracer = get_tracer()
+    started = tracer.now()
+    matcher = MarkerMatcher(markers)
+    text = document_text(hwp)
+    if text is None:
+        present = matcher.markers
+    else:
+        found = {marker for _, _, marker in matcher.finditer(text)}
+        present = [marker for marker in matcher.markers if marker in found]
+
+    removed = {}
+    searches = 0
+    for marker in present:
+        while True:
+            searches += 1
+            if not hwp.find(marker, direction='AllDoc'):
+                break
+            remove(hwp, marker)
+            removed[marker] = removed.get(marker, 0) + 1
+
+    report = SweepReport(removed, searches, text is not None)
+    tracer.record("hwp.sweep", started, markers=len(matcher.markers), removed=sum(removed.values()), searches=searches)
+    if log:
+        log(format_sweep_report(report))
+    return report
+
+
+def format_sweep_report(report):
+    """SweepReport 를 한 줄 요약으로 만드는 함수"""
+    if not report.removed:
+        summary = "없음"
+    else:
+        summary = ", ".join(f"{marker}×{count}" for marker, count in report.removed.items())
+    return f"  - 잔여 마커 제거: {summary} (문서 찾기 {report.searches}회)"
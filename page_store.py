@@ -0,0 +1,278 @@
+import json
+import mmap
+import os
+import sys
+import tempfile
+from array import array
+from bisect import bisect_right
+from collections.abc import Sequence
+
+#==============================================================================
+# 메모리 매핑 페이지 텍스트 저장소
+#   - PDF 한 개의 페이지 텍스트(원문·정제)를 'UTF-8 블롭 하나 + 페이지 오프셋 배열' 파일로 저장한다.
+#   - 읽을 때는 파일을 mmap 으로 열고 필요한 페이지만 그때그때 디코딩하므로, 자료가 5개든
+#     500개든 프로세스가 들고 있는 텍스트는 지금 다루는 페이지 몇 장뿐이다.
+#     같은 파일을 여러 작업자가 열어도 운영체제 페이지 캐시를 함께 쓴다.
+#   - MappedText 는 여러 페이지를 구분자로 이은 텍스트를 문자열로 만들지 않고
+#     len·슬라이싱만 제공한다 (TextCorpus 조각, context_packer 조각 나누기에 사용).
+#
+#   파일 구조: MAGIC | 헤더 길이(uint32 LE) | 헤더 JSON | 8바이트 정렬 |
+#             종류별 [바이트 오프셋 uint64 × (페이지 수 + 1), 문자 오프셋 uint64 × (페이지 수 + 1)] | 블롭
+#==============================================================================
+
+MAGIC = b"PGTX"
+FORMAT_VERSION = 1
+PAGE_FILE_SUFFIX = ".pages"
+
+_OFFSET_TYPECODE = 'Q'
+
+
+def _offsets(values):
+    offsets = array(_OFFSET_TYPECODE, values)
+    if sys.byteorder != 'little':
+        offsets.byteswap()
+    return offsets
+
+
+def write_page_file(path, kinds, **metadata):
+    """{종류: 페이지 텍스트 목록} 을 페이지 파일 하나로 원자적으로 저장하는 함수
+
+    종류마다 페이지 수가 같아야 한다 (예: raw, cleaned). metadata 는 헤더에 함께 저장된다.
+    """
+    names = list(kinds)
+    counts = {len(pages) for pages in kinds.values()}
+    if len(counts) > 1:
+        raise ValueError(f"종류별 페이지 수가 다릅니다: {', '.join(f'{n}={len(kinds[n])}' for n in names)}")
+    page_count = counts.pop() if counts else 0
+
+    encoded = {name: [text.encode('utf-8') for text in kinds[name]] for name in names}
+    tables = []
+    position = 0
+    for name in names:
+        byte_offsets, char_offsets = [position], [0]
+        for text, data in zip(kinds[name], encoded[name]):
+            position += len(data)
+            byte_offsets.append(position)
+            char_offsets.append(char_offsets[-1] + len(text))
+        tables.append(_offsets(byte_offsets))
+        tables.append(_offsets(char_offsets))
+
+    header = json.dumps({"format": FORMAT_VERSION, "kinds": names, "pages": page_count, **metadata},
+                        ensure_ascii=False).encode('utf-8')
+    prefix = MAGIC + len(header).to_bytes(4, 'little') + header
+    prefix += b"\0" * (-len(prefix) % 8)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(prefix)
+            for table in tables:
+                f.write(table.tobytes())
+            for name in names:
+                for data in encoded[name]:
+                    f.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
+
+class PageFile:
+    """mmap 으로 연 페이지 파일 (종류별 페이지는 pages(종류) 로 읽음)"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            # 빈 파일은 mmap 할 수 없으므로 바로 형식 오류로 처리한다
+            if size < len(MAGIC) + 4:
+                raise ValueError(f"페이지 파일이 아닙니다: {path}")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if self._map[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"페이지 파일이 아닙니다: {path}")
+            header_end = len(MAGIC) + 4 + int.from_bytes(self._map[len(MAGIC):len(MAGIC) + 4], 'little')
+            self.header = json.loads(self._map[len(MAGIC) + 4:header_end].decode('utf-8'))
+            if self.header.get("format") != FORMAT_VERSION:
+                raise ValueError(f"지원하지 않는 페이지 파일 형식입니다: {self.header.get('format')}")
+            self.page_count = self.header["pages"]
+            position = header_end + (-header_end % 8)
+            table_bytes = (self.page_count + 1) * array(_OFFSET_TYPECODE).itemsize
+            self._tables = {}
+            for name in self.header["kinds"]:
+                tables = []
+                for _ in range(2):
+                    table = array(_OFFSET_TYPECODE)
+                    table.frombytes(self._map[position:position + table_bytes])
+                    if sys.byteorder != 'little':
+                        table.byteswap()
+                    tables.append(table)
+                    position += table_bytes
+                self._tables[name] = tuple(tables)
+            self._blob_start = position
+        except Exception:
+            self._map.close()
+            raise
+
+    @property
+    def kinds(self):
+        return list(self._tables)
+
+    def pages(self, kind):
+        """kind 종류의 페이지를 지연 디코딩하는 MappedPages"""
+        if kind not in self._tables:
+            raise KeyError(f"페이지 파일에 '{kind}' 종류가 없습니다: {self.path}")
+        return MappedPages(self, kind)
+
+    def _page(self, kind, index):
+        byte_offsets = self._tables[kind][0]
+        start = self._blob_start + byte_offsets[index]
+        return self._map[start:self._blob_start + byte_offsets[index + 1]].decode('utf-8')
+
+    def _char_offsets(self, kind):
+        return self._tables[kind][1]
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __repr__(self):
+        return f"PageFile({os.path.basename(self.path)}, {self.page_count} pages, {', '.join(self.kinds)})"
+
+
+class MappedPages(Sequence):
+    """페이지 파일의 한 종류 페이지 목록 (인덱싱할 때마다 그 페이지만 디코딩)"""
+
+    def __init__(self, page_file, kind):
+        self.page_file = page_file
+        self.kind = kind
+
+    def __len__(self):
+        return self.page_file.page_count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.page_file._page(self.kind, i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("page index out of range")
+        return self.page_file._page(self.kind, index)
+
+    def page_length(self, index):
+        """index 페이지의 문자 수 (디코딩하지 않음)"""
+        offsets = self.page_file._char_offsets(self.kind)
+        return offsets[index + 1] - offsets[index]
+
+    @property
+    def char_count(self):
+        return self.page_file._char_offsets(self.kind)[-1]
+
+    def joined(self, sep=" ", skip_empty=True):
+        """페이지를 sep 로 이은 텍스트 (문자열로 만들지 않는 MappedText)"""
+        indexes = [i for i in range(len(self)) if not skip_empty or self.page_length(i)]
+        return MappedText(self, indexes, sep)
+
+
+class MappedText:
+    """여러 페이지를 구분자로 이은 텍스트를 문자열로 만들지 않고 다루는 객체
+
+    len, 정수·슬라이스 인덱싱(간격 1), str 을 지원한다. 슬라이싱은 겹치는 페이지만 디코딩한다.
+    """
+
+    def __init__(self, pages, indexes, sep=" "):
+        self.pages = pages
+        self.sep = sep
+        self._indexes = list(indexes)
+        self._starts = []
+        self._lengths = []
+        position = 0
+        for number, index in enumerate(self._indexes):
+            if number:
+                position += len(sep)
+            length = pages.page_length(index)
+            self._starts.append(position)
+            self._lengths.append(length)
+            position += length
+        self._length = position
+        self._last = (None, "")  # 마지막으로 디코딩한 페이지 (연속된 슬라이싱에서 재사용)
+
+    def __len__(self):
+        return self._length
+
+    def __bool__(self):
+        return self._length > 0
+
+    def _text(self, number):
+        if self._last[0] != number:
+            self._last = (number, self.pages[self._indexes[number]])
+        return self._last[1]
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            if key < 0:
+                key += self._length
+            if not 0 <= key < self._length:
+                raise IndexError("MappedText index out of range")
+            return self.slice(key, key + 1)
+        if not isinstance(key, slice):
+            raise TypeError(f"MappedText indices must be integers or slices, not {type(key).__name__}")
+        start, stop, step = key.indices(self._length)
+        if step != 1:
+            return str(self)[key]
+        return self.slice(start, stop)
+
+    def slice(self, start, stop):
+        """[start, stop) 구간을 겹치는 페이지만 디코딩해 반환하는 함수"""
+        if stop <= start:
+            return ""
+        pieces = []
+        number = max(0, bisect_right(self._starts, start) - 1)
+        position = start
+        while number < len(self._indexes) and position < stop:
+            page_start = self._starts[number]
+            page_end = page_start + self._lengths[number]
+            if position < page_end:
+                end = min(stop, page_end)
+                pieces.append(self._text(number)[position - page_start:end - page_start])
+                position = end
+            if number + 1 < len(self._indexes) and position < stop:
+                sep_end = self._starts[number + 1]
+                if position < sep_end:
+                    end = min(stop, sep_end)
+                    pieces.append(self.sep[position - page_end:end - page_end])
+                    position = end
+            number += 1
+        return "".join(pieces)
+
+    def __iter__(self):
+        # 문자 단위가 아니라 페이지·구분자 조각 단위로 내보낸다 ("".join(text) == str(text))
+        for number in range(len(self._indexes)):
+            if number:
+                yield self.sep
+            yield self.pages[self._indexes[number]]
+
+    def __str__(self):
+        return "".join(self)
+
+    def __format__(self, format_spec):
+        return format(str(self), format_spec)
+
+    def __repr__(self):
+        return f"MappedText({len(self._indexes)} pages, {self._length:,} chars)"
+
+
+def open_page_file(path):
+    """페이지 파일을 열어 PageFile 로 반환하는 함수 (없거나 형식이 다르면 None)"""
+    try:
+        return PageFile(path)
+    except (OSError, ValueError, KeyError):
+        return None
@@ -0,0 +1,239 @@
+import hashlib
+import os
+import re
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import PyPDF2 as pdf_lib
+except ImportError:
+    import pypdf as pdf_lib
+
+from page_store import PAGE_FILE_SUFFIX, open_page_file, write_page_file
+from tracing import get_tracer
+
+#==============================================================================
+# PDF 텍스트 추출 및 디스크 캐시
+#   - 파일 내용 해시(SHA-256)와 추출기 버전을 키로, 페이지별 원문/정제 텍스트를 저장한다.
+#   - 내용이 같은 파일은 다시 파싱하지 않고, 바뀐 파일은 자동으로 다시 추출한다.
+#   - 캐시 항목은 페이지 파일(page_store: UTF-8 블롭 + 오프셋 배열)로 저장하고 mmap 으로 읽으므로
+#     캐시에서 가져온 페이지 목록은 인덱싱할 때만 디코딩된다.
+#==============================================================================
+
+# 추출 방식이나 정제 규칙을 바꾸면 CLEAN_VERSION 을 올려서 기존 캐시를 무효화한다.
+CLEAN_VERSION = 1
+EXTRACTOR_VERSION = f"{pdf_lib.__name__}-{getattr(pdf_lib, '__version__', '0')}-clean{CLEAN_VERSION}"
+
+DEFAULT_CACHE_DIR = os.getenv(
+    "PDF_TEXT_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".llm_docwriter_cache", "pdf_text"),
+)
+
+# raw/cleaned: 페이지 텍스트 목록 (캐시에서 읽었으면 지연 디코딩하는 page_store.MappedPages)
+PdfPages = namedtuple("PdfPages", ["path", "sha256", "raw", "cleaned", "cached"])
+# 스트리밍 추출 결과: 파일 처리에 실패하면 page 가 None 이고 error 에 예외가 담긴다.
+# sha256 은 캐시 키이며, 파일을 끝까지 읽은 뒤 load_document_text 로 전체 텍스트를 가져올 때 쓴다.
+PageText = namedtuple("PageText", ["path", "page", "page_count", "raw", "cleaned", "cached", "error", "sha256"])
+
+# 프로세스 하나가 한 번에 처리할 페이지 수
+PAGES_PER_TASK = 8
+
+
+def clean_text(text):
+    """정제 과정: 필요한 특수문자만 유지하고 중복 공백을 제거하는 함수"""
+    cleaned = re.sub(r'[^\w\s가-힣.,!?;:\'"""''·()\[\]{} -]', ' ', text)
+    return re.sub(r'\s+', ' ', cleaned).strip()
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """파일 내용의 SHA-256 해시를 계산하는 함수"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def extract_pages(path):
+    """PDF 각 페이지의 텍스트를 추출하는 함수 (페이지당 extract_text 1회)"""
+    with open(path, 'rb') as file:
+        reader = pdf_lib.PdfReader(file)
+        return [page.extract_text() or "" for page in reader.pages]
+
+
+def count_pages(path):
+    """PDF 페이지 수를 세는 함수"""
+    with open(path, 'rb') as file:
+        return len(pdf_lib.PdfReader(file).pages)
+
+
+def _extract_page_range(path, start, stop):
+    """작업 프로세스에서 지정한 페이지 범위의 원문/정제 텍스트를 추출하는 함수"""
+    with open(path, 'rb') as file:
+        reader = pdf_lib.PdfReader(file)
+        raw_pages = [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+    return raw_pages, [clean_text(text) for text in raw_pages]
+
+
+class PdfTextCache:
+    """파일 내용 해시 기반 PDF 텍스트 캐시
+
+    열어 둔 페이지 파일은 해시별로 하나만 유지해, 같은 PDF 를 여러 작업자(스레드)가
+    읽어도 매핑 하나를 함께 쓴다.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, version=EXTRACTOR_VERSION):
+        self.cache_dir = cache_dir
+        self.version = version
+        self._files = {}
+        self._lock = threading.Lock()
+
+    def _entry_path(self, digest):
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}{PAGE_FILE_SUFFIX}")
+
+    def get(self, digest):
+        """캐시된 페이지 파일(page_store.PageFile)을 여는 함수 (없거나 추출기 버전이 다르면 None)"""
+        with self._lock:
+            entry = self._files.get(digest)
+            if entry is not None:
+                return entry
+            entry = open_page_file(self._entry_path(digest))
+            if entry is None:
+                return None
+            if entry.header.get("version") != self.version or set(entry.kinds) != {"raw", "cleaned"}:
+                entry.close()
+                return None
+            self._files[digest] = entry
+            return entry
+
+    def close(self):
+        """열어 둔 페이지 파일 매핑을 모두 닫는 함수 (이후 이 캐시에서 받은 페이지 목록은 쓸 수 없음)"""
+        with self._lock:
+            for entry in self._files.values():
+                entry.close()
+            self._files = {}
+
+    def put(self, digest, raw_pages, cleaned_pages, source=""):
+        """추출 결과를 페이지 파일로 원자적으로 저장하는 함수"""
+        write_page_file(self._entry_path(digest), {"raw": raw_pages, "cleaned": cleaned_pages},
+                        version=self.version, sha256=digest, source=os.path.basename(source))
+
+    def load(self, path):
+        """PDF 페이지 텍스트를 캐시에서 읽거나, 없으면 추출 후 저장하는 함수"""
+        tracer = get_tracer()
+        started = tracer.now()
+        digest = file_sha256(path)
+        entry = self.get(digest)
+        if entry is not None:
+            tracer.record("pdf.extract", started, file=os.path.basename(path), pages=entry.page_count, cached=True)
+            return PdfPages(path, digest, entry.pages("raw"), entry.pages("cleaned"), True)
+
+        raw_pages = extract_pages(path)
+        cleaned_pages = [clean_text(text) for text in raw_pages]
+        tracer.record("pdf.extract", started, file=os.path.basename(path), pages=len(raw_pages), cached=False)
+        try:
+            self.put(digest, raw_pages, cleaned_pages, source=path)
+        except OSError as e:
+            print(f"  - 경고: PDF 텍스트 캐시 저장 실패 ({os.path.basename(path)}): {e}")
+            return PdfPages(path, digest, raw_pages, cleaned_pages, False)
+        # 저장했으면 메모리의 목록 대신 매핑된 페이지를 돌려준다
+        entry = self.get(digest)
+        if entry is None:
+            return PdfPages(path, digest, raw_pages, cleaned_pages, False)
+        return PdfPages(path, digest, entry.pages("raw"), entry.pages("cleaned"), False)
+
+
+_default_cache = None
+
+
+def default_cache():
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = PdfTextCache()
+    return _default_cache
+
+
+def load_pdf_pages(path, cache=None):
+    """기본 캐시를 사용해 PDF 페이지 텍스트를 가져오는 함수"""
+    return (cache or default_cache()).load(path)
+
+
+def load_document_text(digest, cache=None, sep=" "):
+    """캐시에 있는 PDF 의 정제 텍스트 전체(빈 페이지 제외, sep 로 연결)를 반환하는 함수
+
+    문자열을 만들지 않는 page_store.MappedText 를 반환하며, 캐시에 없으면 None 이다.
+    """
+    entry = (cache or default_cache()).get(digest)
+    if entry is None:
+        return None
+    return entry.pages("cleaned").joined(sep)
+
+
+def iter_pdf_pages(paths, cache=None, max_workers=None, pages_per_task=PAGES_PER_TASK):
+    """여러 PDF의 페이지를 프로세스 풀에서 병렬 추출하고 파일·페이지 순서대로 내보내는 함수
+
+    캐시에 있는 파일은 바로 내보내고, 나머지는 페이지 범위 단위로 나눠 모든 작업을
+    먼저 제출한 뒤 순서대로 결과를 기다리므로 코어 수만큼 동시에 추출된다.
+    새로 추출한 파일은 마지막 페이지까지 끝나면 캐시에 저장한다.
+    """
+    cache = cache or default_cache()
+
+    # 1. 모든 파일의 작업을 먼저 제출
+    # 작업자 프로세스의 span 은 모으지 않고, 제출부터 마지막 결과 수신까지를 파일 단위 span 으로 남긴다.
+    tracer = get_tracer()
+    plans = []
+    executor = None
+    try:
+        for path in paths:
+            submitted = tracer.now()
+            try:
+                digest = file_sha256(path)
+                entry = cache.get(digest)
+                if entry is not None:
+                    tracer.record("pdf.extract", submitted, file=os.path.basename(path),
+                                  pages=entry.page_count, cached=True)
+                    plans.append((path, digest, entry, None, None, submitted))
+                    continue
+                page_count = count_pages(path)
+                if executor is None:
+                    executor = ProcessPoolExecutor(max_workers=max_workers)
+                futures = [executor.submit(_extract_page_range, path, start, min(start + pages_per_task, page_count))
+                           for start in range(0, page_count, pages_per_task)]
+                plans.append((path, digest, None, futures, page_count, submitted))
+            except Exception as e:
+                plans.append((path, None, None, e, 0, submitted))
+
+        # 2. 파일·페이지 순서대로 결과를 내보냄
+        for path, digest, entry, work, page_count, submitted in plans:
+            if isinstance(work, Exception):
+                tracer.record("pdf.extract", submitted, error=work, file=os.path.basename(path))
+                yield PageText(path, None, 0, "", "", False, work, digest)
+                continue
+
+            if entry is not None:
+                for page, (raw, cleaned) in enumerate(zip(entry.pages("raw"), entry.pages("cleaned"))):
+                    yield PageText(path, page, entry.page_count, raw, cleaned, True, None, digest)
+                continue
+
+            raw_pages, cleaned_pages = [], []
+            try:
+                for future in work:
+                    raw_part, cleaned_part = future.result()
+                    for raw, cleaned in zip(raw_part, cleaned_part):
+                        yield PageText(path, len(raw_pages), page_count, raw, cleaned, False, None, digest)
+                        raw_pages.append(raw)
+                        cleaned_pages.append(cleaned)
+            except Exception as e:
+                tracer.record("pdf.extract", submitted, error=e, file=os.path.basename(path), pages=page_count)
+                yield PageText(path, None, page_count, "", "", False, e, digest)
+                continue
+            tracer.record("pdf.extract", submitted, file=os.path.basename(path), pages=page_count, cached=False)
+
+            try:
+                cache.put(digest, raw_pages, cleaned_pages, source=path)
+            except OSError as e:
+                print(f"  - 경고: PDF 텍스트 캐시 저장 실패 ({os.path.basename(path)}): {e}")
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
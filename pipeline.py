@@ -0,0 +1,344 @@
+import asyncio
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from file_readiness import ACTIVE, FAILED, ReadinessTracker
+from tracing import get_tracer
+from upload_scheduler import AdaptiveUploadScheduler
+
+#==============================================================================
+# asyncio 파이프라인 엔진 (CLI 스크립트와 두 GUI 공용)
+#   - 수집 → 업로드 → 생성 → 파싱 → 삽입 흐름을 단계(stage)로 나누고,
+#     단계 사이를 크기 제한 큐로 이어 앞 단계가 너무 앞서 나가지 않게 한다.
+#   - 블로킹 SDK 호출(업로드·상태 조회·LLM 요청)은 스레드에서, 문서 작성은
+#     지정한 실행기(프로세스 풀 등)에서 실행해 I/O 단계가 서로 겹쳐 진행된다.
+#   - 한 항목이 실패해도 나머지 항목은 계속 흘러간다 (결과에 오류와 단계 이름을 남김).
+#==============================================================================
+
+# 단계 사이 큐의 기본 크기
+DEFAULT_QUEUE_SIZE = 4
+# 업로드할 수 있는 파일 크기 상한 (Gemini 파일 API)
+MAX_UPLOAD_BYTES = 200 * 1024 * 1024
+
+# index: 입력 순서, item: 원래 입력, value: 마지막 단계의 결과, error: 실패 시 예외, stage: 마지막으로 실행한 단계
+StageResult = namedtuple("StageResult", ["index", "item", "value", "error", "stage"])
+# func(value) 는 일반 함수(스레드/executor 에서 실행) 또는 코루틴 함수
+Stage = namedtuple("Stage", ["name", "func", "workers", "executor"])
+
+_DONE = object()
+
+
+class Pipeline:
+    """단계 사이를 크기 제한 asyncio.Queue 로 잇는 파이프라인
+
+    add_stage 로 단계를 순서대로 등록하고 run(items) 로 실행한다. 각 단계의 반환값이
+    다음 단계의 입력이 되며, on_result(StageResult) 는 항목이 끝날 때마다 호출 스레드에서 호출된다.
+    """
+
+    def __init__(self, queue_size=DEFAULT_QUEUE_SIZE, on_result=None):
+        self.queue_size = queue_size
+        self.on_result = on_result
+        self.stages = []
+        self.stats = {}  # 단계 이름 → [처리 수, 작업 시간 합(초)]
+        self.elapsed = 0.0
+
+    def add_stage(self, name, func, workers=1, executor=None):
+        self.stages.append(Stage(name, func, max(1, workers), executor))
+        self.stats[name] = [0, 0.0]
+        return self
+
+    async def _call(self, stage, value, threads):
+        if asyncio.iscoroutinefunction(stage.func):
+            return await stage.func(value)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(stage.executor or threads, stage.func, value)
+
+    async def _worker(self, stage, inbox, outbox, threads, finish, lane):
+        stats = self.stats[stage.name]
+        tracer = get_tracer()
+        while True:
+            entry = await inbox.get()
+            if entry is _DONE:
+                return
+            index, item, value = entry
+            started = time.monotonic()
+            span_start = tracer.now()
+            try:
+                value = await self._call(stage, value, threads)
+            except Exception as e:
+                tracer.record(f"pipeline.{stage.name}", span_start, error=e, lane=lane, item=index)
+                finish(StageResult(index, item, None, e, stage.name))
+                continue
+            finally:
+                stats[0] += 1
+                stats[1] += time.monotonic() - started
+            tracer.record(f"pipeline.{stage.name}", span_start, lane=lane, item=index)
+            if outbox is None:
+                finish(StageResult(index, item, value, None, stage.name))
+            else:
+                await outbox.put((index, item, value))
+
+    async def _run_stage(self, stage, inbox, outbox, next_workers, threads, finish):
+        await asyncio.gather(*(self._worker(stage, inbox, outbox, threads, finish, f"{stage.name}-{k + 1}")
+                               for k in range(stage.workers)))
+        if outbox is not None:
+            for _ in range(next_workers):
+                await outbox.put(_DONE)
+
+    async def run_async(self, items):
+        """모든 항목을 처리하고 입력 순서대로 정렬된 StageResult 목록을 반환하는 함수"""
+        items = list(items)
+        results = []
+        if not self.stages or not items:
+            return results
+
+        def finish(result):
+            results.append(result)
+            if self.on_result:
+                self.on_result(result)
+
+        started = time.monotonic()
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+        threads = ThreadPoolExecutor(max_workers=sum(s.workers for s in self.stages if s.executor is None) or 1)
+        try:
+            runners = []
+            for k, stage in enumerate(self.stages):
+                last = k == len(self.stages) - 1
+                outbox = None if last else queues[k + 1]
+                next_workers = 0 if last else self.stages[k + 1].workers
+                runners.append(self._run_stage(stage, queues[k], outbox, next_workers, threads, finish))
+
+            async def _feed():
+                for index, item in enumerate(items):
+                    await queues[0].put((index, item, item))
+                for _ in range(self.stages[0].workers):
+                    await queues[0].put(_DONE)
+
+            await asyncio.gather(_feed(), *runners)
+        finally:
+            threads.shutdown(wait=False)
+            self.elapsed = time.monotonic() - started
+        return sorted(results, key=lambda result: result.index)
+
+    def run(self, items):
+        """run_async 를 새 이벤트 루프에서 실행하는 함수 (스크립트·QThread 에서 호출)"""
+        return asyncio.run(self.run_async(items))
+
+    def summary(self):
+        """단계별 처리 수와 작업 시간 요약 문자열"""
+        parts = [f"{name} {count}건 {busy:.1f}초" for name, (count, busy) in self.stats.items()]
+        return f"파이프라인 {self.elapsed:.1f}초 (" + ", ".join(parts) + ")"
+
+
+def run_concurrently(*funcs):
+    """블로킹 함수들을 동시에 실행하고 결과를 순서대로 반환하는 함수 (PDF 수집과 업로드를 겹칠 때 사용)"""
+    async def _main():
+        return await asyncio.gather(*(asyncio.to_thread(func) for func in funcs))
+    return asyncio.run(_main())
+
+
+# label: 진행 메시지(없으면 None), progress: 요청 시작 진행률,
+# prompt: 요청 내용 (호출 가능한 값이면 요청 직전에 호출해 얻는다 — 예: 첨부 파일 업로드 대기),
+# parse: 응답 처리 함수 parse(text, progress), parse_progress: 파싱 진행률
+PromptStep = namedtuple("PromptStep", ["label", "progress", "prompt", "parse", "parse_progress"])
+
+
+def run_prompt_steps(steps, ask, on_progress=None):
+    """대화형 요청 단계들을 생성 → 파싱 두 단계 파이프라인으로 실행하는 함수
+
+    ask(step) 는 응답 텍스트(없으면 None)를 반환하며, 대화 순서를 지키도록 한 번에 하나씩 실행한다.
+    앞 요청의 응답 파싱은 다음 요청의 생성과 겹쳐 진행된다. 뒤 요청은 앞 대화에 이어지므로
+    한 요청이 실패하면 남은 요청은 보내지 않으며, 실패한 단계가 있으면 첫 오류를 다시 발생시킨다.
+    """
+    failed = []
+
+    def _generate(step):
+        if failed:
+            return step, None
+        if step.label and on_progress:
+            on_progress(step.label, step.progress)
+        try:
+            if callable(step.prompt):
+                step = step._replace(prompt=step.prompt())
+            return step, ask(step)
+        except Exception:
+            failed.append(step)
+            raise
+
+    def _parse(generated):
+        step, text = generated
+        if text:
+            step.parse(text, step.parse_progress)
+
+    pipeline = Pipeline().add_stage("generate", _generate).add_stage("parse", _parse)
+    results = pipeline.run(steps)
+    for result in results:
+        if result.error is not None:
+            raise result.error
+    return pipeline
+
+
+#==============================================================================
+# 공용 단계: 업로드 대상 선택 → 업로드(AIMD) → 처리 완료 대기
+#==============================================================================
+
+def select_uploadable_files(file_paths, log=print, indent="  "):
+    """업로드할 수 있는 파일만 골라내는 함수 (없는 파일, 200MB 초과 파일 제외)"""
+    selected = []
+    for file_path in file_paths:
+        if not os.path.exists(file_path):
+            log(f"{indent}- 경고: '{os.path.basename(file_path)}' 파일을 찾을 수 없어 건너뜁니다.")
+            continue
+        if os.path.getsize(file_path) > MAX_UPLOAD_BYTES:
+            log(f"{indent}- 경고: '{os.path.basename(file_path)}' 파일 크기가 200MB를 초과하여 건너뜁니다.")
+            continue
+        selected.append(file_path)
+    return selected
+
+
+def report_upload(file_path, result, timing, log=print, indent="  "):
+    """업로드 결과와 파일별 소요 시간을 출력하고 원격 파일 객체를 반환하는 함수
+
+    이전 실행에서 올린 같은 내용의 파일이 아직 유효하면 업로드 없이 재사용된다.
+    """
+    if timing.error is not None:
+        log(f"{indent}- 업로드 실패: {os.path.basename(file_path)} - {timing.error}")
+        return None
+
+    file_response, reused = result
+    if reused:
+        log(f"{indent}- 재사용: {file_response.display_name} (이전 업로드)")
+    else:
+        log(f"{indent}- 업로드 완료: {file_response.display_name} "
+            f"({timing.size / 1024 / 1024:.1f}MB, {timing.seconds:.1f}초, 동시 {timing.concurrency}개)")
+    return file_response
+
+
+def report_processing(event, log=print, indent="  "):
+    """파일 처리 결과(FileEvent) 한 건을 출력하는 함수"""
+    if event.state == ACTIVE:
+        log(f"{indent}- {event.file.display_name} 처리 완료 ({event.elapsed:.0f}초)")
+    elif event.state == FAILED:
+        log(f"{indent}- 경고: {event.file.display_name} 처리 실패")
+    else:
+        log(f"{indent}- {event.file.display_name} 처리 시간 초과")
+
+
+def wait_for_file_processing(tracker, log=print, indent="  "):
+    """업로드된 파일들의 처리 완료를 기다리며 결과를 출력하고, 준비된 파일 목록을 반환하는 함수"""
+    for event in tracker.events():
+        report_processing(event, log, indent)
+    return tracker.ready_files()
+
+
+class SourceUploads:
+    """백그라운드에서 진행 중인 업로드·처리 대기 (start_uploads 가 반환)
+
+    wait(paths) 는 그 로컬 파일들만 결정(준비·실패·건너뜀)되면 바로 준비된 원격 파일 목록을
+    돌려주므로, 요청마다 자기 첨부 파일만 기다리고 나머지 업로드와 겹쳐 시작할 수 있다.
+    result() 는 모든 업로드가 끝날 때까지 기다려 요약을 출력하고 준비된 파일 전체를 반환한다.
+    """
+
+    def __init__(self, file_paths, uploader, uploaded=None, log=print, indent="  "):
+        self.uploaded = uploaded if uploaded is not None else []
+        self.log = log
+        self.indent = indent
+        self.file_paths = select_uploadable_files(file_paths, log, indent)
+        self.tracker = ReadinessTracker(uploader.files_api).start()
+        self._uploader = uploader
+        self._cond = threading.Condition()
+        self._names = {}   # 로컬 경로 → 원격 파일 이름
+        self._paths = {}   # 원격 파일 이름 → 로컬 경로
+        self._done = set()  # 결정된 로컬 경로
+        self._result = None
+        self._pool = ThreadPoolExecutor(max_workers=2)
+        # 처리 상태 이벤트는 업로드와 동시에 별도 스레드에서 읽는다
+        self._uploading = self._pool.submit(self._upload)
+        self._watching = self._pool.submit(self._watch)
+
+    def _resolve(self, path):
+        with self._cond:
+            self._done.add(path)
+            self._cond.notify_all()
+
+    def _upload(self):
+        try:
+            scheduler = AdaptiveUploadScheduler(self._uploader.upload)
+            for file_path, result, timing in scheduler.run(self.file_paths):
+                file_response = report_upload(file_path, result, timing, self.log, self.indent)
+                if not file_response:
+                    self._resolve(file_path)
+                    continue
+                self.uploaded.append(file_response)
+                with self._cond:
+                    self._names[file_path] = file_response.name
+                    self._paths[file_response.name] = file_path
+                self.tracker.add(file_response)
+            self.log(f"{self.indent}- {scheduler.summary()}")
+        finally:
+            self.tracker.close()
+            with self._cond:
+                # 업로드 도중 오류가 나도 기다리는 요청이 멈추지 않도록 올리지 못한 파일은 결정된 것으로 본다
+                self._done.update(path for path in self.file_paths if path not in self._names)
+                self._cond.notify_all()
+
+    def _watch(self):
+        for event in self.tracker.events():
+            report_processing(event, self.log, self.indent)
+            with self._cond:
+                path = self._paths.get(event.file.name)
+                if path is not None:
+                    self._done.add(path)
+                self._cond.notify_all()
+
+    def wait(self, paths=None, timeout=None):
+        """paths(로컬 경로 목록, 기본: 전체)가 모두 결정될 때까지 기다려 그중 준비된 원격 파일을 반환하는 함수"""
+        wanted = [path for path in (self.file_paths if paths is None else paths) if path in self.file_paths]
+        with self._cond:
+            self._cond.wait_for(lambda: all(path in self._done for path in wanted), timeout)
+            names = [self._names[path] for path in wanted if path in self._names]
+        return self.tracker.ready_files(names)
+
+    def result(self):
+        """모든 업로드와 처리 대기가 끝날 때까지 기다려 준비된 파일 전체를 반환하는 함수"""
+        if self._result is None:
+            try:
+                self._uploading.result()
+                self._watching.result()
+            finally:
+                self._pool.shutdown()
+            active_files = self.tracker.ready_files()
+            if self.uploaded:
+                self.log(f"\n총 {len(self.uploaded)}개 파일 업로드 완료 (사용 가능: {len(active_files)}개)")
+            self._result = active_files
+        return self._result
+
+
+def start_uploads(file_paths, uploader, uploaded=None, log=print, indent="  "):
+    """파일 업로드와 처리 대기를 백그라운드에서 시작하고 SourceUploads 를 반환하는 함수
+
+    동시 업로드 수는 처리량과 429 응답에 따라 자동으로 조절하고(큰 파일부터),
+    업로드가 끝난 파일부터 바로 처리 상태 조회를 시작한다. 처리 완료·실패는 남은
+    업로드를 기다리지 않고 도착하는 즉시 출력한다. uploaded 목록에는
+    정리(삭제)를 위해 업로드된 파일을 완료 순서대로 추가한다.
+    """
+    return SourceUploads(file_paths, uploader, uploaded, log, indent)
+
+
+def upload_sources(file_paths, uploader, uploaded=None, log=print, indent="  "):
+    """파일을 업로드하고 처리 완료까지 기다려 사용 가능한 파일 목록을 반환하는 함수 (start_uploads(...).result())"""
+    return start_uploads(file_paths, uploader, uploaded, log, indent).result()
+
+
+def prepare_sources(extract=None, upload=None):
+    """PDF 텍스트 수집(extract)과 파일 업로드·처리 대기(upload)를 동시에 진행하는 함수
+
+    두 작업은 서로 독립적이므로(로컬 CPU 작업 / 네트워크 대기) 겹쳐서 실행한다.
+    (수집 결과, 업로드 결과) 를 반환하며, 주어지지 않은 작업의 결과는 None 이다.
+    """
+    funcs = [func for func in (extract, upload) if func is not None]
+    results = iter(run_concurrently(*funcs)) if funcs else iter(())
+    return (next(results) if extract else None), (next(results) if upload else None)
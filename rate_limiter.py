@@ -0,0 +1,322 @@
+import email.utils
+import heapq
+import itertools
+import json
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+
+from context_packer import estimate_tokens
+from tracing import get_tracer
+from upload_scheduler import is_throttle_error
+
+#==============================================================================
+# 요청 한도 스케줄러 (모델별 공유 토큰 버킷)
+#   - 모델마다 분당 요청 수(RPM)와 분당 토큰 수(TPM) 버킷을 두고, 버킷이 비면
+#     요청을 보내기 전에 기다린다. 한도 초과(429)가 나기 전에 미리 속도를 맞춘다.
+#   - 기다리는 요청은 우선순위(작을수록 먼저) → 도착 순으로 처리한다.
+#   - 그래도 429 가 나면 Retry-After(헤더·retry_delay·'retry in N') 만큼 해당 모델의
+#     모든 요청을 멈췄다가 다시 보낸다.
+#   - 프로세스 안의 모든 스레드가 default_limiter() 하나를 함께 사용한다.
+#==============================================================================
+
+# rpm: 분당 요청 수, tpm: 분당 입력 토큰 수 (None 이면 제한 없음)
+ModelLimits = namedtuple("ModelLimits", ["rpm", "tpm"])
+# 대기를 마치고 받은 요청 허가 (settle 로 실제 사용 토큰을 반영)
+Reservation = namedtuple("Reservation", ["model", "tokens", "waited"])
+
+# 무료/기본 등급 기준 한도. 이름이 이 키로 시작하는 모델에 적용된다 (가장 긴 키 우선).
+# 환경 변수 LLM_RATE_LIMITS='{"gemini-2.5-flash": [1000, 1000000]}' 로 덮어쓸 수 있다.
+DEFAULT_LIMITS = {
+    "gemini-2.5-flash": ModelLimits(10, 250_000),
+    "gemini-1.5-pro": ModelLimits(2, 32_000),
+    "gemini-1.5-flash": ModelLimits(15, 1_000_000),
+    "claude-3-5-sonnet": ModelLimits(50, 40_000),
+    "claude-3-opus": ModelLimits(50, 20_000),
+    "claude-3-sonnet": ModelLimits(50, 40_000),
+    "claude-3-haiku": ModelLimits(50, 50_000),
+}
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+# 버킷 크기(한 번에 몰아서 보낼 수 있는 양)는 분당 한도의 이 비율.
+# 나머지는 1분에 걸쳐 채워지므로, 어느 1분 구간에서도 한도를 넘지 않는다.
+BURST_FRACTION = 0.25
+# 참고 자료(컨텍스트)에 쓸 토큰 예산은 분당 토큰 한도의 이 비율.
+# 프롬프트·첨부 파일 몫을 남겨 요청 하나가 분당 한도를 넘지 않게 한다.
+CONTEXT_TPM_FRACTION = 0.8
+# 업로드 파일 조각 하나의 토큰 추정치 (실제 사용량은 응답의 usage 로 보정)
+FILE_PART_TOKENS = 2000
+# Retry-After 정보가 없을 때의 기본 대기 시간(초), 재시도마다 두 배
+DEFAULT_RETRY_DELAY = 30.0
+# Retry-After 에 더하는 여유 시간(초)
+RETRY_MARGIN = 1.0
+DEFAULT_MAX_RETRIES = 3
+
+_RETRY_PATTERNS = [
+    re.compile(r'retry in (\d+(?:\.\d+)?)\s*s?', re.IGNORECASE),
+    re.compile(r'retry_delay\s*\{\s*seconds:\s*(\d+)', re.IGNORECASE),
+    re.compile(r'retry after (\d+(?:\.\d+)?)', re.IGNORECASE),
+]
+
+
+def normalize_model_name(model):
+    """'models/gemini-2.5-flash' 나 모델 객체를 'gemini-2.5-flash' 형태로 바꾸는 함수"""
+    name = model if isinstance(model, str) else getattr(model, "model_name", type(model).__name__)
+    return name.split("/", 1)[1] if name.startswith("models/") else name
+
+
+def load_limits(overrides=None):
+    """기본 한도에 환경 변수(LLM_RATE_LIMITS)와 overrides 를 덮어쓴 한도 dict"""
+    limits = dict(DEFAULT_LIMITS)
+    env = os.getenv("LLM_RATE_LIMITS")
+    if env:
+        try:
+            limits.update({name: ModelLimits(*value) for name, value in json.loads(env).items()})
+        except (ValueError, TypeError) as e:
+            print(f"  - 경고: LLM_RATE_LIMITS 형식 오류, 기본 한도 사용: {e}")
+    if overrides:
+        limits.update({name: ModelLimits(*value) for name, value in overrides.items()})
+    return limits
+
+
+def estimate_request_tokens(prompt_parts):
+    """요청 내용(문자열·업로드 파일·대화 메시지 목록)의 입력 토큰 수를 추정하는 함수"""
+    if isinstance(prompt_parts, (str, dict)) or not hasattr(prompt_parts, "__iter__"):
+        prompt_parts = [prompt_parts]
+    total = 0
+    for part in prompt_parts:
+        if isinstance(part, str):
+            total += estimate_tokens(part)
+        elif isinstance(part, dict):
+            total += estimate_request_tokens(part.get("content", ""))
+        elif isinstance(part, (list, tuple)):
+            total += estimate_request_tokens(part)
+        else:
+            total += FILE_PART_TOKENS
+    return total
+
+
+def input_tokens_used(response):
+    """응답에 기록된 실제 입력 토큰 수 (Gemini usage_metadata, Claude usage). 없으면 None"""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None and getattr(usage, "prompt_token_count", None):
+        return usage.prompt_token_count
+    usage = getattr(response, "usage", None)
+    if usage is not None and getattr(usage, "input_tokens", None):
+        return usage.input_tokens
+    return None
+
+
+def is_rate_limit_error(error):
+    """요청 한도·할당량 초과 오류인지 확인하는 함수"""
+    return is_throttle_error(error) or "quota" in str(error).lower()
+
+
+def retry_after_seconds(error):
+    """오류에 담긴 재시도 대기 시간(초)을 찾는 함수 (없으면 None)
+
+    retry_after 속성, HTTP 응답의 Retry-After 헤더(초 또는 날짜),
+    Gemini 오류 메시지의 retry_delay / 'retry in N' 순서로 확인한다.
+    """
+    value = getattr(error, "retry_after", None)
+    if isinstance(value, (int, float)):
+        return float(value)
+
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    header = headers.get("retry-after") if headers is not None else None
+    if header:
+        try:
+            return float(header)
+        except ValueError:
+            try:
+                return max(0.0, email.utils.parsedate_to_datetime(header).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+
+    text = str(error)
+    for pattern in _RETRY_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            return float(match.group(1))
+    return None
+
+
+class TokenBucket:
+    """분당 한도를 일정한 속도로 채우는 토큰 버킷
+
+    한 번에 버킷보다 큰 양을 요청하면 버킷이 가득 찼을 때 허용하고 부족분은 빚으로 남긴다.
+    """
+
+    def __init__(self, per_minute, burst_fraction=BURST_FRACTION):
+        self.capacity = max(1.0, per_minute * burst_fraction)
+        self.rate = max(per_minute - self.capacity, per_minute * 0.5) / 60.0
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount, now):
+        """amount 를 꺼낼 수 있을 때까지 남은 시간(초)"""
+        self._refill(now)
+        need = min(amount, self.capacity) - self.level
+        return 0.0 if need <= 0 else need / self.rate
+
+    def take(self, amount, now):
+        self._refill(now)
+        self.level -= amount
+
+    def adjust(self, delta):
+        """추정치와 실제 사용량의 차이를 반영하는 함수 (양수면 더 꺼내고, 음수면 돌려줌)"""
+        self.level = min(self.capacity, self.level - delta)
+
+
+class _ModelState:
+    def __init__(self, limits):
+        self.limits = limits
+        self.requests = TokenBucket(limits.rpm) if limits and limits.rpm else None
+        self.tokens = TokenBucket(limits.tpm) if limits and limits.tpm else None
+        self.waiters = []  # (우선순위, 도착 순번) 힙
+        self.blocked_until = 0.0
+        self.stats = {"requests": 0, "waited": 0.0, "throttled": 0}
+
+
+class RateLimiter:
+    """모델별 RPM/TPM 토큰 버킷과 우선순위 대기열로 요청 속도를 맞추는 스케줄러 (스레드 안전)"""
+
+    def __init__(self, limits=None, log=print):
+        if limits is None:
+            limits = load_limits()
+        self.limits = {name: ModelLimits(*value) for name, value in limits.items()}
+        self.log = log
+        self._states = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def limits_for(self, model):
+        """모델 이름에 맞는 한도 (가장 길게 일치하는 키, 없으면 None = 제한 없음)"""
+        name = normalize_model_name(model)
+        matches = [key for key in self.limits if name.startswith(key)]
+        return self.limits[max(matches, key=len)] if matches else None
+
+    def context_budget(self, model, budget, fraction=CONTEXT_TPM_FRACTION):
+        """참고 자료 토큰 예산을 모델의 분당 토큰 한도(TPM) 비율 이하로 줄이는 함수
+
+        TPM 보다 큰 요청은 보내자마자 버킷을 빚으로 만들어 다음 요청까지 오래 기다리게 된다.
+        한도가 없는 모델이면 budget 을 그대로 반환한다.
+        """
+        limits = self.limits_for(model)
+        if not limits or not limits.tpm:
+            return budget
+        return min(budget, int(limits.tpm * fraction))
+
+    def _state(self, name):
+        state = self._states.get(name)
+        if state is None:
+            state = self._states[name] = _ModelState(self.limits_for(name))
+        return state
+
+    def _wait_time(self, state, tokens, now):
+        wait = state.blocked_until - now
+        if state.requests:
+            wait = max(wait, state.requests.wait_time(1, now))
+        if state.tokens and tokens:
+            wait = max(wait, state.tokens.wait_time(tokens, now))
+        return wait
+
+    def acquire(self, model, tokens=0, priority=PRIORITY_NORMAL):
+        """요청을 보내도 될 때까지 기다렸다가 Reservation 을 반환하는 함수"""
+        name = normalize_model_name(model)
+        started = time.monotonic()
+        with self._cond:
+            state = self._state(name)
+            ticket = (priority, next(self._seq))
+            heapq.heappush(state.waiters, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    timeout = None
+                    if state.waiters[0] == ticket:
+                        timeout = self._wait_time(state, tokens, now)
+                        if timeout <= 0:
+                            break
+                    self._cond.wait(timeout)
+                if state.requests:
+                    state.requests.take(1, now)
+                if state.tokens and tokens:
+                    state.tokens.take(tokens, now)
+            finally:
+                state.waiters.remove(ticket)
+                heapq.heapify(state.waiters)
+                self._cond.notify_all()
+            waited = time.monotonic() - started
+            state.stats["requests"] += 1
+            state.stats["waited"] += waited
+        if waited > 0.001:
+            tracer = get_tracer()
+            tracer.record("llm.wait", tracer.now() - waited, model=name, tokens=tokens, priority=priority)
+        return Reservation(name, tokens, waited)
+
+    def settle(self, reservation, used_tokens):
+        """요청이 끝난 뒤 실제 입력 토큰 수로 TPM 버킷을 보정하는 함수"""
+        with self._cond:
+            state = self._state(reservation.model)
+            if state.tokens and used_tokens is not None:
+                state.tokens.adjust(used_tokens - reservation.tokens)
+                self._cond.notify_all()
+
+    def defer(self, model, seconds):
+        """Retry-After 만큼 해당 모델의 모든 요청을 멈추는 함수"""
+        with self._cond:
+            state = self._state(normalize_model_name(model))
+            state.blocked_until = max(state.blocked_until, time.monotonic() + seconds)
+            state.stats["throttled"] += 1
+            self._cond.notify_all()
+
+    def call(self, model, func, tokens=0, priority=PRIORITY_NORMAL, max_retries=DEFAULT_MAX_RETRIES,
+             usage=input_tokens_used):
+        """한도에 맞춰 func() 를 실행하고, 한도 초과 오류면 Retry-After 만큼 기다려 다시 실행하는 함수"""
+        for attempt in range(max_retries + 1):
+            reservation = self.acquire(model, tokens, priority)
+            try:
+                result = func()
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt == max_retries:
+                    raise
+                delay = retry_after_seconds(e)
+                delay = DEFAULT_RETRY_DELAY * (2 ** attempt) if delay is None else delay + RETRY_MARGIN
+                if self.log:
+                    self.log(f"  ⏳ {reservation.model} 요청 한도 초과. {delay:.0f}초 후 다시 요청합니다 "
+                             f"({attempt + 1}/{max_retries})")
+                self.defer(reservation.model, delay)
+                continue
+            used = usage(result) if usage else None
+            if used is not None:
+                self.settle(reservation, used)
+            return result
+
+    def summary(self):
+        """모델별 요청 수·대기 시간·한도 초과 횟수 요약 문자열"""
+        with self._cond:
+            parts = [f"{name} {s['requests']}건 대기 {s['waited']:.1f}초 한도초과 {s['throttled']}회"
+                     for name, s in ((name, state.stats) for name, state in self._states.items())]
+        return "요청 스케줄러: " + (", ".join(parts) if parts else "요청 없음")
+
+
+_default_limiter = None
+_default_lock = threading.Lock()
+
+
+def default_limiter():
+    """프로세스 전체가 함께 쓰는 RateLimiter"""
+    global _default_limiter
+    with _default_lock:
+        if _default_limiter is None:
+            _default_limiter = RateLimiter()
+    return _default_limiter
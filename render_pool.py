@@ -0,0 +1,59 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+from pipeline import Pipeline
+
+#==============================================================================
+# 다중 문서 렌더링 스케줄러
+#   - 모든 버전의 LLM 생성을 동시에 요청하고,
+#   - 생성이 끝나는 순서대로 제한된 개수의 문서 작성기(프로세스)에 넘긴다.
+#     (생성 → 렌더링 두 단계의 pipeline.Pipeline 으로 실행)
+#   - 전체 소요 시간은 버전별 시간의 합이 아니라 가장 느린 버전에 가깝다.
+#==============================================================================
+
+# 동시에 띄울 문서 작성기(프로세스 또는 한/글 인스턴스) 수
+DEFAULT_MAX_WRITERS = max(1, min(4, (os.cpu_count() or 2) // 2))
+
+
+class LogBuffer:
+    """작성기 프로세스에서 남긴 로그를 모아 두는 객체 (pyqtSignal 의 emit 과 같은 형태)"""
+
+    def __init__(self):
+        self.lines = []
+
+    def emit(self, message):
+        self.lines.append(message)
+
+
+def _render_with_args(render, args):
+    # 프로세스 풀로 보낼 수 있도록 최상위 함수로 둔다.
+    return render(*args)
+
+
+def render_variations(variations, generate, render, max_writers=DEFAULT_MAX_WRITERS,
+                      use_processes=True, on_result=None):
+    """여러 버전을 병렬로 생성하고 렌더링하는 함수 (공용 asyncio 파이프라인 사용)
+
+    generate(i, variation) 은 스레드에서 실행되며 render 에 넘길 인자 튜플을 반환한다.
+    render(*args) 는 작성기 풀(기본: 프로세스)에서 실행되므로 최상위 함수여야 한다.
+    on_result(i, result, error) 는 렌더링이 끝날 때마다 호출 스레드에서 호출된다.
+    반환값은 버전 순서대로 정렬된 렌더링 결과 목록이다 (실패한 항목은 예외 객체).
+    """
+    results = [None] * len(variations)
+    if not variations:
+        return results
+
+    def _report(result):
+        i = result.index + 1
+        results[i-1] = result.error if result.error else result.value
+        if on_result:
+            on_result(i, result.value, result.error)
+
+    writer_pool_cls = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    with writer_pool_cls(max_workers=max_writers) as writer_pool:
+        pipeline = Pipeline(queue_size=max_writers, on_result=_report)
+        pipeline.add_stage("generate", lambda job: generate(*job), workers=len(variations))
+        pipeline.add_stage("render", partial(_render_with_args, render), workers=max_writers, executor=writer_pool)
+        pipeline.run(list(enumerate(variations, 1)))
+    return results
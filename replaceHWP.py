@@ -20,11 +20,11 @@
 import pyhwpx
 import google.generativeai as genai
 import os
-import re
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
 import datetime 
 import json 
-import time
+from marker_replace import replace_markers_with_hwp
+from marker_grammar import TITLE, parse_markers
 
 hwp = pyhwpx.Hwp()
 
@@ -117,42 +117,20 @@ try:
         print("\n--- AI 생성 답변 ---\n", ai_text)
 
         # '## AAA' 등을 기준으로 텍스트를 분리
-        sections = re.split(r'##\s*([A-Z]{3,})', ai_text)
-        print (sections)
-        
-        content_map = {}
-        if len(sections) > 1:
-            for i in range(1, len(sections), 2):
-                marker = sections[i].strip()
-                full_content = sections[i+1].strip()
-                content_map[marker] = full_content
+        sections = parse_markers(ai_text, families=(TITLE,))
+        print(list(sections))
 
         print("\nHWPX 파일에 파싱된 답변을 삽입합니다...")
-        for marker, full_content in content_map.items():
-            # 전체 내용에서 첫 번째 줄(제목)만 추출
-            title_only = full_content.split('\n')[0].strip()
-
-            hwp.MoveDocBegin() 
-            while hwp.find(marker):
-                hwp.insert_text(title_only)
-                time.sleep(0.1)
-                print(f"  - 성공: '{marker}' 위치에 제목 '{title_only}'을(를) 삽입했습니다.")
+        # 전체 내용에서 첫 번째 줄(제목)만 추출하여 한 번에 삽입
+        title_map = sections.titles()
+        replace_markers_with_hwp(hwp, title_map)
        
     else:
         print("\n[오류] AI가 답변을 생성하지 않았습니다. 안전 필터에 의해 차단되었을 수 있습니다.")
         print("차단 피드백:", response.prompt_feedback)
 
-    hwp.MoveDocBegin() 
-    while (hwp.find('YYYY')):
-        date = datetime.date.today()
-        years = str(date.year + 1)
-        hwp.insert_text(years)
-
-    hwp.MoveDocBegin() 
-    while (hwp.find('YYYD')):
-        date = datetime.date.today()
-        years = str(date.year)
-        hwp.insert_text(years)
+    date = datetime.date.today()
+    replace_markers_with_hwp(hwp, {'YYYY': str(date.year + 1), 'YYYD': str(date.year)}, log=None)
 
 
     # 1. JSON 파일 경로 설정
@@ -165,16 +143,11 @@ try:
         with open(json_path, 'r', encoding='utf-8') as f:
             detail_data_map = json.load(f)
 
-        # 3. HWPX 문서에 파싱된 내용 순차 삽입 (Replace)
+        # 3. HWPX 문서에 파싱된 내용 일괄 삽입 (Replace)
+        detail_map = {}
         for main_marker, sub_items in detail_data_map.items():
-            for sub_marker, content in sub_items.items():
-                hwp.MoveDocBegin()
-                print(sub_marker) 
-                print(content) 
-
-                while hwp.find(sub_marker):
-                    hwp.insert_text(content)
-                    time.sleep(0.1)
+            detail_map.update(sub_items)
+        replace_markers_with_hwp(hwp, detail_map)
 
 
 
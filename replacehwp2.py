@@ -1,11 +1,16 @@
 import pyhwpx
-import google.generativeai as genai
 import os
-import re
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
 import datetime 
 import json 
-import time
+from marker_replace import replace_markers_with_hwp
+from retrieval_index import RetrievalIndex, format_passages
+from generation_plan import GenerationPlan
+from marker_grammar import LETTER_DIGIT, PAIR_DIGIT, TITLE, extract_json, parse_markers
+from template_index import load_template_index
+from llm_provider import create_provider
+from tracing import export_requested
+from rate_limiter import PRIORITY_HIGH, PRIORITY_NORMAL, default_limiter, estimate_request_tokens
 
 hwp = pyhwpx.Hwp()
 
@@ -18,9 +23,20 @@ try:
         hwp.SaveAs(hwp_path)
     hwp.Open(hwp_path)
 
+    # 템플릿 자리 표시자 색인 (템플릿 옆에 내용 해시로 저장). 템플릿에 있는 식별자만 요청하고 찾는다.
+    template_index = load_template_index(hwp_path, hwp=hwp)
+
+    def template_markers(marker_map):
+        return template_index.select(marker_map) if template_index is not None else marker_map
+
+    def marker_hint(*families, where=None):
+        hint = template_index.prompt_hint(*families, where=where) if template_index is not None else ""
+        return [hint] if hint else []
+
     # [사용자 설정 2] 본인의 Gemini API 키 입력
     API_KEY = "" 
-    genai.configure(api_key=API_KEY)
+    # LLM 제공자 (환경 변수 LLM_PROVIDER=local 이면 네트워크 없이 가짜 응답으로 실행)
+    provider = create_provider(api_key=API_KEY)
 
     # [사용자 설정 3] AI가 참고할 PDF 파일들의 경로
     pdf_files_paths = [
@@ -31,21 +47,39 @@ try:
         r"C:\Users\USER\Desktop\gyeongji\0826\2025.pdf"
     ]
 
-    # --- 2. PDF 파일 업로드 ---
+    # [사용자 설정 4] 검색 기반 프롬프트 사용 여부
+    # True 면 PDF를 업로드하지 않고, 질문마다 관련도가 높은 페이지 조각만 첨부한다.
+    # (기본값 False: 기존처럼 PDF 전체를 업로드해 첨부)
+    use_retrieval = False
+
+    # --- 2. PDF 파일 업로드 (또는 검색 인덱스 생성) ---
     uploaded_files = []
-    print("PDF 파일 업로드를 시작합니다...")
-    for file_path in pdf_files_paths:
-        if os.path.exists(file_path):
-            print(f"  - 업로드 중: {os.path.basename(file_path)}")
-            file_response = genai.upload_file(path=file_path)
-            uploaded_files.append(file_response)
-            print(f"  - 업로드 완료: {file_response.display_name}")
-        else:
-            print(f"  - 경고: '{file_path}' 파일을 찾을 수 없어 건너뜁니다.")
-    print("PDF 파일 업로드가 완료되었습니다.\n")
+    retrieval_index = None
+    if use_retrieval:
+        print("PDF 본문 검색 인덱스를 만듭니다...")
+        retrieval_index = RetrievalIndex.from_pdf_paths(pdf_files_paths)
+    else:
+        print("PDF 파일 업로드를 시작합니다...")
+        for file_path in pdf_files_paths:
+            if os.path.exists(file_path):
+                print(f"  - 업로드 중: {os.path.basename(file_path)}")
+                file_response = provider.upload(file_path)
+                uploaded_files.append(file_response)
+                print(f"  - 업로드 완료: {file_response.display_name}")
+            else:
+                print(f"  - 경고: '{file_path}' 파일을 찾을 수 없어 건너뜁니다.")
+    print("참고 자료 준비가 완료되었습니다.\n")
+
+    def reference_parts(queries, k=5):
+        """질문에 첨부할 참고 자료 (검색 사용 시 질의별 상위 k개 조각, 아니면 업로드 파일 전체)"""
+        if retrieval_index is None:
+            return uploaded_files
+        passages = retrieval_index.search_sections(queries, k=k)
+        print(f"  - 참고 조각 {len(passages)}개 첨부 (질의 {len(queries)}개)")
+        return [f"[참고 자료 발췌]\n{format_passages(passages)}"] if passages else []
 
     # --- 3. 모델 초기화 ---
-    model = genai.GenerativeModel(
+    model = provider.model(
         'gemini-2.5-flash',
         safety_settings={
             HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_ONLY_HIGH,
@@ -54,139 +88,104 @@ try:
             HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_ONLY_HIGH,
         }
     )
-    
-    # 채팅 세션 시작 (대화 히스토리 유지를 위해)
-    chat = model.start_chat(history=[])
+
+    def ask_model(task, prompt_parts):
+        """섹션 하나를 독립 요청으로 생성하는 함수 (대화 기록 없이 필요한 문맥만 전송)"""
+        # 다른 섹션이 기다리는 섹션(대제목)은 요청 한도 대기열에서 먼저 보낸다
+        priority = PRIORITY_HIGH if any(task.name in other.depends_on for other in plan.tasks.values()) else PRIORITY_NORMAL
+        response = default_limiter().call(
+            model.model_name,
+            lambda: model.generate_content(prompt_parts, request_options={"timeout": 600}),
+            tokens=estimate_request_tokens(prompt_parts),
+            priority=priority,
+        )
+        if response.parts:
+            return response.text
+        print(f"\n[오류] '{task.name}' 질문에서 AI가 답변을 생성하지 않았습니다.")
+        print("차단 피드백:", response.prompt_feedback)
+        return None
+
+    # 섹션 응답은 도착 순서가 일정하지 않으므로 문서에 바로 넣지 않고 모아 두었다가,
+    # 모든 섹션이 끝난 뒤 한 번에 삽입한다 ('H1' 이 아직 비어 있는 'HH1' 자리를 덮어쓰지 않도록
+    # 긴 마커부터 한 번의 호출로 처리).
+    marker_map = {}
 
     def process_ai_response(ai_text, question_num):
-        """AI 답변을 파싱하고 HWPX에 삽입하는 함수"""
+        """AI 답변을 파싱하고 삽입할 마커 맵에 모으는 함수"""
         print(f"\n--- {question_num}번째 질문 AI 생성 답변 ---\n", ai_text)
 
         # '## AAA' 등을 기준으로 텍스트를 분리
-        sections = re.split(r'##\s*([A-Z]{3,})', ai_text)
-        print(f"{question_num}번째 질문 파싱 결과:", sections)
-        
-        content_map = {}
-        if len(sections) > 1:
-            for i in range(1, len(sections), 2):
-                marker = sections[i].strip()
-                full_content = sections[i+1].strip()
-                content_map[marker] = full_content
-
-        print(f"\nHWPX 파일에 {question_num}번째 질문 파싱된 답변을 삽입합니다...")
-        for marker, full_content in content_map.items():
-            # 전체 내용에서 첫 번째 줄(제목)만 추출
-            title_only = full_content.split('\n')[0].strip()
-
-            hwp.MoveDocBegin() 
-            while hwp.find(marker):
-                hwp.insert_text(title_only)
-                time.sleep(0.1)
-                print(f"  - 성공: '{marker}' 위치에 제목 '{title_only}'을(를) 삽입했습니다.")
-
-    def extract_json_from_text(text):
-        """텍스트에서 JSON 부분만 추출하는 함수"""
-        # JSON 코드 블록에서 추출 시도
-        json_match = re.search(r'```json\s*(\{.*?\})\s*```', text, re.DOTALL)
-        if json_match:
-            return json_match.group(1)
-        
-        # 일반적인 중괄호로 둘러싸인 JSON 추출 시도
-        json_match = re.search(r'\{.*\}', text, re.DOTALL)
-        if json_match:
-            return json_match.group(0)
-        
-        return None
+        sections = parse_markers(ai_text, families=(TITLE,))
+        print(f"{question_num}번째 질문 파싱 결과:", list(sections))
+        for problem in sections.problems():
+            print(f"  - 경고: {problem}")
+
+        # 전체 내용에서 첫 번째 줄(제목)만 추출
+        title_map = sections.titles()
+        marker_map.update(title_map)
+        return title_map
 
     def process_json_response(ai_text, question_num):
-        """JSON 형태의 AI 답변을 파싱하고 HWPX에 삽입하는 함수"""
+        """JSON 형태의 AI 답변을 파싱하고 삽입할 마커 맵에 모으는 함수"""
         print(f"\n--- {question_num}번째 질문 AI JSON 답변 처리 ---")
         
         # JSON 추출
-        json_text = extract_json_from_text(ai_text)
-        if not json_text:
+        json_data = extract_json(ai_text)
+        if json_data is None:
             print("JSON 형태를 찾을 수 없습니다. 일반 텍스트로 처리합니다.")
             process_ai_response(ai_text, question_num)
             return
         
-        try:
-            # JSON 파싱
-            json_data = json.loads(json_text)
-            print(f"JSON 파싱 성공: {len(json_data)}개 항목")
-            
-            # JSON 데이터를 파일로 저장
-            json_save_path = r'C:\Users\USER\Desktop\llm\LLM-based-document-writing-system\ai_response.json'
-            with open(json_save_path, 'w', encoding='utf-8') as f:
-                json.dump(json_data, f, ensure_ascii=False, indent=2)
-            print(f"JSON 데이터를 파일로 저장: {json_save_path}")
-            
-            # HWPX에 JSON 데이터 삽입
-            print(f"\nHWPX 파일에 JSON 데이터를 삽입합니다...")
-            for marker, content in json_data.items():
-                hwp.MoveDocBegin()
-                print(f"  - 처리 중: {marker}")
-                
-                while hwp.find(marker):
-                    hwp.insert_text(content)
-                    time.sleep(0.1)
-                    print(f"  - 성공: '{marker}' 위치에 '{content}'을(를) 삽입했습니다.")
-                    
-        except json.JSONDecodeError as e:
-            print(f"JSON 파싱 오류: {e}")
-            print("일반 텍스트로 처리합니다.")
-            process_ai_response(ai_text, question_num)
+        print(f"JSON 파싱 성공: {len(json_data)}개 항목")
 
-    # --- 날짜 처리  ---
-    hwp.MoveDocBegin() 
-    while (hwp.find('YEAR')):
-        date = datetime.date.today()
-        years = str(date.year + 1)
-        hwp.insert_text(years)
+        # JSON 데이터를 파일로 저장
+        json_save_path = r'C:\Users\USER\Desktop\llm\LLM-based-document-writing-system\ai_response.json'
+        with open(json_save_path, 'w', encoding='utf-8') as f:
+            json.dump(json_data, f, ensure_ascii=False, indent=2)
+        print(f"JSON 데이터를 파일로 저장: {json_save_path}")
 
-    hwp.MoveDocBegin() 
-    while (hwp.find('YDDY')):
-        date = datetime.date.today()
-        years = str(date.year)
-        hwp.insert_text(years)
+        marker_map.update({marker: content for marker, content in json_data.items() if isinstance(content, str)})
 
-    # --- 4-1. 첫 번째 질문 및 AI 요청 ---
+    # --- 4. 섹션별 생성 계획 ---
+    # 하나의 채팅 세션 대신 섹션마다 독립 요청을 보낸다. 대제목(AAA…)이 필요한
+    # 세부내용(AA1~AA6…)만 대제목 뒤에 실행하고, 주요 성과(AC/BC/DC)와
+    # 특수시책/핵심과제(J1/H1)는 대제목과 동시에 요청한다.
     prompt_keyword = input("첫 번째 키워드 입력: ")
+    second_keyword = prompt_keyword
 
-    # 첫 번째 질문 프롬프트
-    first_prompt_parts = [
-        *uploaded_files,
-        f"""
-        PDF 내용을 참고하여 중복되는 업무 계획의 대제목을 생성해줘.
-        아래 [식별자 목록] 각각에 가장 적절한 제목을 한 줄로 할당해줘.
-        답변은 반드시 '## 식별자 제목' 형식으로만 생성해줘.
-        YOU DON'T MAKE 'YYY' TITLE
-
-        [식별자 목록]
-        AAA, BBB, CCC, DDD, EEE, FFF, GGG, HHH, III, JJJ, KKK, LLL, ... 같은 규칙으로 순차적으로 늘어나도록 
-        """
-    ]
+    def build_titles_prompt(results):
+        # 첫 번째 질문 프롬프트
+        return [
+            *reference_parts([f"{prompt_keyword} 주요 업무 계획", "중점 추진 사업 계획", "주요 사업 추진 방향"], k=10),
+            *marker_hint(TITLE),
+            f"""
+            PDF 내용을 참고하여 중복되는 업무 계획의 대제목을 생성해줘.
+            아래 [식별자 목록] 각각에 가장 적절한 제목을 한 줄로 할당해줘.
+            답변은 반드시 '## 식별자 제목' 형식으로만 생성해줘.
+            YOU DON'T MAKE 'YYY' TITLE
+
+            [식별자 목록]
+            AAA, BBB, CCC, DDD, EEE, FFF, GGG, HHH, III, JJJ, KKK, LLL, ... 같은 규칙으로 순차적으로 늘어나도록 
+            """
+        ]
 
-    print("\nAI에게 답변 생성을 요청...")
-    first_response = chat.send_message(first_prompt_parts, request_options={"timeout": 600})
-    
-    # 첫 번째 답변 처리
-    if first_response.parts:
-        process_ai_response(first_response.text, 1)
-    else:
-        print("\n[오류] 첫 번째 질문에서 AI가 답변을 생성하지 않았습니다.")
-        print("차단 피드백:", first_response.prompt_feedback)
+    main_titles = {}
 
-    # --- 4-2. 두 번째 질문 및 AI 요청 (JSON 처리) ---
-    print("\n" + "="*50)
-    second_keyword = prompt_keyword
-    print(chat.history)
-    
-    if second_keyword.strip():  
+    def handle_titles(ai_text):
+        main_titles.update(process_ai_response(ai_text, 1))
+
+    def build_details_prompt(results):
         # 두 번째 질문 프롬프트 (JSON 형태 요청)
-        second_prompt = [
-            *uploaded_files,
+        # 앞 답변 전체 대신 대제목 목록만 전달하고, 대제목마다 추진배경·성과목표·추진방향 관련 조각만 검색해서 첨부
+        section_queries = [f"{second_keyword} {title} {aspect}"
+                           for title in main_titles.values() for aspect in ("추진배경", "성과목표", "추진방향")]
+        title_lines = "\n".join(f"## {marker} {title}" for marker, title in main_titles.items())
+        return [
+            *reference_parts(section_queries or [second_keyword], k=3),
+            *([f"[앞서 생성한 대제목]\n{title_lines}"] if title_lines else []),
+            *marker_hint(PAIR_DIGIT, where=lambda marker: marker[0] == marker[1]),
             f"""
-            업로드 한 PDF 파일과 이전 답변을 바탕으로, 키워드에 맞게 주제가 무너지지 않는 선에서 세부 내용을 작성 해줘: '{second_keyword}'
+            참고 자료와 [앞서 생성한 대제목]을 바탕으로, 키워드에 맞게 주제가 무너지지 않는 선에서 세부 내용을 작성 해줘: '{second_keyword}'
 
             1. 기존에 생성한 핵심 주제들을 유지하면서, 새로운 키워드의 관점에서 내용을 재구성해줘.
             2. 이전 대제목의 자식 식별자(AA1, AA2, BB1, BB2...)를 사용해줘.
@@ -195,7 +194,7 @@ try:
             5. YOU MUST MAINTAIN THAT I PROVIDED 'json'
             6. You should only make as many as you can with a main title
             - 아래 [JSON 출력 형식]을 완벽하게 따라줘.
-            
+        
             새로운 키워드: '{second_keyword}'
 
             [JSON 출력 형식]
@@ -255,120 +254,106 @@ try:
                 "II4": "소제목 내용",
                 "II5": "추진배경 내용",
                 "II6": "추진방향 내용",
-                 
+             
             }}
             ``` 이형식 잘 유지해줘
             """ 
         ]
 
-        print("\nAI에게 답변 생성을 요청합니다...")
-        second_response = chat.send_message(second_prompt, request_options={"timeout": 600})
-        
-        # 두 번째 답변을 JSON으로 처리
-        if second_response.parts:
-            process_json_response(second_response.text, 2)
-            print(second_response.text)
-        else:
-            print("\n[오류] 두 번째 질문에서 AI가 답변을 생성하지 않았습니다.")
-            print("차단 피드백:", second_response.prompt_feedback)
-    else:
-        print("")
-
-    # --- 4-3. 세 번째 질문: 2025년 주요 성과 정리 (JSON) ---
-    print("\n" + "="*50)
-    
-    # 세 번째 질문을 위한 프롬프트
-    third_prompt = [
-        *uploaded_files,
-        f"""
-        지금까지의 PDF 내용을 종합해서, **2025년의 주요 성과**를 정리해줘.
+    def handle_details(ai_text):
+        process_json_response(ai_text, 2)
+        print(ai_text)
+
+    def build_achievements_prompt(results):
+        # 세 번째 질문: 2025년 주요 성과 정리 (JSON)
+        return [
+            *reference_parts(["2025년 주요 성과", "성과 달성 실적", "추진 결과 성과 확립"], k=8),
+            *marker_hint(PAIR_DIGIT, where=lambda marker: marker[1] == "C" and marker[0] != "C"),
+            f"""
+            지금까지의 PDF 내용을 종합해서, **2025년의 주요 성과**를 정리해줘.
         
-        [출력 형식]
-        - 답변은 반드시 순수한 JSON 형태로만 출력해줘 (다른 설명 없이).
-        - 각 성과 형식은 'JSON 출력 예시'의 형식에 있는 식별자를 사용해줘 (AC1, AC2, AC3...).
-        - 아래 [JSON 출력 예시]을 완벽하게 따라줘.
-        - 음슴체로 해줘 합니다. 말고 그냥 제공이면 제공. 확립이면 확립
-        - 'CC'식별자는 만들지마
-
-        [JSON 출력 예시]
-        ```json
-        {{
-            "AC1": "1번째 주요 성과 내용 제목",
-            "AC2": "1번째 주요 성과 내용 요약",
-            "AC3": "2번째 주요 성과 내용 제목"
-            "AC4": "2번째 주요 성과 내용 요약"
-            "AC5": "3번째 주요 성과 내용 제목",
-            "AC6": "3번째 주요 성과 내용 요약",
-            "AC7": "4번째 주요 성과 내용 제목"
-            "AC8": "4번째 주요 성과 내용 요약"
-            "AC9": "5번째 주요 성과 내용 제목",
-            "BC1": "5번째 주요 성과 내용 요약",
-            "BC2": "6번째 주요 성과 내용 제목"
-            "BC3": "6번째 주요 성과 내용 요약"
-            "BC4": "7번째 주요 성과 내용 제목"
-            "BC5": "7번째 주요 성과 내용 요약"
-            "BC6": "8번째 주요 성과 내용 제목"
-            "BC7": "8번째 주요 성과 내용 요약"
-            "BC8": "9번째 주요 성과 내용 제목"
-            "BC9": "9번째 주요 성과 내용 요약"
-            "DC1": "10번째 주요 성과 내용 제목"
-            "DC2": "10번째 주요 성과 내용 요약"
-            "DC3": "11번째 주요 성과 내용 제목"
-            "DC4": "11번째 주요 성과 내용 요약"
-            "DC5": "12번째 주요 성과 내용 제목"
-            "DC6": "12번째 주요 성과 내용 요약"
-            "DC7": "13번째 주요 성과 내용 제목"
-            "DC8": "13번째 주요 성과 내용 요약"
-        }} 이형식 잘 유지해줘
-        ```
-        """
-    ]
+            [출력 형식]
+            - 답변은 반드시 순수한 JSON 형태로만 출력해줘 (다른 설명 없이).
+            - 각 성과 형식은 'JSON 출력 예시'의 형식에 있는 식별자를 사용해줘 (AC1, AC2, AC3...).
+            - 아래 [JSON 출력 예시]을 완벽하게 따라줘.
+            - 음슴체로 해줘 합니다. 말고 그냥 제공이면 제공. 확립이면 확립
+            - 'CC'식별자는 만들지마
+
+            [JSON 출력 예시]
+            ```json
+            {{
+                "AC1": "1번째 주요 성과 내용 제목",
+                "AC2": "1번째 주요 성과 내용 요약",
+                "AC3": "2번째 주요 성과 내용 제목"
+                "AC4": "2번째 주요 성과 내용 요약"
+                "AC5": "3번째 주요 성과 내용 제목",
+                "AC6": "3번째 주요 성과 내용 요약",
+                "AC7": "4번째 주요 성과 내용 제목"
+                "AC8": "4번째 주요 성과 내용 요약"
+                "AC9": "5번째 주요 성과 내용 제목",
+                "BC1": "5번째 주요 성과 내용 요약",
+                "BC2": "6번째 주요 성과 내용 제목"
+                "BC3": "6번째 주요 성과 내용 요약"
+                "BC4": "7번째 주요 성과 내용 제목"
+                "BC5": "7번째 주요 성과 내용 요약"
+                "BC6": "8번째 주요 성과 내용 제목"
+                "BC7": "8번째 주요 성과 내용 요약"
+                "BC8": "9번째 주요 성과 내용 제목"
+                "BC9": "9번째 주요 성과 내용 요약"
+                "DC1": "10번째 주요 성과 내용 제목"
+                "DC2": "10번째 주요 성과 내용 요약"
+                "DC3": "11번째 주요 성과 내용 제목"
+                "DC4": "11번째 주요 성과 내용 요약"
+                "DC5": "12번째 주요 성과 내용 제목"
+                "DC6": "12번째 주요 성과 내용 요약"
+                "DC7": "13번째 주요 성과 내용 제목"
+                "DC8": "13번째 주요 성과 내용 요약"
+            }} 이형식 잘 유지해줘
+            ```
+            """
+        ]
 
-    third_response = chat.send_message(third_prompt, request_options={"timeout": 600})
-    
-    # 세 번째 답변을 JSON으로 처리
-    if third_response.parts:
-        process_json_response(third_response.text, 3)
-    else:
-        print("\n[오류] 질문에 AI가 답변하지 않았습니다.")
-        print("차단 피드백:", third_response.prompt_feedback)
-
-        # --- 4-3. 세 번째 질문: 2025년 주요 성과 정리 (JSON) ---
-    print("\n" + "="*50)
-    
-    # 4번째 질문을 위한 프롬프트
-    fourth_prompt = [
-        *uploaded_files,
-        f"""
-        지금까지의 PDF 내용을 종합해서, 2026년도 특수시책이랑 핵심과제를 적어줘
+    def build_initiatives_prompt(results):
+        # 네 번째 질문: 2026년 특수시책/핵심과제 (JSON)
+        return [
+            *reference_parts(["2026년 핵심과제", "2026년 특수시책", "신규 시책 추진 계획"], k=8),
+            *marker_hint(LETTER_DIGIT),
+            f"""
+            지금까지의 PDF 내용을 종합해서, 2026년도 특수시책이랑 핵심과제를 적어줘
         
-        [출력 형식]
-        - 답변은 반드시 순수한 JSON 형태로만 출력해줘 (다른 설명 없이).
-        - 각 성과 형식은 'JSON 출력 예시'의 형식에 있는 식별자를 사용해줘 (AC1, AC2, AC3...).
-        - 아래 [JSON 출력 예시]을 완벽하게 따라줘.
-        - 음슴체로 해줘 합니다. 말고 그냥 제공이면 제공. 확립이면 확립
-
-        [JSON 출력 예시]
-        ```json
-        {{
-            "J1": "1번째 핵심과제 제목",
-            "J2": "2번째 핵심과제 제목",
-            "H1": "1번째 특수시책 제목"
-        }} 이형식 잘 유지해줘
-        ```
-        """
-    ]
+            [출력 형식]
+            - 답변은 반드시 순수한 JSON 형태로만 출력해줘 (다른 설명 없이).
+            - 각 성과 형식은 'JSON 출력 예시'의 형식에 있는 식별자를 사용해줘 (AC1, AC2, AC3...).
+            - 아래 [JSON 출력 예시]을 완벽하게 따라줘.
+            - 음슴체로 해줘 합니다. 말고 그냥 제공이면 제공. 확립이면 확립
 
-    fourth_response = chat.send_message(fourth_prompt, request_options={"timeout": 600})
-    
-    # 세 번째 답변을 JSON으로 처리
-    if fourth_response.parts:
-        process_json_response(fourth_response.text, 3)
-    else:
-        print("\n[오류] 세 번째 질문에 AI가 답변하지 않았습니다.")
-        print("차단 피드백:", fourth_response.prompt_feedback)
+            [JSON 출력 예시]
+            ```json
+            {{
+                "J1": "1번째 핵심과제 제목",
+                "J2": "2번째 핵심과제 제목",
+                "H1": "1번째 특수시책 제목"
+            }} 이형식 잘 유지해줘
+            ```
+            """
+        ]
+
+    plan = GenerationPlan()
+    plan.add("대제목", build_titles_prompt, handle=handle_titles)
+    if second_keyword.strip():
+        plan.add("세부내용", build_details_prompt, depends_on=["대제목"], handle=handle_details)
+    plan.add("주요성과", build_achievements_prompt, handle=lambda ai_text: process_json_response(ai_text, 3))
+    plan.add("특수시책", build_initiatives_prompt, handle=lambda ai_text: process_json_response(ai_text, 4))
 
+    print("\nAI에게 섹션별 답변 생성을 요청합니다...")
+    plan.run(ask_model)
+    print(default_limiter().summary())
 
+    # --- 5. 날짜 처리 및 문서 삽입 (모든 섹션을 한 번에) ---
+    date = datetime.date.today()
+    marker_map.update({'YEAR': str(date.year + 1), 'YDDY': str(date.year)})
+    print(f"\nHWPX 파일에 답변 {len(marker_map)}개 항목을 삽입합니다...")
+    replace_markers_with_hwp(hwp, template_markers(marker_map))
 
     # # --- 6. 기존 JSON 파일 처리 (선택사항) ---
     # json_path = r'C:\Users\USER\Desktop\llm\LLM-based-document-writing-system\test.json' 
@@ -393,5 +378,6 @@ try:
 
 finally:
     # --- 7. 안전한 종료 ---
+    export_requested()
     print("\n프로그램을 안전하게 종료합니다...")
     hwp.save_as("output")
\ No newline at end of file
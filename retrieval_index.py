@@ -0,0 +1,149 @@
+import heapq
+import math
+import os
+import re
+from collections import Counter, namedtuple
+
+from context_packer import split_chunks
+from pdf_extract import load_pdf_pages
+
+#==============================================================================
+# PDF 본문 검색 인덱스 (BM25)
+#   - 페이지 단위 조각을 로컬 BM25 인덱스로 만들고, 질문(섹션)마다
+#     관련도가 높은 상위 k개 조각만 프롬프트에 넣는다.
+#   - 형태소 분석기 없이 한국어를 다루기 위해 조사·어미를 떼어 낸 어간과
+#     어간의 글자 2-gram 을 함께 색인한다 (복합명사 부분 일치용).
+#==============================================================================
+
+# source: 파일 이름, page: 1부터 시작하는 페이지 번호
+Passage = namedtuple("Passage", ["source", "page", "text"])
+
+DEFAULT_TOP_K = 5
+
+_TOKEN_PATTERN = re.compile(r'[가-힣]+|[a-z0-9]+(?:\.[0-9]+)?')
+
+# 긴 것부터 검사한다. 한 글자 조사는 어간이 두 글자 이상 남을 때만 뗀다 ('성과' → '성' 방지).
+_SUFFIXES = sorted([
+    "으로서", "으로써", "에서는", "에서도", "에게서", "으로는", "까지는", "부터는",
+    "했으며", "하였다", "하였으며", "되었다", "되었으며", "합니다", "됩니다", "입니다",
+    "에서", "에게", "으로", "까지", "부터", "에는", "에도", "와의", "과의", "이며", "이고",
+    "했다", "한다", "하며", "하고", "하여", "하는", "해서", "되어", "되는", "된다", "이다",
+    "은", "는", "이", "가", "을", "를", "의", "에", "도", "로", "와", "과", "만", "한", "된",
+], key=len, reverse=True)
+
+_STOPWORDS = {"및", "등", "위한", "위해", "통해", "통한", "대한", "대해", "있는", "있다", "것", "수", "년", "월", "일"}
+
+
+def _strip_suffix(word):
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= (2 if len(suffix) == 1 else 1):
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text):
+    """한국어 조사·어미를 떼고 어간과 2-gram 을 만드는 토크나이저"""
+    tokens = []
+    for word in _TOKEN_PATTERN.findall(text.lower()):
+        if not ('가' <= word[0] <= '힣'):
+            tokens.append(word)
+            continue
+        stem = _strip_suffix(word)
+        if stem in _STOPWORDS:
+            continue
+        tokens.append(stem)
+        if len(stem) > 2:
+            tokens.extend(f"#{stem[i:i + 2]}" for i in range(len(stem) - 1))
+    return tokens
+
+
+class RetrievalIndex:
+    """페이지 조각에 대한 BM25 검색 인덱스"""
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.passages = []
+        self._postings = {}
+        self._lengths = []
+        self._total_length = 0
+
+    @classmethod
+    def from_pdf_paths(cls, pdf_paths, chunk_chars=1500, log=print):
+        """PDF 파일들의 페이지(긴 페이지는 조각으로 나눔)를 색인하는 함수 (텍스트는 캐시 사용)"""
+        index = cls()
+        for path in pdf_paths:
+            if not os.path.exists(path):
+                if log:
+                    log(f"  - 경고: '{os.path.basename(path)}' 파일을 찾을 수 없어 건너뜁니다.")
+                continue
+            try:
+                pdf = load_pdf_pages(path)
+            except Exception as e:
+                if log:
+                    log(f"  - 오류: '{os.path.basename(path)}' 처리 중 오류 발생: {e}")
+                continue
+            index.add_pages(os.path.basename(path), pdf.cleaned, chunk_chars)
+        if log:
+            log(f"  - 검색 인덱스: 조각 {len(index):,}개, 단어 {len(index._postings):,}개")
+        return index
+
+    def add_pages(self, source, pages, chunk_chars=1500):
+        """한 문서의 페이지 텍스트 목록을 색인하는 함수 (긴 페이지는 조각으로 나눔)"""
+        for page, text in enumerate(pages, 1):
+            for chunk in split_chunks(text, target_chars=chunk_chars):
+                self.add(chunk.text, source, page)
+
+    def add(self, text, source=None, page=None):
+        terms = tokenize(text)
+        if not terms:
+            return
+        passage_id = len(self.passages)
+        self.passages.append(Passage(source, page, text))
+        for term, count in Counter(terms).items():
+            self._postings.setdefault(term, []).append((passage_id, count))
+        self._lengths.append(len(terms))
+        self._total_length += len(terms)
+
+    def __len__(self):
+        return len(self.passages)
+
+    def _rank(self, query, k):
+        if not self.passages:
+            return []
+        n = len(self.passages)
+        avg_length = self._total_length / n
+        scores = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for passage_id, tf in postings:
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[passage_id] / avg_length)
+                scores[passage_id] = scores.get(passage_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return heapq.nlargest(k, ((score, passage_id) for passage_id, score in scores.items()))
+
+    def search(self, query, k=DEFAULT_TOP_K):
+        """(점수, Passage) 를 관련도 순으로 최대 k개 반환하는 함수"""
+        return [(score, self.passages[passage_id]) for score, passage_id in self._rank(query, k)]
+
+    def search_sections(self, queries, k=DEFAULT_TOP_K, max_passages=None):
+        """섹션별 질의마다 상위 k개를 찾아 중복 없이 합치는 함수 (원래 문서 순서로 정렬)"""
+        chosen = {}
+        for query in queries:
+            for score, passage_id in self._rank(query, k):
+                chosen[passage_id] = max(score, chosen.get(passage_id, 0.0))
+        if max_passages is not None and len(chosen) > max_passages:
+            chosen = dict(heapq.nlargest(max_passages, chosen.items(), key=lambda item: item[1]))
+        return [self.passages[passage_id] for passage_id in sorted(chosen)]
+
+
+def format_passages(passages):
+    """검색된 조각을 출처와 함께 프롬프트용 텍스트로 만드는 함수"""
+    parts = []
+    for item in passages:
+        passage = item if isinstance(item, Passage) else item[1]
+        location = f"{passage.source} {passage.page}쪽" if passage.page else (passage.source or "참고 자료")
+        parts.append(f"[{location}]\n{passage.text}")
+    return "\n\n".join(parts)
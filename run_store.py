@@ -0,0 +1,157 @@
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+from tracing import span
+
+#==============================================================================
+# 실행(run) 단위 체크포인트 저장소
+#   - 한 번의 실행을 run ID 로 구분하고, 단계마다 결과물(추출 텍스트, 업로드 목록,
+#     LLM 원본 응답, 섹션 맵, 완성 문서)을 '<root>/<run ID>/' 에 저장한다.
+#   - 단계 결과는 입력 키(key)와 함께 run.json 에 기록하며, 같은 run ID 로 다시 실행하면
+#     입력이 같은 단계는 저장된 결과를 그대로 쓰고 건너뛴다.
+#   - 뒤 단계(문서 저장 등)에서 실패해도 앞 단계 결과는 남으므로 실패한 단계부터 다시 한다.
+#==============================================================================
+
+DEFAULT_RUNS_DIR = os.getenv(
+    "RUN_STORE_DIR",
+    os.path.join(os.path.expanduser("~"), ".llm_docwriter_cache", "runs"),
+)
+RUN_ID_ENV = "RUN_ID"
+METADATA_NAME = "run.json"
+
+
+def new_run_id():
+    return datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+
+
+def stage_key(*values):
+    """단계 입력값들로 만든 키 (값이 바뀌면 저장된 단계 결과를 쓰지 않음)"""
+    payload = json.dumps(values, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def files_key(paths):
+    """파일 목록의 (경로, 크기, 수정 시각) 으로 만든 키 (내용을 다시 읽지 않음)"""
+    entries = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            entries.append((path, stat.st_size, stat.st_mtime_ns))
+        except OSError:
+            entries.append((path, None, None))
+    return stage_key(entries)
+
+
+def _write_atomic(path, write):
+    fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class RunStore:
+    """run ID 하나의 단계별 결과 저장소
+
+    run_id 가 없으면 환경 변수 RUN_ID, 그것도 없으면 현재 시각으로 새 ID 를 만든다.
+    save(단계, 값, key) 는 문자열은 .txt, 그 밖의 값은 .json 으로 저장하고,
+    load(단계, key) 는 같은 key 로 저장된 결과가 있을 때만 값을 돌려준다 (없으면 None).
+    """
+
+    def __init__(self, run_id=None, root=DEFAULT_RUNS_DIR):
+        self.run_id = run_id or os.getenv(RUN_ID_ENV) or new_run_id()
+        self.directory = os.path.join(root, self.run_id)
+        os.makedirs(self.directory, exist_ok=True)
+        self._metadata_path = os.path.join(self.directory, METADATA_NAME)
+        self.resumed = os.path.exists(self._metadata_path)
+        self.stages = self._read()
+
+    def _read(self):
+        if not self.resumed:
+            return {}
+        try:
+            with open(self._metadata_path, 'r', encoding='utf-8') as f:
+                return json.load(f).get("stages", {})
+        except (OSError, ValueError):
+            return {}
+
+    def _save_metadata(self):
+        metadata = {"run_id": self.run_id, "stages": self.stages}
+        _write_atomic(self._metadata_path, lambda f: json.dump(metadata, f, ensure_ascii=False, indent=1))
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _entry(self, stage, key):
+        entry = self.stages.get(stage)
+        if entry is None or (key is not None and entry.get("key") != key):
+            return None
+        if not os.path.exists(self.path(entry["artifact"])):
+            return None
+        return entry
+
+    def done(self, stage, key=None):
+        """같은 key 로 끝난 단계인지 확인하는 함수"""
+        return self._entry(stage, key) is not None
+
+    def _record(self, stage, artifact, key, **extra):
+        self.stages[stage] = {
+            "key": key,
+            "artifact": artifact,
+            "saved": datetime.datetime.now().isoformat(timespec="seconds"),
+            **extra,
+        }
+        self._save_metadata()
+
+    def save(self, stage, value, key=None):
+        """단계 결과를 저장하고 끝난 단계로 기록하는 함수"""
+        with span("run.checkpoint", checkpoint=stage) as attrs:
+            if isinstance(value, str):
+                artifact = f"{stage}.txt"
+                _write_atomic(self.path(artifact), lambda f: f.write(value))
+            else:
+                artifact = f"{stage}.json"
+                _write_atomic(self.path(artifact), lambda f: json.dump(value, f, ensure_ascii=False, indent=1))
+            attrs["bytes"] = os.path.getsize(self.path(artifact))
+            self._record(stage, artifact, key)
+        return value
+
+    def load(self, stage, key=None):
+        """같은 key 로 저장된 단계 결과 (없거나 입력이 바뀌었으면 None)"""
+        entry = self._entry(stage, key)
+        if entry is None:
+            return None
+        with open(self.path(entry["artifact"]), 'r', encoding='utf-8') as f:
+            if entry["artifact"].endswith('.json'):
+                return json.load(f)
+            return f.read()
+
+    def save_file(self, stage, path, key=None):
+        """완성 문서 같은 파일 결과를 실행 폴더로 복사해 두는 함수"""
+        artifact = f"{stage}{os.path.splitext(path)[1]}"
+        with span("run.checkpoint", checkpoint=stage, file=os.path.basename(path)):
+            shutil.copyfile(path, self.path(artifact))
+            self._record(stage, artifact, key, source=os.path.abspath(path))
+        return self.path(artifact)
+
+    def restore_file(self, stage, output_path, key=None):
+        """저장해 둔 파일 결과를 output_path 로 되살리는 함수 (없으면 None)"""
+        entry = self._entry(stage, key)
+        if entry is None:
+            return None
+        if not os.path.exists(output_path):
+            os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+            shutil.copyfile(self.path(entry["artifact"]), output_path)
+        return output_path
+
+    def completed(self):
+        """끝난 단계 이름 목록 (저장한 순서)"""
+        return [stage for stage in self.stages if self._entry(stage, None) is not None]
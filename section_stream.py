@@ -0,0 +1,91 @@
+import re
+
+from marker_grammar import LETTER_DIGIT, PAIR, TITLE, marker_pattern
+
+#==============================================================================
+# 스트리밍 응답의 섹션 파서
+#   - 생성 중인 텍스트 조각을 받아 '##A1' 같은 파싱 마커 단위로 나누고,
+#     다음 마커가 나타나 끝이 확정된 섹션부터 바로 내보낸다.
+#   - 마커가 조각 경계에서 잘려도('##A' + '1') 다음 조각을 기다렸다가 처리한다.
+#==============================================================================
+
+# 시장연설문(writeForeword3): ##A1 ~ ##Z9
+LETTER_DIGIT_MARKERS = marker_pattern(LETTER_DIGIT)
+# 발간사(writeForeword2, gui): ##AA, ##BB, ...
+LETTER_PAIR_MARKERS = marker_pattern(TITLE, PAIR)
+# 업무계획 대제목(replacehwp2, gui/gui*.py): ##AAA, ##BBB, ...
+TITLE_MARKERS = marker_pattern(TITLE)
+
+# 마커가 조각 경계에 걸칠 수 있으므로 다음 검색은 이만큼 앞에서 다시 시작한다.
+_RESCAN_CHARS = 32
+
+
+class SectionParser:
+    """텍스트 조각을 받아 완성된 (마커, 내용) 섹션을 순서대로 내보내는 증분 파서"""
+
+    def __init__(self, pattern=LETTER_DIGIT_MARKERS):
+        self.pattern = re.compile(pattern)
+        self.sections = {}  # 지금까지 완성된 섹션 (마커 → 내용)
+        self._pieces = []
+        self._buffer = ""
+        self._scan_from = 0
+        self._marker = None  # 내용이 아직 끝나지 않은 마지막 마커
+
+    @property
+    def text(self):
+        """지금까지 받은 전체 텍스트"""
+        return "".join(self._pieces)
+
+    def feed(self, chunk):
+        """조각을 추가하고, 이번에 끝이 확정된 섹션 목록을 반환하는 함수"""
+        if not chunk:
+            return []
+        self._pieces.append(chunk)
+        self._buffer += chunk
+        return self._drain(final=False)
+
+    def close(self):
+        """스트림이 끝났을 때 마지막 섹션까지 내보내는 함수"""
+        return self._drain(final=True)
+
+    def _drain(self, final):
+        completed = []
+        content_start = 0
+        rescan = max(0, len(self._buffer) - _RESCAN_CHARS)
+        for match in self.pattern.finditer(self._buffer, self._scan_from):
+            # 조각 끝에서 끝난 마커는 더 길어질 수 있으므로('##AA' → '##AAA') 다음 조각을 기다린다.
+            if not final and match.end() == len(self._buffer):
+                rescan = min(rescan, match.start())
+                break
+            if self._marker is not None:
+                completed.append(self._emit(self._buffer[content_start:match.start()]))
+            self._marker = match.group(1)
+            content_start = match.end()
+        else:
+            rescan = max(rescan, content_start)
+
+        if final:
+            if self._marker is not None:
+                completed.append(self._emit(self._buffer[content_start:]))
+            self._marker = None
+            self._buffer = ""
+            self._scan_from = 0
+            return completed
+
+        # 첫 마커 앞의 머리말은 버리고, 진행 중인 섹션 내용만 남긴다.
+        if self._marker is None:
+            content_start = max(content_start, rescan)
+        self._buffer = self._buffer[content_start:]
+        self._scan_from = max(0, rescan - content_start)
+        return completed
+
+    def _emit(self, content):
+        marker, content = self._marker, content.strip()
+        self.sections[marker] = content
+        return marker, content
+
+
+def parse_sections(text, pattern=LETTER_DIGIT_MARKERS):
+    """완성된 텍스트 전체를 (마커, 내용) 목록으로 나누는 함수"""
+    parser = SectionParser(pattern)
+    return parser.feed(text) + parser.close()
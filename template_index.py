@@ -0,0 +1,235 @@
+import json
+import os
+import re
+import tempfile
+import zipfile
+from collections import namedtuple
+
+from marker_grammar import is_placeholder, marker_family, placeholder_pattern
+from pdf_extract import file_sha256
+from tracing import span
+
+#==============================================================================
+# 템플릿 자리 표시자 색인
+#   - .hwp/.hwpx 템플릿을 한 번 훑어 자리 표시자(AAA, AA1~II6, AC1~DC8, J1/H1,
+#     YYYY/YYYD/YEAR/YDDY 등)의 위치와 문단 스타일을 기록한다.
+#   - 색인은 템플릿 옆 '<템플릿>.markers.json' 에 템플릿 내용 해시와 함께 저장하고,
+#     템플릿이 바뀌지 않았으면 다시 훑지 않는다.
+#   - 작성기는 색인의 위치로 바로 값을 넣고(템플릿에 없는 마커는 찾지 않음),
+#     프롬프트는 템플릿에 실제로 있는 식별자만 요청할 수 있다.
+#==============================================================================
+
+# 색인 형식이나 자리 표시자 문법을 바꾸면 올려서 기존 색인을 무효화한다.
+INDEX_VERSION = 1
+INDEX_SUFFIX = ".markers.json"
+
+_SECTION_PATTERN = re.compile(r'^Contents/section\d+\.xml$')
+_XML_TOKEN_PATTERN = re.compile(r'<[^>]*>|[^<]+')
+_XML_ATTR_PATTERN = re.compile(r'([\w:]+)="([^"]*)"')
+
+# marker: 자리 표시자, family: 식별자 종류 (marker_grammar), part: section XML 이름 (.hwp 는 ""),
+# paragraph: 문단 번호 (0부터), offset: 위치 (.hwpx 는 section XML 문자 위치, .hwp 는 문단 안 위치),
+# style: 문단·글자 모양 ID (paraPrIDRef, styleIDRef, charPrIDRef; .hwp 는 빈 dict)
+Placeholder = namedtuple("Placeholder", ["marker", "family", "part", "paragraph", "offset", "style"])
+
+
+def index_path(template_path):
+    return template_path + INDEX_SUFFIX
+
+
+def _scan_text(text, part, paragraph, base, style, placeholders):
+    for match in placeholder_pattern().finditer(text):
+        placeholders.append(Placeholder(match.group(), marker_family(match), part, paragraph,
+                                        base + match.start(), style))
+
+
+def scan_section_xml(xml_text, part):
+    """section XML 의 텍스트 노드에서 자리 표시자를 찾아 Placeholder 목록으로 반환하는 함수"""
+    placeholders = []
+    paragraphs = []  # 열린 문단의 (번호, 속성) 스택 (표 안의 문단은 중첩된다)
+    run_style = {}
+    count = 0
+    for token in _XML_TOKEN_PATTERN.finditer(xml_text):
+        value = token.group()
+        if not value.startswith('<'):
+            if paragraphs:
+                number, para_style = paragraphs[-1]
+                _scan_text(value, part, number, token.start(), {**para_style, **run_style}, placeholders)
+            continue
+        if value.startswith('<hp:p ') or value == '<hp:p>':
+            attrs = dict(_XML_ATTR_PATTERN.findall(value))
+            style = {key: attrs[key] for key in ("paraPrIDRef", "styleIDRef") if key in attrs}
+            if not value.endswith('/>'):
+                paragraphs.append((count, style))
+            count += 1
+        elif value == '</hp:p>':
+            if paragraphs:
+                paragraphs.pop()
+        elif value.startswith('<hp:run'):
+            attrs = dict(_XML_ATTR_PATTERN.findall(value))
+            run_style = {"charPrIDRef": attrs["charPrIDRef"]} if "charPrIDRef" in attrs else {}
+        elif value == '</hp:run>':
+            run_style = {}
+    return placeholders
+
+
+def scan_hwpx(template_path):
+    """HWPX 템플릿의 모든 section XML 에서 자리 표시자를 찾는 함수"""
+    placeholders = []
+    with zipfile.ZipFile(template_path, 'r') as zin:
+        for info in zin.infolist():
+            if _SECTION_PATTERN.match(info.filename):
+                placeholders.extend(scan_section_xml(zin.read(info).decode('utf-8'), info.filename))
+    return placeholders
+
+
+def scan_hwp_text(text):
+    """한/글 문서 텍스트(문단마다 한 줄)에서 자리 표시자를 찾는 함수 (문단 스타일은 알 수 없음)"""
+    placeholders = []
+    for paragraph, line in enumerate(text.splitlines()):
+        _scan_text(line, "", paragraph, 0, {}, placeholders)
+    return placeholders
+
+
+def scan_hwp(template_path, hwp=None):
+    """.hwp 템플릿을 한/글(pyhwpx)로 열어 자리 표시자를 찾는 함수
+
+    hwp 를 주면 이미 열려 있는 그 문서를 읽는다.
+    """
+    if hwp is not None:
+        return scan_hwp_text(hwp.GetTextFile("TEXT", ""))
+
+    import pyhwpx
+
+    hwp = pyhwpx.Hwp(visible=False)
+    try:
+        hwp.Open(template_path)
+        return scan_hwp_text(hwp.GetTextFile("TEXT", ""))
+    finally:
+        try:
+            hwp.Quit()
+        except:
+            pass
+
+
+class TemplateIndex:
+    """템플릿 하나의 자리 표시자 색인"""
+
+    def __init__(self, template_path, sha256, placeholders):
+        self.template_path = template_path
+        self.sha256 = sha256
+        self.placeholders = placeholders
+        self._by_marker = {}
+        for placeholder in placeholders:
+            self._by_marker.setdefault(placeholder.marker, []).append(placeholder)
+
+    @property
+    def markers(self):
+        """템플릿에 있는 자리 표시자 (처음 나온 순서)"""
+        return list(self._by_marker)
+
+    def has(self, marker):
+        return marker in self._by_marker
+
+    def may_contain(self, marker):
+        """템플릿에서 찾아볼 필요가 있는 마커인지 ('#' 처럼 색인하지 않는 마커는 항상 True)"""
+        return marker in self._by_marker or not is_placeholder(marker)
+
+    def locations(self, marker):
+        return self._by_marker.get(marker, [])
+
+    def in_part(self, part):
+        return [placeholder for placeholder in self.placeholders if placeholder.part == part]
+
+    def by_family(self, *families, where=None):
+        """주어진 종류의 자리 표시자 목록 (where(마커) 가 있으면 참인 것만)"""
+        return [marker for marker, found in self._by_marker.items()
+                if found[0].family in families and (where is None or where(marker))]
+
+    def missing(self, expected):
+        """expected 중 템플릿에 없는 마커 목록"""
+        return [marker for marker in expected if marker not in self._by_marker]
+
+    def select(self, marker_map, log=print):
+        """마커 맵에서 템플릿에 없는 자리 표시자를 빼는 함수 (없는 마커는 찾지 않도록 건너뜀)"""
+        selected = {marker: value for marker, value in marker_map.items() if self.may_contain(marker)}
+        skipped = [marker for marker in marker_map if marker not in selected]
+        if skipped and log:
+            log(f"  - 템플릿에 없는 마커 {len(skipped)}개 건너뜀: {', '.join(skipped)}")
+        return selected
+
+    def prompt_hint(self, *families, where=None):
+        """프롬프트에 붙일 '템플릿에 있는 식별자' 안내 문장 (해당 종류가 없으면 빈 문자열)"""
+        markers = self.by_family(*families, where=where)
+        if not markers:
+            return ""
+        return f"[템플릿에 있는 식별자] {', '.join(markers)}\n - 위 식별자만 사용하고, 목록에 없는 식별자는 만들지 마."
+
+    def to_dict(self):
+        return {
+            "version": INDEX_VERSION,
+            "sha256": self.sha256,
+            "template": os.path.basename(self.template_path),
+            "placeholders": [list(placeholder) for placeholder in self.placeholders],
+        }
+
+
+def _read_cached(path, digest):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if entry.get("version") != INDEX_VERSION or entry.get("sha256") != digest:
+        return None
+    return [Placeholder(*item) for item in entry["placeholders"]]
+
+
+def _write_cached(path, index):
+    fd, tmp_path = tempfile.mkstemp(suffix='.json', dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(index.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def load_template_index(template_path, hwp=None, log=print):
+    """템플릿 옆에 저장된 색인을 읽거나, 없거나 낡았으면 템플릿을 훑어 만들고 저장하는 함수
+
+    템플릿이 없거나 훑을 수 없으면(.hwp 인데 한/글이 없는 경우 등) None 을 반환하며,
+    이때 호출한 쪽은 색인 없이 기존처럼 마커를 하나씩 찾는다.
+    """
+    if not template_path or not os.path.exists(template_path):
+        return None
+    digest = file_sha256(template_path)
+    path = index_path(template_path)
+    placeholders = _read_cached(path, digest)
+    if placeholders is not None:
+        return TemplateIndex(template_path, digest, placeholders)
+
+    try:
+        with span("template.index", file=os.path.basename(template_path)) as attrs:
+            if template_path.lower().endswith('.hwpx') and zipfile.is_zipfile(template_path):
+                placeholders = scan_hwpx(template_path)
+            else:
+                placeholders = scan_hwp(template_path, hwp)
+            attrs["placeholders"] = len(placeholders)
+    except Exception as e:
+        if log:
+            log(f"  - 경고: 템플릿 자리 표시자 색인 생성 실패 ({os.path.basename(template_path)}): {e}")
+        return None
+
+    index = TemplateIndex(template_path, digest, placeholders)
+    if log:
+        log(f"  - 템플릿 색인 생성: {os.path.basename(template_path)} (자리 표시자 {len(index.markers)}종, "
+            f"{len(placeholders)}곳)")
+    try:
+        _write_cached(path, index)
+    except OSError as e:
+        if log:
+            log(f"  - 경고: 템플릿 색인 저장 실패: {e}")
+    return index
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 저장소 루트의 모듈(marker_replace 등)을 패키지 설치 없이 가져오기 위해 경로에 추가한다
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,62 @@
+import zipfile
+
+from hwpx_writer import HwpxSectionWriter, erase_lines_in_xml, render_hwpx
+
+HEAD = '<hp:p id="0"><hp:run><hp:secPr/><hp:t>머리말</hp:t></hp:run></hp:p>'
+
+
+def _line(text):
+    return f'<hp:p><hp:run><hp:t>{text}</hp:t></hp:run><hp:linesegarray><hp:lineseg/></hp:linesegarray></hp:p>'
+
+
+BLANK = '<hp:p><hp:run/></hp:p>'
+
+
+def _template(tmp_path, body):
+    path = tmp_path / "template.hwpx"
+    with zipfile.ZipFile(path, 'w') as zout:
+        zout.writestr("mimetype", "application/hwp+zip")
+        zout.writestr("Contents/section0.xml", f'<hs:sec>{body}</hs:sec>')
+    return str(path)
+
+
+def _section(path):
+    with zipfile.ZipFile(path) as zin:
+        return zin.read("Contents/section0.xml").decode('utf-8')
+
+
+def test_unfilled_marker_line_and_following_blank_line_are_removed():
+    xml = f'<hs:sec>{HEAD}{_line("A1")}{BLANK}{_line("A2")}{BLANK}</hs:sec>'
+    new_xml, counts = erase_lines_in_xml(xml, ["A2"])
+    assert new_xml == f'<hs:sec>{HEAD}{_line("A1")}{BLANK}</hs:sec>'
+    assert counts == {"A2": 1}
+
+
+def test_lines_with_other_text_or_objects_are_kept():
+    table = '<hp:p><hp:run><hp:tbl><hp:subList>' + _line("x") + '</hp:subList></hp:tbl><hp:t>A1</hp:t></hp:run></hp:p>'
+    xml = f'<hs:sec>{HEAD}{_line("제목: A1")}{table}</hs:sec>'
+    assert erase_lines_in_xml(xml, ["A1"]) == (xml, {})
+
+
+def test_last_line_of_a_table_cell_is_kept():
+    cell = '<hp:subList>' + _line("A1") + '</hp:subList>'
+    xml = f'<hs:sec>{HEAD}<hp:p><hp:run><hp:tbl>{cell}</hp:tbl></hp:run></hp:p></hs:sec>'
+    assert erase_lines_in_xml(xml, ["A1"]) == (xml, {})
+
+
+def test_section_writer_drops_unfilled_lines_like_the_hwp_path(tmp_path):
+    template = _template(tmp_path, f'{HEAD}{_line("A1")}{BLANK}{_line("A2")}{BLANK}{_line("#강조#")}')
+    with HwpxSectionWriter(template, str(tmp_path / "out.hwpx"), ["A1", "A2"], {"#": ""}, log=None,
+                           erase=["A1", "A2"]) as writer:
+        writer.add("A1", "첫째 & 둘째")
+        counts = writer.save()
+    assert _section(writer.output_path) == f'<hs:sec>{HEAD}{_line("첫째 &amp; 둘째")}{BLANK}{_line("강조")}</hs:sec>'
+    assert counts == {"A1": 1, "A2": 1, "#": 2}
+
+
+def test_render_hwpx_erases_markers_missing_from_the_map(tmp_path):
+    template = _template(tmp_path, f'{HEAD}{_line("A1")}{_line("A2")}{_line("본문 A3")}')
+    output = str(tmp_path / "out.hwpx")
+    counts = render_hwpx(template, output, {"A1": "값"}, erase=["A1", "A2", "A3"])
+    assert _section(output) == f'<hs:sec>{HEAD}{_line("값")}{_line("본문 ")}</hs:sec>'
+    assert counts == {"A1": 1, "A2": 1, "A3": 1}
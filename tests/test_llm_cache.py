@@ -0,0 +1,53 @@
+import os
+
+import llm_cache
+from llm_cache import ResponseCache, cache_key
+
+
+def _cache(tmp_path, **limits):
+    return ResponseCache(cache_dir=str(tmp_path), limiter=object(), **limits)
+
+
+def test_key_depends_on_model_prompt_and_config():
+    key = cache_key("gemini", ["질문"], {"temperature": 0.2})
+    assert key == cache_key("gemini", ["질문"], {"temperature": 0.2, "unknown": 1})
+    assert key != cache_key("gemini", ["질문"], {"temperature": 0.3})
+    assert key != cache_key("claude", ["질문"], {"temperature": 0.2})
+
+
+def test_least_recently_used_entry_is_evicted_first(tmp_path):
+    cache = _cache(tmp_path, max_entries=2)
+    cache.put("aa1", "첫째")
+    cache.put("bb2", "둘째")
+    assert cache.get("aa1") == "첫째"
+    cache.put("cc3", "셋째")
+    assert cache.get("bb2") is None
+    assert cache.get("aa1") == "첫째"
+    assert cache.get("cc3") == "셋째"
+
+
+def test_size_limit_and_overwrite_keep_running_total(tmp_path):
+    cache = _cache(tmp_path, max_bytes=400)
+    cache.put("aa1", "x" * 100)
+    cache.put("aa1", "y" * 100)
+    cache.put("bb2", "z" * 100)
+    assert cache.get("aa1") == "y" * 100
+    cache.put("cc3", "w" * 250)
+    assert cache.get("aa1") is None and cache.get("bb2") is None
+    assert cache.get("cc3") == "w" * 250
+
+
+def test_put_does_not_rescan_and_ignores_temp_files(tmp_path, monkeypatch):
+    os.makedirs(tmp_path / "zz")
+    in_flight = tmp_path / "zz" / f"pending{llm_cache.TEMP_SUFFIX}"
+    in_flight.write_text("쓰는 중")
+    walks = []
+    real_walk = os.walk
+    monkeypatch.setattr(llm_cache.os, "walk", lambda top: walks.append(top) or real_walk(top))
+
+    cache = _cache(tmp_path, max_entries=1)
+    for number in range(5):
+        cache.put(f"k{number:03d}", "답변")
+    assert len(walks) == 1
+    assert in_flight.exists()
+    assert cache.get("k004") == "답변"
@@ -0,0 +1,27 @@
+import pytest
+
+from llm_provider import LLMProvider, LocalProvider, create_provider
+from marker_grammar import extract_json
+
+
+def test_provider_interface_cannot_be_instantiated_incomplete():
+    with pytest.raises(TypeError):
+        LLMProvider()
+
+    class GenerateOnly(LLMProvider):
+        def generate(self, model, prompt_parts, generation_config=None, **kwargs):
+            return None
+
+    with pytest.raises(TypeError):
+        GenerateOnly()
+
+
+def test_local_provider_answers_json_prompts_deterministically():
+    provider = create_provider("local")
+    assert isinstance(provider, LocalProvider)
+    model = provider.model("fake")
+    prompt = '순수한 JSON 으로만 적어줘. 예시: {"J1": "핵심과제", "H1": "특수시책"}'
+    first = model.generate_content(prompt).text
+    assert first == model.generate_content(prompt).text
+    assert set(extract_json(first)) == {"J1", "H1"}
+    assert "".join(piece.text for piece in model.generate_content(prompt, stream=True)) == first
@@ -0,0 +1,81 @@
+import pytest
+
+from marker_grammar import (DATE, LETTER_DIGIT, PAIR, PAIR_DIGIT, TITLE, extract_json, is_placeholder,
+                            marker_family, marker_pattern, parse_markers, placeholder_pattern)
+
+
+@pytest.mark.parametrize("text, marker, family", [
+    ("##AAA", "AAA", TITLE),
+    ("##AA1", "AA1", PAIR_DIGIT),
+    ("##AC1", "AC1", PAIR_DIGIT),
+    ("##AA", "AA", PAIR),
+    ("##A1", "A1", LETTER_DIGIT),
+    ("## J1", "J1", LETTER_DIGIT),
+])
+def test_section_marker_families(text, marker, family):
+    match = marker_pattern().search(text)
+    assert match.group(1) == marker
+    assert marker_family(match) == family
+
+
+def test_date_marker_wins_over_title():
+    match = marker_pattern(DATE, TITLE).search("##YEAR")
+    assert (match.group(1), marker_family(match)) == ("YEAR", DATE)
+
+
+def test_pair_digit_marker_is_not_cut_into_pair_and_digit():
+    # '##AA1' 은 PAIR 만 찾을 때에도 'AA' + '1' 로 잘리지 않는다
+    assert marker_pattern(PAIR).search("##AA1 내용") is None
+    sections = parse_markers("##AA 발간사 ##AA1 세부", families=(PAIR,))
+    assert sections.contents() == {"AA": "발간사 ##AA1 세부"}
+
+
+def test_unknown_family_is_rejected():
+    with pytest.raises(ValueError):
+        marker_pattern("nope")
+
+
+def test_parse_markers_keeps_last_duplicate_and_reports_missing():
+    text = "머리말\n##AAA 첫 제목\n본문\n##BBB 둘째\n##AAA 다시 쓴 제목"
+    sections = parse_markers(text, families=(TITLE,), expected=("AAA", "BBB", "CCC"))
+    assert sections.preamble == "머리말"
+    assert sections.contents() == {"BBB": "둘째", "AAA": "다시 쓴 제목"}
+    assert [section.content for section in sections.duplicates] == ["첫 제목\n본문"]
+    assert sections.missing == ["CCC"]
+    assert sections.problems() == ["중복 마커: AAA", "누락 마커: CCC"]
+    assert sections.titles()["AAA"] == "다시 쓴 제목"
+
+
+def test_parse_markers_without_markers_is_all_preamble():
+    sections = parse_markers("마커 없는 응답")
+    assert len(sections) == 0
+    assert sections.preamble == "마커 없는 응답"
+    assert sections.problems() == []
+
+
+@pytest.mark.parametrize("marker, expected", [
+    ("AAA", True), ("AA1", True), ("AA", True), ("A1", True), ("YEAR", True),
+    ("ABC", False), ("AB", False), ("CCTV", False), ("A10", False), ("#", False),
+])
+def test_is_placeholder(marker, expected):
+    assert is_placeholder(marker) is expected
+
+
+def test_placeholder_pattern_ignores_words_glued_to_letters_or_digits():
+    found = [match.group() for match in placeholder_pattern().finditer("CCTV 설치 AA1, A10 대비 YEAR년 BB")]
+    assert found == ["AA1", "YEAR", "BB"]
+
+
+def test_extract_json_ignores_trailing_text_and_braces():
+    text = '결과입니다.\n{"AA1": "성과 {1}", "AA2": "둘"}\n참고: {이 중괄호는 JSON 이 아님}'
+    assert extract_json(text) == {"AA1": "성과 {1}", "AA2": "둘"}
+
+
+def test_extract_json_prefers_fenced_block():
+    text = '예시 {잘못된} 형식\n```json\n{"J1": "핵심과제"}\n```\n끝 }'
+    assert extract_json(text) == {"J1": "핵심과제"}
+
+
+@pytest.mark.parametrize("text", [None, "", "JSON 없음", "{깨진 JSON", "[1, 2]"])
+def test_extract_json_returns_none_without_object(text):
+    assert extract_json(text) is None
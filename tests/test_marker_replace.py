@@ -0,0 +1,86 @@
+from marker_replace import (MarkerMatcher, iter_markers_in_xml, replace_markers, replace_markers_in_xml,
+                            replace_markers_with_hwp)
+
+
+def test_replace_markers_counts_each_marker():
+    text, counts = replace_markers("A1 그리고 B2, 다시 A1", {"A1": "가", "B2": "나"})
+    assert text == "가 그리고 나, 다시 가"
+    assert counts == {"A1": 2, "B2": 1}
+
+
+def test_xml_character_reference_is_not_a_marker():
+    # '#' 기본값("")이 '&#9;' 를 '&9;' 로 깨뜨리면 안 된다
+    xml = "<hp:t>A&#9;B #강조# &#x9;</hp:t>"
+    new_xml, counts = replace_markers_in_xml(xml, {"#": ""})
+    assert new_xml == "<hp:t>A&#9;B 강조 &#x9;</hp:t>"
+    assert counts == {"#": 2}
+
+
+def test_xml_named_entity_is_not_a_marker():
+    new_xml, counts = replace_markers_in_xml("<hp:t>&amp;&lt;A1&gt;</hp:t>", {"amp": "X", "A1": "a<b"})
+    assert new_xml == "<hp:t>&amp;&lt;a&lt;b&gt;</hp:t>"
+    assert counts == {"A1": 1}
+
+
+def test_xml_attributes_and_tags_are_untouched():
+    xml = '<hp:p id="A1"><hp:t>A1</hp:t></hp:p>'
+    new_xml, _ = replace_markers_in_xml(xml, {"A1": "값", "hp": "X"})
+    assert new_xml == '<hp:p id="A1"><hp:t>값</hp:t></hp:p>'
+
+
+def test_iter_markers_in_xml_returns_document_offsets():
+    xml = "<hp:t>x&#9;A1</hp:t>"
+    spans = list(iter_markers_in_xml(xml, MarkerMatcher(["A1", "#"])))
+    assert spans == [(xml.index("A1"), xml.index("A1") + 2, "A1")]
+
+
+class FakeHwp:
+    """find/insert_text 만 흉내 내는 한/글 객체 (찾은 마커를 선택하고, 삽입하면 커서가 삽입 끝으로 이동)"""
+
+    def __init__(self, text):
+        self.text = text
+        self.pos = 0
+        self.selection = None
+
+    def MoveDocBegin(self):
+        self.pos = 0
+
+    def find(self, marker, direction='Forward'):
+        start = self.text.find(marker, self.pos)
+        if start < 0 and direction == 'AllDoc':
+            start = self.text.find(marker)
+        if start < 0:
+            return False
+        self.selection = (start, start + len(marker))
+        return True
+
+    def insert_text(self, content):
+        start, end = self.selection
+        self.text = self.text[:start] + content + self.text[end:]
+        self.pos = start + len(content)
+
+
+def test_hwp_replacement_stops_when_content_contains_its_marker():
+    hwp = FakeHwp("제목: AA / 부제: BB / 다시 AA")
+    counts = replace_markers_with_hwp(hwp, {"AA": "AA 사업 개요", "B": "x", "BB": "둘"}, log=None)
+    assert hwp.text == "제목: AA 사업 개요 / 부제: 둘 / 다시 AA 사업 개요"
+    assert counts == {"AA": 2, "BB": 1}
+
+
+def test_matcher_prefers_leftmost_then_longest_marker():
+    matcher = MarkerMatcher(["AA", "AAA", "AA1", "A1", "B"])
+    assert list(matcher.finditer("AAA AA1 A1 BAA")) == [
+        (0, 3, "AAA"), (4, 7, "AA1"), (8, 10, "A1"), (11, 12, "B"), (12, 14, "AA"),
+    ]
+
+
+def test_matcher_does_not_return_overlapping_matches():
+    matcher = MarkerMatcher(["ABC", "BCD", "CD"])
+    assert list(matcher.finditer("ABCD")) == [(0, 3, "ABC")]
+    assert list(MarkerMatcher(["BCD", "AB"]).finditer("ABCD")) == [(0, 2, "AB")]
+
+
+def test_matcher_ignores_empty_and_duplicate_markers():
+    matcher = MarkerMatcher(["", "A1", "A1"])
+    assert matcher.markers == ["A1"]
+    assert list(MarkerMatcher([]).finditer("A1")) == []
@@ -0,0 +1,68 @@
+import pytest
+
+from page_store import MAGIC, PageFile, open_page_file, write_page_file
+
+RAW = ["첫 쪽 원문", "", "셋째 쪽 ✓ 원문", "마지막"]
+CLEANED = ["첫 쪽", "", "셋째 쪽 ✓", "마지막"]
+
+
+@pytest.fixture
+def page_file(tmp_path):
+    path = write_page_file(str(tmp_path / "doc.pages"), {"raw": RAW, "cleaned": CLEANED}, sha256="abc", version=2)
+    with PageFile(path) as opened:
+        yield opened
+
+
+def test_round_trip_keeps_pages_and_metadata(page_file):
+    assert page_file.kinds == ["raw", "cleaned"]
+    assert page_file.header["sha256"] == "abc" and page_file.header["version"] == 2
+    assert list(page_file.pages("raw")) == RAW
+    pages = page_file.pages("cleaned")
+    assert list(pages) == CLEANED
+    assert pages[-1] == "마지막" and pages[1:3] == ["", "셋째 쪽 ✓"]
+    assert [pages.page_length(i) for i in range(len(pages))] == [len(text) for text in CLEANED]
+    assert pages.char_count == sum(map(len, CLEANED))
+    with pytest.raises(IndexError):
+        pages[len(CLEANED)]
+    with pytest.raises(KeyError):
+        page_file.pages("missing")
+
+
+def test_file_layout_starts_with_magic_and_aligned_tables(tmp_path):
+    path = write_page_file(str(tmp_path / "doc.pages"), {"cleaned": CLEANED})
+    data = open(path, 'rb').read()
+    assert data[:4] == MAGIC
+    header_end = 8 + int.from_bytes(data[4:8], 'little')
+    table_start = header_end + (-header_end % 8)
+    offsets = [int.from_bytes(data[table_start + 8 * i:table_start + 8 * (i + 1)], 'little')
+               for i in range(len(CLEANED) + 1)]
+    blob = data[table_start + 2 * 8 * (len(CLEANED) + 1):]
+    assert [blob[a:b].decode('utf-8') for a, b in zip(offsets, offsets[1:])] == CLEANED
+
+
+def test_joined_text_slices_like_the_joined_string(page_file):
+    text = page_file.pages("cleaned").joined(sep=" | ")
+    expected = " | ".join(page for page in CLEANED if page)
+    assert len(text) == len(expected) and str(text) == expected
+    assert "".join(text) == expected
+    for start in range(len(expected) + 1):
+        for stop in range(start, len(expected) + 2):
+            assert text[start:stop] == expected[start:stop]
+    assert text[-1] == expected[-1]
+    assert text[::2] == expected[::2]
+    assert page_file.pages("cleaned").joined(skip_empty=False).slice(0, 20) == " ".join(CLEANED)[:20]
+
+
+def test_empty_and_foreign_files_are_rejected(tmp_path):
+    empty = tmp_path / "empty.pages"
+    empty.write_bytes(b"")
+    other = tmp_path / "other.pages"
+    other.write_bytes(b"NOPE" + b"\0" * 16)
+    assert open_page_file(str(empty)) is None
+    assert open_page_file(str(other)) is None
+    assert open_page_file(str(tmp_path / "missing.pages")) is None
+
+
+def test_kinds_must_have_the_same_page_count(tmp_path):
+    with pytest.raises(ValueError):
+        write_page_file(str(tmp_path / "bad.pages"), {"raw": ["a", "b"], "cleaned": ["a"]})
@@ -0,0 +1,66 @@
+import threading
+
+import pytest
+
+from pipeline import PromptStep, run_prompt_steps, start_uploads
+from upload_manifest import LocalFilesApi, ReusableUploader, UploadManifest
+
+
+def _steps(count, parsed):
+    return [PromptStep(None, 0, number, lambda text, progress, number=number: parsed.append(number), 0)
+            for number in range(count)]
+
+
+def test_prompt_steps_run_in_order_and_parse_each_answer():
+    sent, parsed = [], []
+    run_prompt_steps(_steps(4, parsed), lambda step: sent.append(step.prompt) or f"답변 {step.prompt}")
+    assert sent == [0, 1, 2, 3]
+    assert sorted(parsed) == [0, 1, 2, 3]
+
+
+def test_prompt_steps_stop_after_first_failed_request():
+    sent, parsed = [], []
+
+    def ask(step):
+        sent.append(step.prompt)
+        if step.prompt == 1:
+            raise RuntimeError("요청 실패")
+        return "답변"
+
+    with pytest.raises(RuntimeError, match="요청 실패"):
+        run_prompt_steps(_steps(4, parsed), ask)
+    assert sent == [0, 1]
+    assert parsed == [0]
+
+
+class _GatedFilesApi(LocalFilesApi):
+    """slow.pdf 는 release 가 설정될 때까지 PROCESSING 으로 남는 가짜 파일 API (업로드 직후는 모두 PROCESSING)"""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def _state(self, name):
+        file = self.files.get(name)
+        if (file is None or file.display_name == "slow.pdf") and not self.release.is_set():
+            return "PROCESSING"
+        return "ACTIVE"
+
+
+def test_uploads_wait_returns_once_its_own_files_are_ready(tmp_path):
+    paths = []
+    for name in ("fast.pdf", "slow.pdf"):
+        path = tmp_path / name
+        path.write_bytes(f"%PDF-1.4 {name}".encode())
+        paths.append(str(path))
+    files_api = _GatedFilesApi()
+    uploader = ReusableUploader(files_api=files_api, manifest=UploadManifest(path=None))
+
+    uploads = start_uploads(paths + [str(tmp_path / "missing.pdf")], uploader, log=lambda message: None)
+    try:
+        ready = uploads.wait([paths[0], str(tmp_path / "missing.pdf")], timeout=30)
+        assert [file.display_name for file in ready] == ["fast.pdf"]
+        assert not files_api.release.is_set()
+    finally:
+        files_api.release.set()
+    assert sorted(file.display_name for file in uploads.result()) == ["fast.pdf", "slow.pdf"]
@@ -0,0 +1,97 @@
+import threading
+import time
+
+import pytest
+
+from rate_limiter import (PRIORITY_HIGH, PRIORITY_LOW, RateLimiter, TokenBucket, normalize_model_name,
+                          retry_after_seconds)
+
+
+def test_bucket_allows_burst_then_refills_at_steady_rate():
+    bucket = TokenBucket(60)  # 버킷 15, 초당 0.75
+    now = bucket._updated
+    assert (bucket.capacity, bucket.rate) == (15, 0.75)
+    assert bucket.wait_time(15, now) == 0.0
+    bucket.take(15, now)
+    assert bucket.wait_time(1, now) == pytest.approx(1 / 0.75)
+    assert bucket.wait_time(1, now + 1 / 0.75) == pytest.approx(0.0)
+
+
+def test_bucket_never_refills_past_capacity():
+    bucket = TokenBucket(60)
+    now = bucket._updated
+    bucket.take(5, now)
+    assert bucket.wait_time(15, now + 3600) == 0.0
+    assert bucket.level == bucket.capacity
+
+
+def test_request_larger_than_bucket_waits_for_full_bucket_and_leaves_debt():
+    bucket = TokenBucket(60)
+    now = bucket._updated
+    assert bucket.wait_time(100, now) == 0.0
+    bucket.take(100, now)
+    assert bucket.level == -85
+    assert bucket.wait_time(1, now) == pytest.approx(86 / 0.75)
+
+
+def test_adjust_returns_or_takes_the_estimate_difference():
+    bucket = TokenBucket(60)
+    bucket.take(10, bucket._updated)
+    bucket.adjust(-4)
+    assert bucket.level == 9
+    bucket.adjust(20)
+    assert bucket.level == -11
+
+
+def test_limits_use_longest_matching_model_prefix():
+    limiter = RateLimiter({"gemini": (1, None), "gemini-2.5-flash": (10, 1000)}, log=None)
+    assert limiter.limits_for("models/gemini-2.5-flash-lite") == (10, 1000)
+    assert limiter.limits_for("gemini-1.5-pro") == (1, None)
+    assert limiter.limits_for("claude-3-haiku") is None
+    assert normalize_model_name("models/gemini-2.5-flash") == "gemini-2.5-flash"
+
+
+def test_context_budget_stays_below_the_model_token_limit():
+    limiter = RateLimiter({"gemini": (1, None), "gemini-2.5-flash": (10, 250_000)}, log=None)
+    assert limiter.context_budget("gemini-2.5-flash", 400_000) == 200_000
+    assert limiter.context_budget("gemini-2.5-flash", 100_000) == 100_000
+    assert limiter.context_budget("gemini-1.5-pro", 400_000) == 400_000
+
+
+def test_waiting_requests_are_served_by_priority():
+    limiter = RateLimiter({"test-model": (60, None)}, log=None)
+    for _ in range(15):
+        limiter.acquire("test-model")  # 버킷을 비워 다음 요청부터 기다리게 한다
+    order = []
+    threads = [threading.Thread(target=lambda p=priority: (limiter.acquire("test-model", priority=p), order.append(p)))
+               for priority in (PRIORITY_LOW, PRIORITY_HIGH)]
+    threads[0].start()
+    time.sleep(0.05)
+    threads[1].start()
+    for thread in threads:
+        thread.join(10)
+    assert order == [PRIORITY_HIGH, PRIORITY_LOW]
+
+
+def test_rate_limit_error_is_retried_after_the_advertised_delay():
+    limiter = RateLimiter({}, log=None)
+    calls = []
+
+    def func():
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            raise RuntimeError("429 Resource exhausted, retry in 0s")
+        return "ok"
+
+    assert limiter.call("test-model", func) == "ok"
+    assert len(calls) == 2
+    assert "한도초과 1회" in limiter.summary()
+
+
+def test_retry_after_is_read_from_error_attributes_and_messages():
+    error = RuntimeError("quota exceeded")
+    error.retry_after = 7
+    assert retry_after_seconds(error) == 7.0
+    assert retry_after_seconds(RuntimeError("Please retry in 12.5s")) == 12.5
+    assert retry_after_seconds(RuntimeError("retry_delay { seconds: 30 }")) == 30.0
+    assert retry_after_seconds(RuntimeError("다른 오류")) is None
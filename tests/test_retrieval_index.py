@@ -0,0 +1,50 @@
+from retrieval_index import Passage, RetrievalIndex, format_passages, tokenize
+
+
+def _index():
+    index = RetrievalIndex()
+    index.add("도시재생사업을 추진하여 원도심 상권을 살렸다", "업무계획.pdf", 1)
+    index.add("시민 안전을 위한 CCTV 설치를 확대하였다", "업무계획.pdf", 2)
+    index.add("청년 일자리 사업과 창업 지원을 강화한다", "업무계획.pdf", 3)
+    index.add("안전 점검 안전 교육 안전 문화 확산", "안전계획.pdf", 1)
+    return index
+
+
+def test_tokenize_strips_particles_and_adds_bigrams():
+    assert tokenize("도시재생사업을 추진하고 시민을 위한 CCTV 2.5배") == [
+        "도시재생사업", "#도시", "#시재", "#재생", "#생사", "#사업", "추진", "시민", "cctv", "2.5", "배",
+    ]
+    # 한 글자 조사는 어간이 두 글자 이상 남을 때만 뗀다
+    assert tokenize("성과") == ["성과"]
+
+
+def test_search_ranks_passages_by_bm25_score():
+    # 두 단어가 모두 있는 조각이 한 단어만 여러 번 나오는 조각보다 앞선다
+    results = _index().search("안전 확대", k=2)
+    assert [(passage.source, passage.page) for _, passage in results] == [("업무계획.pdf", 2), ("안전계획.pdf", 1)]
+    assert results[0][0] > results[1][0] > 0
+
+
+def test_compound_noun_matches_by_bigram():
+    # '재생사업' 은 색인된 '도시재생사업' 의 2-gram(#재생, #생사, #사업)으로 찾는다
+    results = _index().search("재생사업")
+    assert [passage.page for _, passage in results] == [1]
+
+
+def test_unknown_terms_and_empty_index_return_nothing():
+    assert _index().search("우주 항공") == []
+    assert RetrievalIndex().search("안전") == []
+    index = RetrievalIndex()
+    index.add("및 등", "빈.pdf", 1)
+    assert len(index) == 0
+
+
+def test_search_sections_merges_queries_in_document_order():
+    passages = _index().search_sections(["청년 창업", "도시재생"], k=1)
+    assert [passage.page for passage in passages] == [1, 3]
+    assert len(_index().search_sections(["안전", "청년", "도시재생"], k=1, max_passages=2)) == 2
+
+
+def test_format_passages_labels_source_and_page():
+    text = format_passages([Passage("a.pdf", 3, "본문"), (1.0, Passage("b.pdf", None, "둘째"))])
+    assert text == "[a.pdf 3쪽]\n본문\n\n[b.pdf]\n둘째"
@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+from section_stream import LETTER_DIGIT_MARKERS, LETTER_PAIR_MARKERS, SectionParser, parse_sections
+
+RESPONSE = (
+    "네, 작성하겠습니다.\n"
+    "##A1 존경하는 시민 여러분\n첫 문단입니다.\n"
+    "##A2 둘째 문단 #강조# 입니다.\n"
+    "##B1 셋째 문단\n"
+    "##Z9 마지막 문단"
+)
+
+
+def _feed_in_chunks(text, pattern, sizes):
+    parser = SectionParser(pattern)
+    sections = []
+    position = 0
+    for size in sizes:
+        sections.extend(parser.feed(text[position:position + size]))
+        position += size
+    sections.extend(parser.feed(text[position:]))
+    sections.extend(parser.close())
+    return parser, sections
+
+
+def test_parse_sections_splits_on_markers_and_drops_preamble():
+    assert parse_sections(RESPONSE) == [
+        ("A1", "존경하는 시민 여러분\n첫 문단입니다."),
+        ("A2", "둘째 문단 #강조# 입니다."),
+        ("B1", "셋째 문단"),
+        ("Z9", "마지막 문단"),
+    ]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 7, 64])
+def test_fixed_chunk_sizes_match_whole_text(size):
+    parser, sections = _feed_in_chunks(RESPONSE, LETTER_DIGIT_MARKERS, [size] * (len(RESPONSE) // size))
+    assert sections == parse_sections(RESPONSE)
+    assert parser.text == RESPONSE
+
+
+def test_random_chunk_splits_match_whole_text():
+    # '##AA' 와 '##AAA' 가 번갈아 나와 조각 끝에서 마커가 길어지는 경우를 많이 만든다
+    text = "".join(f"##{chr(65 + n % 26) * 2} 문단 {n}\n##{chr(65 + n % 26) * 3} 제목 {n} ##A1\n" for n in range(60))
+    expected = parse_sections(text, LETTER_PAIR_MARKERS)
+    assert len(expected) == 120
+    rng = random.Random(7)
+    for _ in range(50):
+        sizes = [rng.randint(1, 12) for _ in range(len(text) // 4)]
+        _, sections = _feed_in_chunks(text, LETTER_PAIR_MARKERS, sizes)
+        assert sections == expected
+
+
+def test_marker_cut_at_chunk_boundary_waits_for_next_chunk():
+    parser = SectionParser(LETTER_PAIR_MARKERS)
+    assert parser.feed("##AA 첫째 ##A") == []
+    assert parser.feed("A") == []
+    assert parser.feed("A 제목") == [("AA", "첫째")]
+    assert parser.close() == [("AAA", "제목")]
+    assert parser.sections == {"AA": "첫째", "AAA": "제목"}
+
+
+def test_section_is_emitted_as_soon_as_next_marker_arrives():
+    parser = SectionParser()
+    assert parser.feed("##A1 첫째 문단") == []
+    assert parser.feed(" 계속 ##A2 ") == [("A1", "첫째 문단 계속")]
+    assert parser.close() == [("A2", "")]
@@ -0,0 +1,117 @@
+from bisect import bisect_right
+from collections import namedtuple
+
+#==============================================================================
+# 조각 단위 텍스트 코퍼스
+#   - PDF에서 추출한 텍스트를 `+=` 로 이어 붙이지 않고 조각(segment) 목록과
+#     시작 오프셋으로 보관한다. 추가는 O(1)이고, 전체 문자열은 필요할 때 한 번만 만든다.
+#   - 전체 길이와 슬라이싱은 문자열을 만들지 않고 해당 조각만 잘라서 처리한다.
+#   - 조각은 str 대신 len·슬라이싱을 지원하는 지연 텍스트(page_store.MappedText)여도 된다.
+#     이때 조각 내용은 디스크(mmap)에 있고, 순회할 때만 조각별로 문자열이 만들어진다.
+#==============================================================================
+
+# source: 조각의 출처(파일 경로 등, 머리글이면 None), start: 코퍼스 전체에서의 시작 오프셋,
+# text: str 또는 MappedText
+Segment = namedtuple("Segment", ["source", "start", "text"])
+
+
+class TextCorpus:
+    """조각 목록과 오프셋으로 이루어진 텍스트 (str 처럼 len, 슬라이싱, 포맷팅 가능)"""
+
+    def __init__(self, texts=None):
+        self._segments = []
+        self._starts = []
+        self._length = 0
+        self._joined = None
+        for text in texts or ():
+            self.append(text)
+
+    def append(self, text, source=None):
+        """조각을 끝에 추가하는 함수 (빈 문자열은 무시)"""
+        if not text:
+            return
+        self._segments.append(Segment(source, self._length, text))
+        self._starts.append(self._length)
+        self._length += len(text)
+        self._joined = None
+
+    def extend(self, texts, source=None):
+        for text in texts:
+            self.append(text, source)
+
+    @property
+    def segments(self):
+        return list(self._segments)
+
+    def sources(self):
+        """조각 출처 목록 (중복 제거, 추가된 순서 유지)"""
+        return [s for s in dict.fromkeys(seg.source for seg in self._segments) if s is not None]
+
+    def __len__(self):
+        return self._length
+
+    def __bool__(self):
+        return self._length > 0
+
+    def __iter__(self):
+        return (seg.text if isinstance(seg.text, str) else str(seg.text) for seg in self._segments)
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            if key < 0:
+                key += self._length
+            if not 0 <= key < self._length:
+                raise IndexError("TextCorpus index out of range")
+            return self.slice(key, key + 1)
+        if not isinstance(key, slice):
+            raise TypeError(f"TextCorpus indices must be integers or slices, not {type(key).__name__}")
+        start, stop, step = key.indices(self._length)
+        if step != 1:
+            return str(self)[key]
+        return self.slice(start, stop)
+
+    def slice(self, start, stop):
+        """[start, stop) 구간을 겹치는 조각만 잘라 이어서 반환하는 함수"""
+        if stop <= start:
+            return ""
+        if self._joined is not None:
+            return self._joined[start:stop]
+        pieces = []
+        index = bisect_right(self._starts, start) - 1
+        while index < len(self._segments):
+            seg = self._segments[index]
+            if seg.start >= stop:
+                break
+            pieces.append(seg.text[max(0, start - seg.start):stop - seg.start])
+            index += 1
+        return "".join(pieces)
+
+    def is_blank(self):
+        """공백 문자만 있는지 확인하는 함수 (전체 문자열을 만들지 않음)"""
+        return all(not text.strip() for text in self)
+
+    def write_to(self, f):
+        """조각을 순서대로 파일 객체에 쓰는 함수"""
+        for text in self:
+            f.write(text)
+
+    def __str__(self):
+        # 모델에 보낼 때처럼 전체 문자열이 필요하면 한 번만 합치고 재사용한다.
+        if self._joined is None:
+            self._joined = "".join(self)
+        return self._joined
+
+    def __format__(self, format_spec):
+        return format(str(self), format_spec)
+
+    def __eq__(self, other):
+        if isinstance(other, TextCorpus):
+            other = str(other)
+        if isinstance(other, str):
+            return len(other) == self._length and str(self) == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"TextCorpus({len(self._segments)} segments, {self._length:,} chars)"
@@ -0,0 +1,165 @@
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+#==============================================================================
+# 단계별 추적(span) 기록
+#   - PDF 추출, 업로드·처리 대기, 요청 대기, 생성, 섹션 삽입, 저장 같은 단계를
+#     (단계, 파일, 마커, 시도, 바이트, 토큰, 소요 시간) 을 가진 span 으로 남긴다.
+#   - JSON Lines 파일과 Chrome trace-event 파일(chrome://tracing, Perfetto)로 내보내
+#     느린 실행에서 어느 단계가 시간을 차지했는지 확인할 수 있다.
+#   - 기본은 꺼져 있고, 환경 변수 TRACE_OUTPUT=경로 를 주거나 enable() 하면 기록한다.
+#     꺼져 있으면 span() 은 아무것도 하지 않는다.
+#==============================================================================
+
+TRACE_ENV = "TRACE_OUTPUT"
+
+# stage: 단계 이름, start: 시작 시각(epoch 초), duration: 소요 시간(초),
+# thread: 스레드 이름, pid: 프로세스 ID, attrs: file·marker·attempt·bytes·tokens 등 추가 정보, error: 실패 시 오류 문자열
+Span = namedtuple("Span", ["stage", "start", "duration", "thread", "pid", "attrs", "error"])
+
+
+class Tracer:
+    """span 을 모아 두었다가 파일로 내보내는 추적기 (스레드 안전)"""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.spans = []
+        self._listeners = []
+        self._lock = threading.Lock()
+        # time.time() 은 해상도가 낮은 환경이 있어 단조 시계 기준으로 시각을 계산한다
+        self._epoch = time.time() - time.perf_counter()
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+        return self
+
+    def add_listener(self, callback):
+        """span 이 기록될 때마다 callback(span) 을 호출하도록 등록하는 함수 (GUI 진행 표시 등)"""
+        self._listeners.append(callback)
+
+    def now(self):
+        return self._epoch + time.perf_counter()
+
+    def record(self, stage, start, end=None, error=None, lane=None, **attrs):
+        """이미 끝난 구간을 span 으로 남기는 함수 (start/end 는 now() 기준 시각)
+
+        한 스레드에서 동시에 진행되는 작업(asyncio 작업자 등)은 lane 으로 구분하면
+        trace 보기에서 서로 다른 줄에 표시된다.
+        """
+        if not self.enabled:
+            return None
+        end = self.now() if end is None else end
+        span = Span(stage, start, max(0.0, end - start), lane or threading.current_thread().name, os.getpid(),
+                    {key: value for key, value in attrs.items() if value is not None},
+                    None if error is None else str(error))
+        with self._lock:
+            self.spans.append(span)
+        for callback in self._listeners:
+            callback(span)
+        return span
+
+    @contextmanager
+    def span(self, stage, lane=None, **attrs):
+        """with 블록을 span 으로 남기는 함수. 블록 안에서 attrs dict 에 값을 더 채울 수 있다."""
+        if not self.enabled:
+            yield attrs
+            return
+        start = self.now()
+        try:
+            yield attrs
+        except BaseException as e:
+            self.record(stage, start, error=e, lane=lane, **attrs)
+            raise
+        self.record(stage, start, lane=lane, **attrs)
+
+    def clear(self):
+        with self._lock:
+            self.spans = []
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.spans)
+
+    def export_jsonl(self, path):
+        """span 을 한 줄에 하나씩 JSON 으로 저장하는 함수"""
+        with open(path, 'w', encoding='utf-8') as f:
+            for span in self.snapshot():
+                f.write(json.dumps(span._asdict(), ensure_ascii=False, default=str) + "\n")
+        return path
+
+    def export_chrome_trace(self, path):
+        """Chrome trace-event 형식(완료 이벤트 'X')으로 저장하는 함수"""
+        spans = self.snapshot()
+        origin = min((span.start for span in spans), default=0.0)
+        threads = {}
+        events = []
+        for span in spans:
+            tid = threads.setdefault((span.pid, span.thread), len(threads) + 1)
+            args = dict(span.attrs)
+            if span.error:
+                args["error"] = span.error
+            events.append({
+                "name": span.stage,
+                "cat": span.stage.split(".", 1)[0],
+                "ph": "X",
+                "ts": round((span.start - origin) * 1e6, 1),
+                "dur": round(span.duration * 1e6, 1),
+                "pid": span.pid,
+                "tid": tid,
+                "args": args,
+            })
+        for (pid, thread), tid in threads.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": thread}})
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, ensure_ascii=False, default=str)
+        return path
+
+    def export(self, prefix):
+        """prefix.jsonl 과 prefix.trace.json 두 파일로 내보내고 경로를 반환하는 함수"""
+        directory = os.path.dirname(os.path.abspath(prefix))
+        os.makedirs(directory, exist_ok=True)
+        return self.export_jsonl(f"{prefix}.jsonl"), self.export_chrome_trace(f"{prefix}.trace.json")
+
+    def summary(self):
+        """단계별 span 수와 소요 시간 합계를 큰 순서로 정리한 문자열 목록"""
+        totals = {}
+        for span in self.snapshot():
+            count, seconds = totals.get(span.stage, (0, 0.0))
+            totals[span.stage] = (count + 1, seconds + span.duration)
+        ordered = sorted(totals.items(), key=lambda item: item[1][1], reverse=True)
+        return [f"  - {stage}: {count}건, {seconds:.2f}초" for stage, (count, seconds) in ordered]
+
+
+_tracer = Tracer(enabled=bool(os.getenv(TRACE_ENV)))
+
+
+def get_tracer():
+    """프로세스 전체가 함께 쓰는 Tracer"""
+    return _tracer
+
+
+def span(stage, lane=None, **attrs):
+    """기본 추적기로 with 블록을 span 으로 남기는 함수"""
+    return _tracer.span(stage, lane=lane, **attrs)
+
+
+def export_requested(log=print, prefix=None):
+    """TRACE_OUTPUT(또는 prefix)이 주어졌으면 기록한 span 을 파일로 내보내는 함수"""
+    prefix = prefix or os.getenv(TRACE_ENV)
+    if not prefix or not _tracer.enabled:
+        return None
+    try:
+        paths = _tracer.export(prefix)
+    except OSError as e:
+        if log:
+            log(f"  - 경고: 추적 파일 저장 실패: {e}")
+        return None
+    if log:
+        log(f"\n단계별 소요 시간 (추적 {len(_tracer.spans)}건, 저장: {paths[0]}, {paths[1]})")
+        for line in _tracer.summary():
+            log(line)
+    return paths
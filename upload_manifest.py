@@ -0,0 +1,218 @@
+import datetime
+import itertools
+import json
+import os
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+from pdf_extract import file_sha256
+
+#==============================================================================
+# 업로드 파일 재사용 (내용 해시 매니페스트)
+#   - 파일 내용 SHA-256 → 원격 파일 이름/만료 시각을 로컬 JSON 매니페스트에 기록한다.
+#   - 아직 유효한 원격 파일은 다시 올리지 않고 그대로 사용하며,
+#     새 파일이나 내용이 바뀐 파일만 업로드한다.
+#   - 파일 API는 주입할 수 있어서 LocalFilesApi 로 네트워크 없이 시험할 수 있다.
+#==============================================================================
+
+DEFAULT_MANIFEST_PATH = os.getenv(
+    "UPLOAD_MANIFEST_PATH",
+    os.path.join(os.path.expanduser("~"), ".llm_docwriter_cache", "uploads.json"),
+)
+
+# Gemini 파일 API는 업로드 후 48시간 동안 파일을 보관한다.
+FILE_TTL_SECONDS = 48 * 60 * 60
+# 만료 직전 파일은 생성 도중 사라질 수 있으므로 여유를 두고 새로 올린다.
+EXPIRY_MARGIN_SECONDS = 60 * 60
+
+
+class GeminiFilesApi:
+    """google.generativeai 파일 API 어댑터"""
+
+    def __init__(self, genai_module=None):
+        if genai_module is None:
+            import google.generativeai as genai_module
+        self.genai = genai_module
+
+    def upload(self, path):
+        return self.genai.upload_file(path=path)
+
+    def get(self, name):
+        return self.genai.get_file(name)
+
+    def delete(self, name):
+        self.genai.delete_file(name)
+
+
+class LocalFilesApi:
+    """네트워크 없이 동작하는 가짜 파일 API (시험·벤치마크용)
+
+    processing_polls 만큼 get 을 호출해야 PROCESSING 에서 ACTIVE 로 바뀐다.
+    """
+
+    def __init__(self, ttl_seconds=FILE_TTL_SECONDS, processing_polls=0):
+        self.ttl_seconds = ttl_seconds
+        self.processing_polls = processing_polls
+        self.files = {}
+        self.upload_count = 0
+        self.delete_count = 0
+        self._polls = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _state(self, name):
+        return "PROCESSING" if self._polls.get(name, 0) < self.processing_polls else "ACTIVE"
+
+    def upload(self, path):
+        with self._lock:
+            name = f"files/local-{next(self._ids)}"
+            expiration = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=self.ttl_seconds)
+            self.files[name] = SimpleNamespace(
+                name=name,
+                display_name=os.path.basename(path),
+                size_bytes=os.path.getsize(path),
+                expiration_time=expiration,
+                state=SimpleNamespace(name=self._state(name)),
+            )
+            self.upload_count += 1
+            return self.files[name]
+
+    def get(self, name):
+        with self._lock:
+            if name not in self.files:
+                raise LookupError(f"{name} 파일이 없습니다.")
+            self._polls[name] = self._polls.get(name, 0) + 1
+            self.files[name].state = SimpleNamespace(name=self._state(name))
+            return self.files[name]
+
+    def delete(self, name):
+        with self._lock:
+            if self.files.pop(name, None) is None:
+                raise LookupError(f"{name} 파일이 없습니다.")
+            self.delete_count += 1
+
+
+def _expiry_timestamp(file):
+    """원격 파일의 만료 시각(epoch 초), 알 수 없으면 업로드 시각 + 48시간"""
+    expiration = getattr(file, "expiration_time", None)
+    if isinstance(expiration, datetime.datetime):
+        return expiration.timestamp()
+    return time.time() + FILE_TTL_SECONDS
+
+
+class UploadManifest:
+    """내용 해시 → 원격 파일 정보를 저장하는 JSON 매니페스트 (스레드 안전)"""
+
+    VERSION = 1
+
+    def __init__(self, path=DEFAULT_MANIFEST_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = self._read()
+
+    def _read(self):
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get("version") != self.VERSION:
+            return {}
+        return data.get("files", {})
+
+    def _save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(suffix='.json', dir=os.path.dirname(os.path.abspath(self.path)))
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({"version": self.VERSION, "files": self._entries}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def get(self, digest):
+        with self._lock:
+            entry = self._entries.get(digest)
+            return dict(entry) if entry else None
+
+    def record(self, digest, file, source=""):
+        """업로드한 원격 파일을 기록하는 함수"""
+        with self._lock:
+            self._entries[digest] = {
+                "name": file.name,
+                "display_name": getattr(file, "display_name", os.path.basename(source)),
+                "source": os.path.basename(source),
+                "expires_at": _expiry_timestamp(file),
+                "uploaded_at": time.time(),
+            }
+            self._save()
+
+    def forget(self, digest=None, name=None):
+        """해시 또는 원격 파일 이름으로 항목을 지우는 함수"""
+        with self._lock:
+            if name is not None:
+                digest = next((d for d, e in self._entries.items() if e["name"] == name), digest)
+            if self._entries.pop(digest, None) is not None:
+                self._save()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class ReusableUploader:
+    """매니페스트를 확인해 유효한 원격 파일은 재사용하고, 나머지만 업로드하는 객체"""
+
+    def __init__(self, files_api=None, manifest=None, expiry_margin=EXPIRY_MARGIN_SECONDS):
+        self.files_api = files_api if files_api is not None else GeminiFilesApi()
+        self.manifest = manifest if manifest is not None else UploadManifest()
+        self.expiry_margin = expiry_margin
+        self._digests = {}
+
+    def _reuse(self, digest):
+        entry = self.manifest.get(digest)
+        if entry is None or entry["expires_at"] - self.expiry_margin <= time.time():
+            return None
+        try:
+            file = self.files_api.get(entry["name"])
+        except Exception:
+            return None
+        if file.state.name == "FAILED":
+            return None
+        return file
+
+    def upload(self, path):
+        """(원격 파일, 재사용 여부) 를 반환하는 함수"""
+        digest = file_sha256(path)
+        file = self._reuse(digest)
+        reused = file is not None
+        if not reused:
+            self.manifest.forget(digest)
+            file = self.files_api.upload(path)
+            self.manifest.record(digest, file, source=path)
+        self._digests[file.name] = digest
+        return file, reused
+
+    def restore(self, name, digest):
+        """이전 실행에서 올린 원격 파일을 다시 가져오는 함수 (만료·실패했거나 처리 중이면 None)"""
+        try:
+            file = self.files_api.get(name)
+        except Exception:
+            return None
+        if file.state.name != "ACTIVE":
+            return None
+        self._digests[file.name] = digest
+        return file
+
+    def digest_for(self, file):
+        """업로드한 원격 파일의 로컬 내용 해시 (응답 캐시 키에 사용)"""
+        return self._digests.get(getattr(file, "name", None))
+
+    def delete(self, file):
+        """원격 파일을 삭제하고 매니페스트에서도 지우는 함수"""
+        try:
+            self.files_api.delete(file.name)
+        finally:
+            self.manifest.forget(name=file.name)
@@ -0,0 +1,177 @@
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from tracing import get_tracer
+
+#==============================================================================
+# 적응형 업로드 스케줄러
+#   - 고정된 스레드 수 대신 AIMD(가산 증가·승산 감소) 방식으로 동시 업로드 수를 조절한다.
+#     성공하면 조금씩 늘리고, 429·오류가 나면 절반으로 줄인다.
+#     동시 업로드를 늘려도 전체 처리량이 더 이상 늘지 않으면 그 수준에서 멈춘다.
+#   - 큰 파일부터 업로드해서 마지막에 큰 파일 하나만 남아 기다리는 일을 줄인다.
+#==============================================================================
+
+# path/size: 파일, seconds: 마지막 시도의 업로드 시간, wait_seconds: 대기열에서 기다린 시간,
+# attempts: 시도 횟수, concurrency: 시작할 때의 동시 업로드 한도, error: 실패 시 예외
+UploadTiming = namedtuple("UploadTiming", ["path", "size", "seconds", "wait_seconds", "attempts", "concurrency", "error"])
+
+
+def is_throttle_error(error):
+    """요청 한도 초과(429, ResourceExhausted 등) 오류인지 확인하는 함수"""
+    text = f"{type(error).__name__} {error}".lower()
+    return "429" in text or "resourceexhausted" in text or "resource exhausted" in text or "rate limit" in text
+
+
+class AimdLimiter:
+    """관측한 처리량과 오류에 따라 동시 실행 한도를 조절하는 AIMD 제어기"""
+
+    def __init__(self, initial=4, minimum=1, maximum=16, decrease_factor=0.5,
+                 gain_threshold=1.05, throughput_window=10.0, probe_interval=30.0):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease_factor = decrease_factor
+        self.gain_threshold = gain_threshold
+        self.throughput_window = throughput_window
+        self.probe_interval = probe_interval
+
+        self._window = float(max(minimum, min(initial, maximum)))
+        self._running = 0
+        self._next_ticket = 0
+        self._serving = 0
+        self._cond = threading.Condition()
+        self._completed = deque()  # (완료 시각, 바이트)
+        self._started_at = time.monotonic()
+        self._level_throughput = {}
+        self._ceiling = maximum
+        self._ceiling_until = 0.0
+        self._last_decrease = 0.0
+        self.history = []  # (경과 시간, 한도) 변경 기록
+
+    @property
+    def limit(self):
+        return max(self.minimum, min(int(self._window), self._ceiling))
+
+    def throughput(self):
+        """최근 throughput_window 초 동안의 전체 처리량 (바이트/초)"""
+        now = time.monotonic()
+        while self._completed and now - self._completed[0][0] > self.throughput_window:
+            self._completed.popleft()
+        span = min(self.throughput_window, max(now - self._started_at, 1e-6))
+        return sum(nbytes for _, nbytes in self._completed) / span
+
+    def acquire(self):
+        """한도 안에서 실행 자리를 얻고, 그때의 한도를 반환하는 함수 (요청한 순서대로 배정)"""
+        with self._cond:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            self._cond.wait_for(lambda: self._serving == ticket and self._running < self.limit)
+            self._serving += 1
+            self._running += 1
+            self._cond.notify_all()
+            return self.limit
+
+    def release(self, nbytes=0, error=False):
+        """실행을 마치고 결과를 반영하는 함수 (error 면 승산 감소, 아니면 가산 증가)"""
+        with self._cond:
+            self._running -= 1
+            now = time.monotonic()
+            old_limit = self.limit
+            if error:
+                # 동시에 실패한 요청들 때문에 여러 번 줄어들지 않도록 잠시 간격을 둔다.
+                if now - self._last_decrease > 1.0:
+                    self._window = max(self.minimum, self._window * self.decrease_factor)
+                    self._last_decrease = now
+            else:
+                self._completed.append((now, nbytes))
+                if self._ceiling < self.maximum and now >= self._ceiling_until:
+                    self._ceiling = self.maximum  # 일정 시간이 지나면 다시 늘려 본다
+                level = int(self._window)
+                self._window = min(self.maximum, self._window + 1.0 / max(self._window, 1.0))
+                if int(self._window) > level:
+                    throughput = self.throughput()
+                    previous = self._level_throughput.get(level - 1)
+                    self._level_throughput[level] = throughput
+                    if previous and throughput < previous * self.gain_threshold:
+                        # 동시 업로드를 늘려도 처리량이 그대로면 회선이 포화된 것으로 본다.
+                        self._window = float(level)
+                        self._ceiling = level
+                        self._ceiling_until = now + self.probe_interval
+            if self.limit != old_limit:
+                self.history.append((round(now - self._started_at, 3), self.limit))
+            self._cond.notify_all()
+
+
+class AdaptiveUploadScheduler:
+    """AIMD 제어기로 동시 업로드 수를 조절하며 큰 파일부터 업로드하는 스케줄러"""
+
+    def __init__(self, upload, limiter=None, max_retries=3, retry_base_delay=2.0):
+        self.upload = upload
+        self.limiter = limiter if limiter is not None else AimdLimiter()
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.timings = []
+
+    def _run_one(self, path, size, queued_at):
+        attempts = 0
+        wait_seconds = 0.0
+        wait_start = queued_at
+        while True:
+            attempts += 1
+            concurrency = self.limiter.acquire()
+            started = time.monotonic()
+            wait_seconds += started - wait_start
+            span_start = get_tracer().now()
+            try:
+                result = self.upload(path)
+            except Exception as e:
+                get_tracer().record("upload.file", span_start, error=e, file=os.path.basename(path), bytes=size,
+                                    attempt=attempts, concurrency=concurrency)
+                self.limiter.release(error=True)
+                if is_throttle_error(e) and attempts < self.max_retries:
+                    time.sleep(self.retry_base_delay * (2 ** (attempts - 1)) * random.uniform(0.5, 1.5))
+                    wait_start = time.monotonic()
+                    continue
+                return None, UploadTiming(path, size, time.monotonic() - started, wait_seconds, attempts, concurrency, e)
+            get_tracer().record("upload.file", span_start, file=os.path.basename(path), bytes=size,
+                                attempt=attempts, concurrency=concurrency)
+            self.limiter.release(nbytes=size)
+            return result, UploadTiming(path, size, time.monotonic() - started, wait_seconds, attempts, concurrency, None)
+
+    def run(self, paths):
+        """업로드를 진행하며 (경로, 결과, UploadTiming) 을 완료 순서대로 내보내는 함수"""
+        items = sorted(((os.path.getsize(path), path) for path in paths), reverse=True)
+        done = queue.Queue()
+        if not items:
+            return
+
+        def _task(size, path, queued_at):
+            try:
+                result, timing = self._run_one(path, size, queued_at)
+            except BaseException as e:
+                result, timing = None, UploadTiming(path, size, 0.0, 0.0, 0, 0, e)
+            done.put((path, result, timing))
+
+        # 실행 순서는 큰 파일부터이고, 실제 동시 실행 수는 limiter 가 정한다.
+        with ThreadPoolExecutor(max_workers=self.limiter.maximum) as pool:
+            queued_at = time.monotonic()
+            for size, path in items:
+                pool.submit(_task, size, path, queued_at)
+            for _ in items:
+                path, result, timing = done.get()
+                self.timings.append(timing)
+                yield path, result, timing
+
+    def summary(self):
+        """업로드 결과 요약 문자열"""
+        ok = [t for t in self.timings if t.error is None]
+        total_bytes = sum(t.size for t in ok)
+        busy = sum(t.seconds for t in ok)
+        peak = max((limit for _, limit in self.limiter.history), default=self.limiter.limit)
+        return (f"업로드 {len(ok)}/{len(self.timings)}개, {total_bytes / 1024 / 1024:.1f}MB, "
+                f"최대 동시 업로드 {peak}개, 현재 한도 {self.limiter.limit}개, "
+                f"파일당 평균 {busy / max(len(ok), 1):.1f}초")
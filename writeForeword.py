@@ -6,7 +6,8 @@ from google.generativeai.types import HarmCategory, HarmBlockThreshold
 import datetime 
 import json 
 import time
-import PyPDF2
+from pdf_extract import load_pdf_pages
+from text_corpus import TextCorpus
 from io import StringIO
 
 hwp = pyhwpx.Hwp()
@@ -14,20 +15,16 @@ hwp = pyhwpx.Hwp()
 def extract_text_from_pdf(pdf_path):
     """PDF 파일에서 텍스트를 추출하는 함수"""
     try:
-        with open(pdf_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            text = ""
-            for page_num in range(len(pdf_reader.pages)):
-                page = pdf_reader.pages[page_num]
-                text += page.extract_text() + "\n"
-        return text
+        # 파일 내용 해시 기반 캐시: 바뀌지 않은 PDF는 다시 파싱하지 않음
+        pdf = load_pdf_pages(pdf_path)
+        return "".join(text + "\n" for text in pdf.raw)
     except Exception as e:
         print(f"PDF 텍스트 추출 오류 ({pdf_path}): {e}")
         return ""
 
 def combine_pdf_texts(pdf_files_paths):
     """여러 PDF 파일의 텍스트를 하나로 합치는 함수"""
-    combined_text = ""
+    combined_text = TextCorpus()
     
     print("PDF 파일에서 텍스트를 추출하고 통합합니다...")
     for file_path in pdf_files_paths:
@@ -36,8 +33,8 @@ def combine_pdf_texts(pdf_files_paths):
             pdf_text = extract_text_from_pdf(file_path)
             
             if pdf_text.strip():
-                combined_text += f"\n\n=== {os.path.basename(file_path)} ===\n"
-                combined_text += pdf_text
+                combined_text.append(f"\n\n=== {os.path.basename(file_path)} ===\n")
+                combined_text.append(pdf_text, source=file_path)
                 print(f"  - 추출 완료: {len(pdf_text)} 문자")
             else:
                 print(f"  - 경고: '{file_path}'에서 텍스트를 추출할 수 없습니다.")
@@ -50,7 +47,7 @@ def combine_pdf_texts(pdf_files_paths):
     combined_text_path = r'C:\Users\USER\Desktop\gyeongji\0826\combined_pdfs.txt'
     try:
         with open(combined_text_path, 'w', encoding='utf-8') as f:
-            f.write(combined_text)
+            combined_text.write_to(f)
         print(f"통합된 텍스트를 파일로 저장: {combined_text_path}")
     except Exception as e:
         print(f"텍스트 파일 저장 오류: {e}")
@@ -81,7 +78,7 @@ try:
     # --- 2. PDF 텍스트 통합 ---
     combined_pdf_text = combine_pdf_texts(pdf_files_paths)
     
-    if not combined_pdf_text.strip():
+    if combined_pdf_text.is_blank():
         print("경고: 추출된 PDF 텍스트가 없습니다. 프로그램을 종료합니다.")
         exit()
 
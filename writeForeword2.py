@@ -1,96 +1,102 @@
-import pyhwpx
+try:
+    import pyhwpx
+except ImportError:
+    # 한/글이 없는 환경(리눅스 서버 등)에서는 HWPX 직접 작성만 사용
+    pyhwpx = None
 import google.generativeai as genai
 import os
-import re
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
 import datetime
 import time
-import PyPDF2
-from concurrent.futures import ThreadPoolExecutor, as_completed
 import string
+from itertools import groupby
+import multiprocessing
 from dotenv import load_dotenv
+from marker_replace import replace_markers_with_hwp, sweep_residual_markers
+from hwpx_writer import is_hwpx, hwpx_output_path, render_hwpx
+from render_pool import render_variations
+from pdf_extract import iter_pdf_pages, load_document_text
+from text_corpus import TextCorpus
+from upload_manifest import ReusableUploader
+from pipeline import prepare_sources, upload_sources
+from context_packer import documents_from_corpus, format_pack_report, pack_context
+from llm_cache import ResponseCache
+from llm_provider import create_provider
+from rate_limiter import default_limiter, is_rate_limit_error
+from tracing import export_requested
+from marker_grammar import PAIR, TITLE, parse_markers
+from section_stream import LETTER_PAIR_MARKERS, SectionParser
 
 def combine_pdf_texts(pdf_files_paths):
-    """여러 PDF 파일의 텍스트를 효율적으로 합치는 함수 (추출과 정제를 한 번에 처리)"""
+    """여러 PDF 파일의 텍스트를 효율적으로 합치는 함수 (프로세스 풀에서 페이지 단위 병렬 추출)"""
 
-    combined_text = ""
-    
+    combined_text = TextCorpus()
+    existing_paths = []
     for file_path in pdf_files_paths:
         if not os.path.exists(file_path):
             print(f"  - 경고: '{os.path.basename(file_path)}' 파일을 찾을 수 없어 건너뜁니다.")
             continue
+        existing_paths.append(file_path)
 
+    # 파일 내용 해시 기반 캐시 + 프로세스 풀 추출: 결과는 파일·페이지 순서대로 들어온다
+    for file_path, pages in groupby(iter_pdf_pages(existing_paths), key=lambda p: p.path):
         print(f"  - 처리 중: {os.path.basename(file_path)}")
-        try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                raw_text = ""
-                for page in pdf_reader.pages:
-                    if page.extract_text():
-                        raw_text += page.extract_text() + "\n"
-                
-                if not raw_text.strip():
-                    print(f"  - 경고: '{os.path.basename(file_path)}'에서 텍스트를 추출할 수 없습니다.")
-                    continue
-
-                # 정제 과정 개선: 필요한 특수문자 유지
-                cleaned_text = re.sub(r'[^\w\s가-힣.,!?;:\'"""''·()\[\]{} -]', ' ', raw_text)
-                cleaned_text = re.sub(r'\s+', ' ', cleaned_text)  # 중복 공백 제거
-                
-                combined_text += f"\n\n=== {os.path.basename(file_path)}의 내용 ===\n"
-                combined_text += cleaned_text
-                print(f"  - 완료: {len(cleaned_text):,} 문자")
+        texts = []
+        cached = True
+        error = None
+        digest = None
+        for page in pages:
+            if page.error is not None:
+                error = page.error
+                break
+            cached = cached and page.cached
+            digest = page.sha256
+            # 캐시에서 읽은 페이지는 모으지 않는다 (파일 전체 텍스트는 아래에서 페이지 파일로 가져옴)
+            if page.cleaned and not page.cached:
+                texts.append(page.cleaned)
+
+        if error is not None:
+            print(f"  - 오류: '{os.path.basename(file_path)}' 처리 중 오류 발생: {error}")
+            continue
 
-        except Exception as e:
-            print(f"  - 오류: '{os.path.basename(file_path)}' 처리 중 오류 발생: {e}")
-            
-    print(f"\n통합 및 정제된 텍스트 총 길이: {len(combined_text):,} 문자")
-    return combined_text
+        # 캐시의 페이지 파일을 mmap 으로 이어 쓰고, 문자열로 합치는 것은 캐시 저장에 실패했을 때뿐
+        cleaned_text = load_document_text(digest) or " ".join(texts)
+        if not cleaned_text:
+            print(f"  - 경고: '{os.path.basename(file_path)}'에서 텍스트를 추출할 수 없습니다.")
+            continue
 
-def wait_for_file_processing(uploaded_files, max_wait_time=300):
-    """업로드된 파일들의 처리 완료를 대기하는 함수"""
+        combined_text.append(f"\n\n=== {os.path.basename(file_path)}의 내용 ===\n")
+        combined_text.append(cleaned_text, source=file_path)
+        print(f"  - 완료: {len(cleaned_text):,} 문자{' (캐시)' if cached else ''}")
 
-    for file in uploaded_files:
-        start_time = time.time()
-        while file.state.name == "PROCESSING":
-            elapsed = time.time() - start_time
-            if elapsed > max_wait_time:
-                print(f"  - {file.display_name} 처리 시간 초과")
-                break
-            
-            print(f"  - {file.display_name} 처리 중... 10초 대기 (경과: {elapsed:.0f}초)")
-            time.sleep(10)
-            file = genai.get_file(file.name)
-        
-        if file.state.name == "FAILED":
-            print(f"  - 경고: {file.display_name} 처리 실패")
-            continue
-        elif file.state.name == "ACTIVE":
-            print(f"  - {file.display_name} 처리 완료")
+    print(f"\n통합 및 정제된 텍스트 총 길이: {len(combined_text):,} 문자")
+    return combined_text
 
-def upload_file_concurrently(file_path):
-        """단일 파일을 Gemini API에 업로드하고 결과를 반환하는 함수 (스레드에서 실행)"""
+def create_hwp_document_with_foreword(template_path, foreword_text, output_path, version_num):
+    """발간사가 포함된 한글 문서를 생성하는 함수"""
 
-        if not os.path.exists(file_path):
-            print(f"  - 경고: '{os.path.basename(file_path)}' 파일을 찾을 수 없어 건너뜁니다.")
-            return None
+    sections = parse_markers(foreword_text, families=(TITLE, PAIR))
+    for problem in sections.problems():
+        print(f"  - 경고: {version_num}번째 발간사 {problem}")
 
-        file_size = os.path.getsize(file_path)
-        if file_size > 200 * 1024 * 1024:  # 200MB
-            print(f"  - 경고: '{os.path.basename(file_path)}' 파일 크기가 200MB를 초과하여 건너뜁니다.")
-            return None
+    # 전체 내용에서 첫 번째 줄(제목)만 추출하여 한 번에 삽입
+    title_map = sections.titles()
+    possible_markers = [f"{char}{char}" for char in string.ascii_uppercase]
 
-        print(f"  - 업로드 시작: {os.path.basename(file_path)}")
+    # HWPX 템플릿은 한/글 실행 없이 직접 작성 (잔여 마커는 빈 문자열로 치환)
+    if is_hwpx(template_path):
         try:
-            file_response = genai.upload_file(path=file_path)
-            print(f"  - 업로드 완료: {file_response.display_name}")
-            return file_response
+            output_path = hwpx_output_path(output_path)
+            marker_map = {marker: "" for marker in possible_markers}
+            marker_map.update(title_map)
+            print(f"\nHWPX 파일에 {version_num}번째 질문 파싱된 답변을 삽입합니다...")
+            render_hwpx(template_path, output_path, marker_map)
+            return True, f"성공적으로 저장됨: {output_path}"
         except Exception as e:
-            print(f"  - 업로드 실패: {os.path.basename(file_path)} - {e}")
-            return None
+            return False, f"오류 발생: {e}"
 
-def create_hwp_document_with_foreword(template_path, foreword_text, output_path, version_num):
-    """발간사가 포함된 한글 문서를 생성하는 함수"""
+    if pyhwpx is None:
+        return False, "pyhwpx를 사용할 수 없어 .hwp 템플릿을 처리할 수 없습니다. .hwpx 템플릿을 사용하세요."
 
     hwp = None
     try:
@@ -107,43 +113,13 @@ def create_hwp_document_with_foreword(template_path, foreword_text, output_path,
         
         # 문서 시작으로 이동
         hwp.MoveDocBegin()
-        
-        
-        sections = re.split(r'##\s*([A-Z]{2,})', foreword_text)
-        # print(f"{version_num}번째 질문 파싱 결과:", sections)
-        
-        content_map = {}
-        if len(sections) > 1:
-            for i in range(1, len(sections), 2):
-                marker = sections[i].strip()
-                full_content = sections[i+1].strip()
-                content_map[marker] = full_content
 
         print(f"\nHWPX 파일에 {version_num}번째 질문 파싱된 답변을 삽입합니다...")
-        for marker, full_content in content_map.items():
-            # 전체 내용에서 첫 번째 줄(제목)만 추출
-            title_only = full_content.split('\n')[0].strip()
-
-            hwp.MoveDocBegin() 
-            while hwp.find(marker,direction='AllDoc'):
+        replace_markers_with_hwp(hwp, title_map)
 
-                hwp.insert_text(title_only)
-                time.sleep(0.1)
-                print(f"  - 성공: '{marker}' 위치에 제목 '{title_only}'을(를) 삽입했습니다.")
-
-                # 문서에 남아있을 수 있는 미사용 파싱 마커 (예: ##CC, ##DD 등)를 모두 찾아 삭제합니다.
+        # 문서에 남아있을 수 있는 미사용 파싱 마커 (예: ##CC, ##DD 등)를 모두 찾아 삭제합니다.
         print("\n    최종 문서에서 잔여 파싱 마커를 제거합니다...")
-        hwp.MoveDocBegin() # 문서 시작으로 이동
-        
-        # 한/글의 '찾아 바꾸기' 기능을 정규식 모드로 실행
-        possible_markers = [f"{char}{char}" for char in string.ascii_uppercase]
-        for marker in possible_markers:
-            # hwp.Find는 찾으면 True, 못 찾으면 False를 반환합니다.
-            # 문서 전체를 계속 반복하며 해당 마커가 더 이상 없을 때까지 찾아서 지웁니다.
-            while hwp.find(marker, direction='AllDoc'):
-                # 찾은 마커를 빈 문자열로 대체 (삭제)
-                hwp.Delete()
-                print("삭제완료")
+        sweep_residual_markers(hwp, possible_markers)
         
         # 파일 저장
         hwp.SaveAs(output_path)
@@ -163,9 +139,18 @@ def main():
     """메인 실행 함수"""
     # 전역 변수
     uploaded_files = []
+    active_files = []
+    # [사용자 설정] 종료 시 업로드 파일 삭제 여부 (False 면 다음 실행에서 재사용)
+    delete_uploaded_files = False
+    # .env 의 LLM_PROVIDER·API 키가 반영되도록 제공자를 만들기 전에 먼저 읽는다
+    load_dotenv()
+    # LLM 제공자 (환경 변수 LLM_PROVIDER=local 이면 네트워크 없이 가짜 응답으로 실행)
+    provider = create_provider()
+    uploader = ReusableUploader(files_api=provider)
+    # [사용자 설정] True 면 응답 캐시를 읽지 않고 새로 생성 (환경 변수 LLM_CACHE_BYPASS=1 도 가능)
+    bypass_response_cache = False
+    response_cache = ResponseCache()
 
-    load_dotenv() 
-    
     try:
         # ===== 사용자 설정 섹션 =====
         # [사용자 설정 1] 템플릿 파일들 경로 설정
@@ -309,36 +294,22 @@ def main():
             r"C:\Users\wj830\Desktop\dd\llm_data\2026년 주요업무보고(환동해산업연구원).pdf"
         ]
 
-        # ===== 1. 텍스트 추출 그룹 처리 =====
-        combined_pdf_text = ""
-        if text_extract_paths:
-            combined_pdf_text = combine_pdf_texts(text_extract_paths)
-
-        # ===== 2. 파일 업로드 그룹 처리 (병렬 처리 적용) =====
-        if file_upload_paths:
+        # ===== 1·2. 텍스트 추출과 파일 업로드를 동시에 진행 =====
+        # 로컬 PDF 텍스트 추출(CPU)과 업로드·처리 대기(네트워크)는 서로 독립적이므로 겹쳐서 실행한다.
+        def upload_group():
             print("\nPDF 파일을 AI에 직접 업로드합니다 (병렬 처리)...")
+            return upload_sources(file_upload_paths, uploader, uploaded=uploaded_files)
 
-            with ThreadPoolExecutor(max_workers=27) as executor: # 예시: 5개 파일 동시 업로드
-                # 각 파일에 대해 업로드 작업을 제출
-                future_to_file = {executor.submit(upload_file_concurrently, file_path): file_path 
-                                  for file_path in file_upload_paths} 
-                
-                for future in as_completed(future_to_file):
-                    file_path = future_to_file[future]
-                    try:
-                        file_response = future.result() # 업로드 결과 가져오기
-                        if file_response:
-                            uploaded_files.append(file_response)
-                    except Exception as exc:
-                        print(f"  - '{os.path.basename(file_path)}' 업로드 중 예외 발생: {exc}")
-
-            if uploaded_files:
-                wait_for_file_processing(uploaded_files)
-                print(f"\n총 {len(uploaded_files)}개 파일 업로드 완료")
+        combined_pdf_text, uploaded_active = prepare_sources(
+            extract=(lambda: combine_pdf_texts(text_extract_paths)) if text_extract_paths else None,
+            upload=upload_group if file_upload_paths else None,
+        )
+        combined_pdf_text = combined_pdf_text or ""
+        active_files = uploaded_active or []
 
         # ===== 3. 모델 초기화 =====
         try:
-            model = genai.GenerativeModel(
+            model = provider.model(
                 'gemini-2.5-flash',  # 최신 모델 사용
                 safety_settings={
                     HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
@@ -349,7 +320,7 @@ def main():
             )
         except Exception as e:
             print(f"기본 모델 초기화 실패: {e}")
-            model = genai.GenerativeModel('gemini-1.5-flash')
+            model = provider.model('gemini-1.5-flash')
             print("대체 모델 사용: gemini-1.5-flash")
 
         year = datetime.datetime.now().year
@@ -385,23 +356,27 @@ def main():
             }
         ]
         
-        generated_forewords = []
+        generated_forewords = [None] * len(foreword_variations)
         
-        # 토큰 절약을 위해 텍스트 데이터 축약
+        # 토큰 예산 안에서 문서별로 공평하게, 정보량이 큰 부분부터 참고 자료 구성
+        # (문자 수로 앞에서부터 자르면 뒤쪽 부서 자료가 통째로 빠진다)
+        # 최대 400000 토큰, 모델의 분당 토큰 한도(TPM)를 넘지 않도록 한도 비율 이하로 줄인다
+        context_token_budget = default_limiter().context_budget(model, 400000)
         summarized_text = ""
         if combined_pdf_text:
-            summarized_text = combined_pdf_text[:500000]  # 15,000자로 제한
-            if len(combined_pdf_text) > 500000:
-                summarized_text += "\n...(추가 내용 생략)..."
-        
-        for i, variation in enumerate(foreword_variations, 1):
-            print(f"\n[{i}/5] {variation['focus']} 발간사 생성 중...")
+            packed = pack_context(documents_from_corpus(combined_pdf_text), context_token_budget)
+            summarized_text = packed.text
+            for line in format_pack_report(packed):
+                print(line)
+
+        def generate_foreword(i, variation):
+            """한 버전의 발간사를 생성하고 문서 작성 인자를 반환하는 함수 (생성 스레드에서 실행)"""
+            print(f"\n[{i}/{len(foreword_variations)}] {variation['focus']} 발간사 생성 중...")
             
             max_retries = 3
             retry_count = 0
-            success = False
             
-            while retry_count < max_retries and not success:
+            while retry_count < max_retries:
                 try:
                     # 프롬프트 구성
                     prompt_parts = []
@@ -410,8 +385,8 @@ def main():
                     # 파일은 한 번 업로드하면 모델이 기억하므로 매번 보낼 필요 없습니다.
                     # 텍스트 요약본은 토큰 사용량이 크므로 첫 요청에만 포함.
                     if i == 1 and retry_count == 0:
-                        if uploaded_files:
-                            prompt_parts.extend(uploaded_files)
+                        if active_files:
+                            prompt_parts.extend(active_files)
                         
                         if summarized_text:
                             prompt_parts.append(f"[참고 자료 요약]\n{summarized_text}")
@@ -489,7 +464,9 @@ def main():
                     
                     prompt_parts.append(prompt_text)
                     
-                    response = model.generate_content(
+                    # 입력(프롬프트·첨부 파일·설정)이 같으면 캐시된 응답을 사용. 재시도는 항상 새로 생성
+                    response_stream = response_cache.stream(
+                        model,
                         prompt_parts,
                         generation_config=genai.types.GenerationConfig(
                             temperature=0.8,
@@ -497,90 +474,78 @@ def main():
                             top_k=40,
                             max_output_tokens=5000,
                         ),
+                        bypass=bypass_response_cache or retry_count > 0,
+                        attachment_hash=uploader.digest_for,
                     )
-                    
-                    if response and hasattr(response, 'text'):
-                        foreword_text = response.text.strip()
+                    if response_stream.cached:
+                        print("  - 캐시된 응답 사용 (입력 변경 없음)")
+
+                    # 응답을 받는 동안 완성된 문장(섹션)부터 바로 출력
+                    parser = SectionParser(LETTER_PAIR_MARKERS)
+                    for chunk in response_stream:
+                        for marker, content in parser.feed(chunk):
+                            print(f"  [{i}] ##{marker} {content}")
+                    for marker, content in parser.close():
+                        print(f"  [{i}] ##{marker} {content}")
+
+                    if parser.text.strip():
+                        foreword_text = parser.text.strip()
                         
                         # 응답 검증
                         if len(foreword_text) < 400:
-                            print(f"  - 경고: 생성된 텍스트가 너무 짧습니다. 재시도...")
+                            print(f"  - [{i}] 경고: 생성된 텍스트가 너무 짧습니다. 재시도...")
                             retry_count += 1
                             continue
                         
-                        generated_forewords.append(foreword_text)
+                        generated_forewords[i-1] = foreword_text
                         
-                        print(f"  ✓ 발간사 생성 완료 ({len(foreword_text)}자)")
+                        print(f"  ✓ [{i}] 발간사 생성 완료 ({len(foreword_text)}자)")
                         print(f"  미리보기: {foreword_text[:80]}...")
                         
-                        # 한글 파일 생성
+                        # 한글 파일 생성은 작성기 풀에서 진행
                         template_to_use = available_templates[i-1] if i <= len(available_templates) else (available_templates[0] if available_templates else "")
                         output_filename = f"발간사_{i:02d}_{variation['focus'].replace(' ', '_')}.hwp"
-                        output_path = os.path.join(output_dir, output_filename)
-                        
-                        file_success, message = create_hwp_document_with_foreword(
-                            template_to_use, foreword_text, output_path, i
-                        )
-                        
-                        if file_success:
-                            print(f"  ✓ 한글 파일 생성: {output_filename}")
-                        else:
-                            print(f"  ✗ 한글 파일 생성 실패: {message}")
-                        
-                        success = True
+                        return template_to_use, foreword_text, os.path.join(output_dir, output_filename), i
                         
                     else:
-                        print(f"  ✗ 응답 없음. 재시도 {retry_count+1}/{max_retries}")
+                        print(f"  ✗ [{i}] 응답 없음. 재시도 {retry_count+1}/{max_retries}")
                         retry_count += 1
                         
                 except Exception as e:
                     error_message = str(e)
-                    print(f"  ✗ 오류 발생: {error_message[:100]}")
+                    print(f"  ✗ [{i}] 오류 발생: {error_message[:100]}")
                     
-                    # API 할당량 초과 처리
-                    if "429" in error_message or "quota" in error_message.lower():
-                        retry_match = re.search(r'retry in (\d+\.?\d*)', error_message)
-                        wait_time = float(retry_match.group(1)) + 5 if retry_match else 30
-                        print(f"  ⏳ API 한도 초과. {wait_time:.0f}초 대기...")
-                        time.sleep(wait_time)
-                    else:
+                    # 한도 초과(429)는 요청 스케줄러가 Retry-After 만큼 기다려 이미 재시도했으므로 바로 다음 시도로 넘어간다
+                    if not is_rate_limit_error(e):
                         time.sleep(5)
                     
                     retry_count += 1
             
-            if not success:
-                print(f"  ✗ 최종 실패. 하드코딩된 기본 발간사를 사용합니다.")
-                
-                # 실패 시, 해당 순서(i)에 맞는 기본 발간사 사용
-                template_foreword = fallback_forewords[i-1] # i는 1부터 시작하므로 인덱스는 i-1
-                generated_forewords.append(template_foreword)
-                
-                template_to_use = template_paths[i-1] if i <= len(template_paths) else ""
-                output_filename = f"발간사_{i:02d}_{variation['focus'].replace(' ', '_')}_기본.hwp"
-                output_path = os.path.join(output_dir, output_filename)
-                
-                file_success, message = create_hwp_document_with_foreword(template_to_use, template_foreword, output_path, i)
-                if file_success:
-                    print(f"  ✓ 기본 템플릿 파일 생성: {output_filename}")
-                
-                generated_forewords.append(template_foreword)
-                
-                # 기본 템플릿으로 파일 생성
-                template_to_use = available_templates[0] if available_templates else ""
-                output_filename = f"발간사_{i:02d}_{variation['focus'].replace(' ', '_')}_기본.hwp"
-                output_path = os.path.join(output_dir, output_filename)
-                
-                file_success, message = create_hwp_document_with_foreword(
-                    template_to_use, template_foreword, output_path, i
-                )
-                
-                if file_success:
-                    print(f"  ✓ 기본 템플릿 파일 생성: {output_filename}")
+            print(f"  ✗ [{i}] 최종 실패. 하드코딩된 기본 발간사를 사용합니다.")
+            
+            # 실패 시, 해당 순서(i)에 맞는 기본 발간사 사용
+            template_foreword = fallback_forewords[i-1] # i는 1부터 시작하므로 인덱스는 i-1
+            generated_forewords[i-1] = template_foreword
             
-            # 다음 요청 전 대기
-            if i < len(foreword_variations):
-                print("  다음 발간사 생성을 위해 대기 중...")
-                time.sleep(5)
+            # 기본 템플릿으로 파일 생성
+            template_to_use = available_templates[0] if available_templates else ""
+            output_filename = f"발간사_{i:02d}_{variation['focus'].replace(' ', '_')}_기본.hwp"
+            return template_to_use, template_foreword, os.path.join(output_dir, output_filename), i
+
+        def report_document(i, result, error):
+            """문서 작성 결과를 출력하는 함수"""
+            if error:
+                print(f"  ✗ [{i}] 한글 파일 생성 실패: {error}")
+                return
+            file_success, message = result
+            if file_success:
+                print(f"  ✓ [{i}] 한글 파일 생성: {message}")
+            else:
+                print(f"  ✗ [{i}] 한글 파일 생성 실패: {message}")
+
+        # ===== 4-1. 모든 버전을 동시에 생성하고, 끝나는 대로 작성기 풀에서 문서 작성 =====
+        render_variations(foreword_variations, generate_foreword, create_hwp_document_with_foreword,
+                          on_result=report_document)
         
         # ===== 5. 결과 출력 =====
         print(f"\n{'=' * 60}")
@@ -595,6 +560,7 @@ def main():
         
         print(f"\n✅ 모든 작업 완료!")
         print(f"결과 파일 위치: {output_dir}")
+        print(default_limiter().summary())
         
     except Exception as e:
         print(f"\n❌ 프로그램 실행 중 치명적 오류 발생: {e}")
@@ -603,14 +569,17 @@ def main():
         
     finally:
         # ===== 정리 작업 =====
+        export_requested()
         print("\n프로그램 정리 작업 시작...")
         
         # 업로드된 파일들 정리
-        if uploaded_files:
+        if uploaded_files and not delete_uploaded_files:
+            print(f"업로드된 파일 {len(uploaded_files)}개를 다음 실행에서 재사용하도록 유지합니다.")
+        elif uploaded_files:
             print("업로드된 임시 파일들을 삭제합니다...")
             for file in uploaded_files:
                 try:
-                    genai.delete_file(file.name)
+                    uploader.delete(file)
                     print(f"  ✓ 삭제: {file.display_name}")
                 except Exception as e:
                     print(f"  ✗ 삭제 실패: {file.display_name} - {e}")
@@ -619,4 +588,6 @@ def main():
         print("=" * 60)
 
 if __name__ == "__main__":
+    # 작성기 프로세스 풀 사용을 위한 설정 (윈도우 spawn 방식)
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
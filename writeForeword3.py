@@ -1,174 +1,269 @@
-import pyhwpx
+try:
+    import pyhwpx
+except ImportError:
+    # 한/글이 없는 환경(리눅스 서버 등)에서는 HWPX 직접 작성만 사용
+    pyhwpx = None
 import google.generativeai as genai
 import os
-import re
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
 import datetime
 import time
-import PyPDF2
-from concurrent.futures import ThreadPoolExecutor, as_completed
 import string
+from itertools import groupby
 from dotenv import load_dotenv
+from hwpx_writer import hwpx_output_path, is_hwpx, open_section_writer
+from marker_grammar import LETTER_DIGIT
+from marker_replace import erase_marker_line, sweep_residual_markers
+from template_index import load_template_index
+from pdf_extract import iter_pdf_pages, load_document_text
+from text_corpus import TextCorpus
+from upload_manifest import ReusableUploader
+from pipeline import prepare_sources, upload_sources
+from context_packer import documents_from_corpus, format_pack_report, pack_context
+from llm_cache import ResponseCache, cache_key
+from llm_provider import create_provider
+from rate_limiter import default_limiter, is_rate_limit_error
+from tracing import export_requested
+from run_store import RunStore, files_key
+from section_stream import LETTER_DIGIT_MARKERS, SectionParser, parse_sections
 
 def combine_pdf_texts(pdf_files_paths):
-    """여러 PDF 파일의 텍스트를 효율적으로 합치는 함수 (추출과 정제를 한 번에 처리)"""
+    """여러 PDF 파일의 텍스트를 효율적으로 합치는 함수 (프로세스 풀에서 페이지 단위 병렬 추출)"""
 
-    combined_text = ""
-    
+    combined_text = TextCorpus()
+    existing_paths = []
     for file_path in pdf_files_paths:
         if not os.path.exists(file_path):
             print(f"  - 경고: '{os.path.basename(file_path)}' 파일을 찾을 수 없어 건너뜁니다.")
             continue
+        existing_paths.append(file_path)
 
+    # 파일 내용 해시 기반 캐시 + 프로세스 풀 추출: 결과는 파일·페이지 순서대로 들어온다
+    for file_path, pages in groupby(iter_pdf_pages(existing_paths), key=lambda p: p.path):
         print(f"  - 처리 중: {os.path.basename(file_path)}")
-        try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                raw_text = ""
-                for page in pdf_reader.pages:
-                    if page.extract_text():
-                        raw_text += page.extract_text() + "\n"
-                
-                if not raw_text.strip():
-                    print(f"  - 경고: '{os.path.basename(file_path)}'에서 텍스트를 추출할 수 없습니다.")
-                    continue
-
-                # 정제 과정 개선: 필요한 특수문자 유지
-                cleaned_text = re.sub(r'[^\w\s가-힣.,!?;:\'"""''·()\[\]{} -]', ' ', raw_text)
-                cleaned_text = re.sub(r'\s+', ' ', cleaned_text)  # 중복 공백 제거
-                
-                combined_text += f"\n\n=== {os.path.basename(file_path)}의 내용 ===\n"
-                combined_text += cleaned_text
-                print(f"  - 완료: {len(cleaned_text):,} 문자")
-
-        except Exception as e:
-            print(f"  - 오류: '{os.path.basename(file_path)}' 처리 중 오류 발생: {e}")
-            
-    print(f"\n통합 및 정제된 텍스트 총 길이: {len(combined_text):,} 문자")
-    return combined_text
-
-def wait_for_file_processing(uploaded_files, max_wait_time=300):
-    """업로드된 파일들의 처리 완료를 대기하는 함수"""
-
-    for file in uploaded_files:
-        start_time = time.time()
-        while file.state.name == "PROCESSING":
-            elapsed = time.time() - start_time
-            if elapsed > max_wait_time:
-                print(f"  - {file.display_name} 처리 시간 초과")
+        texts = []
+        cached = True
+        error = None
+        digest = None
+        for page in pages:
+            if page.error is not None:
+                error = page.error
                 break
-            
-            print(f"  - {file.display_name} 처리 중... 10초 대기 (경과: {elapsed:.0f}초)")
-            time.sleep(10)
-            file = genai.get_file(file.name)
-        
-        if file.state.name == "FAILED":
-            print(f"  - 경고: {file.display_name} 처리 실패")
+            cached = cached and page.cached
+            digest = page.sha256
+            # 캐시에서 읽은 페이지는 모으지 않는다 (파일 전체 텍스트는 아래에서 페이지 파일로 가져옴)
+            if page.cleaned and not page.cached:
+                texts.append(page.cleaned)
+
+        if error is not None:
+            print(f"  - 오류: '{os.path.basename(file_path)}' 처리 중 오류 발생: {error}")
             continue
-        elif file.state.name == "ACTIVE":
-            print(f"  - {file.display_name} 처리 완료")
 
-def upload_file_concurrently(file_path):
-        """단일 파일을 Gemini API에 업로드하고 결과를 반환하는 함수 (스레드에서 실행)"""
+        # 캐시의 페이지 파일을 mmap 으로 이어 쓰고, 문자열로 합치는 것은 캐시 저장에 실패했을 때뿐
+        cleaned_text = load_document_text(digest) or " ".join(texts)
+        if not cleaned_text:
+            print(f"  - 경고: '{os.path.basename(file_path)}'에서 텍스트를 추출할 수 없습니다.")
+            continue
 
-        if not os.path.exists(file_path):
-            print(f"  - 경고: '{os.path.basename(file_path)}' 파일을 찾을 수 없어 건너뜁니다.")
-            return None
+        combined_text.append(f"\n\n=== {os.path.basename(file_path)}의 내용 ===\n")
+        combined_text.append(cleaned_text, source=file_path)
+        print(f"  - 완료: {len(cleaned_text):,} 문자{' (캐시)' if cached else ''}")
 
-        file_size = os.path.getsize(file_path)
-        if file_size > 200 * 1024 * 1024:  # 200MB
-            print(f"  - 경고: '{os.path.basename(file_path)}' 파일 크기가 200MB를 초과하여 건너뜁니다.")
-            return None
+    print(f"\n통합 및 정제된 텍스트 총 길이: {len(combined_text):,} 문자")
+    return combined_text
 
-        print(f"  - 업로드 시작: {os.path.basename(file_path)}")
-        try:
-            file_response = genai.upload_file(path=file_path)
-            print(f"  - 업로드 완료: {file_response.display_name}")
-            return file_response
-        except Exception as e:
-            print(f"  - 업로드 실패: {os.path.basename(file_path)} - {e}")
-            return None
+def _segment_checkpoint(segment):
+    # 페이지 파일(PDF 텍스트 캐시)에 있는 텍스트는 캐시 키만 기록한다
+    if isinstance(segment.text, str):
+        return [segment.source, segment.text]
+    return [segment.source, {"sha256": segment.text.pages.page_file.header["sha256"]}]
+
+def _restore_corpus(segments):
+    corpus = TextCorpus()
+    for source, text in segments:
+        if isinstance(text, dict):
+            text = load_document_text(text["sha256"])
+            if text is None:
+                return None
+        corpus.append(text, source=source)
+    return corpus
+
+def extract_stage(run, pdf_files_paths):
+    """PDF 텍스트 추출 단계 (같은 실행에서 이미 추출했으면 저장된 텍스트를 사용)"""
+    key = files_key(pdf_files_paths)
+    segments = run.load("extract", key)
+    corpus = _restore_corpus(segments) if segments is not None else None
+    if corpus is not None:
+        print(f"  - 체크포인트: 추출 텍스트 재사용 ({len(corpus):,} 문자)")
+        return corpus
+    corpus = combine_pdf_texts(pdf_files_paths)
+    run.save("extract", [_segment_checkpoint(segment) for segment in corpus.segments], key)
+    return corpus
+
+def upload_stage(run, file_paths, uploader, uploaded):
+    """파일 업로드 단계 (같은 실행에서 올린 파일이 아직 사용 가능하면 다시 올리지 않음)"""
+    key = files_key(file_paths)
+    entries = run.load("uploads", key)
+    if entries is not None:
+        files = [uploader.restore(entry["name"], entry["digest"]) for entry in entries]
+        if all(files):
+            print(f"  - 체크포인트: 업로드 파일 {len(files)}개 재사용")
+            uploaded.extend(files)
+            return files
+    active_files = upload_sources(file_paths, uploader, uploaded=uploaded)
+    run.save("uploads", [{"name": file.name, "digest": uploader.digest_for(file),
+                          "source": getattr(file, "display_name", "")} for file in active_files], key)
+    return active_files
+
+POSSIBLE_MARKERS = [f"{char}{num}" for char in string.ascii_uppercase for num in range(1, 10)]
+
+def _erase_marker_line(hwp, marker):
+    # 파싱 마커는 마커 줄까지, 강조 문자 '#'는 글자만 지운다
+    if marker == "#":
+        hwp.Erase()
+    else:
+        erase_marker_line(hwp, marker)
+
+def remove_residual_markers(hwp):
+    """한/글 문서에 남은 파싱 마커 줄과 강조 문자 '#'를 지우는 함수 (COM 작성기 저장 직전 호출)"""
+    return sweep_residual_markers(hwp, POSSIBLE_MARKERS + ["#"], remove=_erase_marker_line)
+
+def open_foreword_document(template_path, output_path):
+    """섹션을 받는 대로 삽입하는 문서 작성기를 여는 함수
+
+    HWPX 템플릿은 한/글 실행 없이 직접 작성한다 (.hwp 와 같이 잔여 마커는 문단째 지우고,
+    강조 문자 '#'은 빈 문자열로 치환). 템플릿 자리 표시자 색인이 있으면 템플릿에 있는 마커 위치에만 값을 넣는다.
+    """
+    index = load_template_index(template_path)
+    if is_hwpx(template_path):
+        return open_section_writer(template_path, output_path, POSSIBLE_MARKERS, {"#": ""}, index=index,
+                                   erase=POSSIBLE_MARKERS)
+
+    if pyhwpx is None:
+        raise RuntimeError("pyhwpx를 사용할 수 없어 .hwp 템플릿을 처리할 수 없습니다. .hwpx 템플릿을 사용하세요.")
+    return open_section_writer(template_path, output_path, cleanup=remove_residual_markers, visible=True, index=index)
+
+def insert_section(writer, marker, full_content):
+    """섹션의 첫 번째 줄(제목)만 추출하여 문서에 삽입하는 함수"""
+    title = full_content.split('\n')[0].strip()
+    writer.add(marker, title.replace("#", ""))
+
+def write_foreword_sections(template_path, sections, output_path, version_num):
+    """파싱된 (마커, 내용) 목록으로 한글 문서를 생성하는 함수"""
 
-def create_hwp_document_with_foreword(template_path, foreword_text, output_path, version_num):
-    """발간사가 포함된 한글 문서를 생성하는 함수"""
-
-    hwp = None
     try:
-        hwp = pyhwpx.Hwp(visible=True)
-        
-        # 템플릿 파일 열기
-        if os.path.exists(template_path):
-            hwp.Open(template_path)
-            print(f"템플릿 파일 열기: {os.path.basename(template_path)}")
-        else:
-            # 새 문서 생성
-            hwp.XHwpDocuments.Add()
-            print("새 문서 생성")
-        
-        # 문서 시작으로 이동
-        hwp.MoveDocBegin()
-        
-        
-        sections = re.split(r'##\s*([A-Z][0-9])', foreword_text)
-        print(f"{version_num}번째 질문 파싱 결과:", sections)
-        
-        content_map = {}
-        if len(sections) > 1:
-            for i in range(1, len(sections), 2):
-                marker = sections[i].strip()
-                full_content = sections[i+1].strip()
+        with open_foreword_document(template_path, output_path) as writer:
+            print(f"\nHWPX 파일에 {version_num}번째 질문 파싱된 답변을 삽입합니다...")
+            for marker, full_content in sections:
                 print(full_content)
-                content_map[marker] = full_content
-
-        print(f"\nHWPX 파일에 {version_num}번째 질문 파싱된 답변을 삽입합니다...")
-        for marker, full_content in content_map.items():
-            # 전체 내용에서 첫 번째 줄(제목)만 추출
-            title_only = full_content.split('\n')[0].strip()
-
-            hwp.MoveDocBegin() 
-            while hwp.find(marker,direction='AllDoc'):
-
-                hwp.insert_text(title_only)
-                time.sleep(0.1)
-                print(f"  - 성공: '{marker}' 위치에 제목 '{title_only}'을(를) 삽입했습니다.")
-
-        hwp.MoveDocBegin() # 문서 시작으로 이동
-        
-        # 한/글의 '찾아 바꾸기' 기능을 정규식 모드로 실행
-        possible_markers = [f"{char}{num}" for char in string.ascii_uppercase for num in range(1, 10)]
-        
-
-        for marker in possible_markers:
-            while hwp.find(marker, direction='AllDoc'):
-                hwp.Erase()
-                hwp.DeleteLine()
-                hwp.DeleteLine()
+                insert_section(writer, marker, full_content)
+            writer.save()
+        return True, f"성공적으로 저장됨: {writer.output_path}"
+    except Exception as e:
+        return False, f"오류 발생: {e}"
 
-        while hwp.find("#",direction='AllDoc'):
-            hwp.Erase()
+def create_hwp_document_with_foreword(template_path, foreword_text, output_path, version_num):
+    """발간사가 포함된 한글 문서를 생성하는 함수 (완성된 텍스트용, 기본 발간사 등)"""
+    return write_foreword_sections(template_path, parse_sections(foreword_text, LETTER_DIGIT_MARKERS), output_path,
+                                   version_num)
+
+def document_path(template_path, output_path):
+    """작성기가 실제로 저장하는 경로 (HWPX 템플릿이면 확장자가 .hwpx)"""
+    return hwpx_output_path(output_path) if is_hwpx(template_path) else output_path
+
+def checkpoint_foreword(run, key, foreword_text, file_result, template_path, output_path, version_num):
+    """생성한 원본 응답, 섹션 맵, 완성 문서를 실행 폴더에 저장하는 함수"""
+    run.save(f"response_{version_num}", foreword_text, key)
+    sections = parse_sections(foreword_text, LETTER_DIGIT_MARKERS)
+    run.save(f"sections_{version_num}", [list(section) for section in sections], key)
+    if file_result[0]:
+        run.save_file(f"document_{version_num}", document_path(template_path, output_path), key)
+
+def resume_foreword(run, key, template_path, output_path, version_num):
+    """같은 입력으로 이미 받은 응답이 있으면 다시 생성하지 않고 문서를 이어 만드는 함수
+
+    완성 문서 → 섹션 맵 → 원본 응답 순으로 남아 있는 체크포인트부터 이어 가며,
+    (응답 텍스트, (성공 여부, 메시지)) 를 반환한다. 받은 응답이 없으면 None 을 반환한다.
+    """
+    foreword_text = run.load(f"response_{version_num}", key)
+    if foreword_text is None:
+        return None
+    restored = run.restore_file(f"document_{version_num}", document_path(template_path, output_path), key)
+    if restored:
+        print(f"  - 체크포인트: 완성 문서 재사용 ({os.path.basename(restored)})")
+        return foreword_text, (True, f"성공적으로 저장됨: {restored}")
+    sections = run.load(f"sections_{version_num}", key)
+    if sections is None:
+        sections = parse_sections(foreword_text, LETTER_DIGIT_MARKERS)
+    print(f"  - 체크포인트: 저장된 응답으로 문서만 다시 작성 ({len(sections)}개 섹션)")
+    file_result = write_foreword_sections(template_path, sections, output_path, version_num)
+    if file_result[0]:
+        run.save_file(f"document_{version_num}", document_path(template_path, output_path), key)
+    return foreword_text, file_result
+
+def stream_foreword_document(response_stream, template_path, output_path, version_num, min_length=5000):
+    """스트리밍 응답을 받으면서 완성된 섹션부터 바로 문서에 삽입하는 함수
+
+    (전체 텍스트, (성공 여부, 메시지)) 를 반환한다. 응답이 min_length 보다 짧으면 저장하지 않고
+    결과 자리에 None 을 반환한다. 문서 작성 오류가 나도 응답은 끝까지 받는다.
+    """
+    parser = SectionParser(LETTER_DIGIT_MARKERS)
+    started = time.time()
+    writer = None
+    error = None
+    try:
+        writer = open_foreword_document(template_path, output_path)
+        print(f"\nHWPX 파일에 {version_num}번째 질문 답변을 받는 대로 삽입합니다...")
+    except Exception as e:
+        error = e
 
+    def _insert(sections):
+        nonlocal error
+        for marker, full_content in sections:
+            print(f"  [{time.time() - started:5.1f}초] ##{marker} {full_content}")
+            if error is None:
+                try:
+                    insert_section(writer, marker, full_content)
+                except Exception as e:
+                    error = e
 
-        # 파일 저장
-        hwp.SaveAs(output_path)
-        
-        return True, f"성공적으로 저장됨: {output_path}"
-        
-    except Exception as e:
-        return False, f"오류 발생: {e}"
-    finally:
-        if hwp:
+    try:
+        for chunk in response_stream:
+            _insert(parser.feed(chunk))
+        _insert(parser.close())
+
+        foreword_text = parser.text.strip()
+        if len(foreword_text) < min_length:
+            return foreword_text, None
+        if error is None:
             try:
-                hwp.Quit()
-            except:
-                pass
+                writer.save()
+            except Exception as e:
+                error = e
+        if error is not None:
+            return foreword_text, (False, f"오류 발생: {error}")
+        return foreword_text, (True, f"성공적으로 저장됨: {writer.output_path}")
+    finally:
+        if writer:
+            writer.close()
 
 def main():
     """메인 실행 함수"""
     # 전역 변수
     uploaded_files = []
+    run = None
+    active_files = []
+    # [사용자 설정] 종료 시 업로드 파일 삭제 여부 (False 면 다음 실행에서 재사용)
+    delete_uploaded_files = False
+    # .env 의 LLM_PROVIDER·API 키가 반영되도록 제공자를 만들기 전에 먼저 읽는다
+    load_dotenv()
+    # LLM 제공자 (환경 변수 LLM_PROVIDER=local 이면 네트워크 없이 가짜 응답으로 실행)
+    provider = create_provider()
+    uploader = ReusableUploader(files_api=provider)
+    # [사용자 설정] True 면 응답 캐시를 읽지 않고 새로 생성 (환경 변수 LLM_CACHE_BYPASS=1 도 가능)
+    bypass_response_cache = False
+    response_cache = ResponseCache()
 
-    load_dotenv() 
-    
     try:
         # ===== 사용자 설정 섹션 =====
         # [사용자 설정 1] 템플릿 파일들 경로 설정
@@ -212,7 +307,11 @@ def main():
             print("경고: 사용 가능한 템플릿이 없습니다. 새 문서로 생성합니다.")
         
         # 결과 파일들을 저장할 디렉토리 생성
-        output_dir = os.path.join(template_base_dir, f"발간사_결과_{datetime.datetime.now().strftime('%M%S')}")
+        # 단계별 결과(추출 텍스트, 업로드 목록, 응답, 섹션 맵, 문서)를 실행 ID 폴더에 저장.
+        # 실패 후 같은 ID 로 다시 실행하면(환경 변수 RUN_ID) 끝난 단계는 건너뛴다.
+        run = RunStore()
+        print(f"\n실행 ID: {run.run_id}{' (이전 실행 이어하기)' if run.resumed else ''}, 체크포인트: {run.directory}")
+        output_dir = os.path.join(template_base_dir, f"발간사_결과_{run.run_id}")
         os.makedirs(output_dir, exist_ok=True)
         print(f"\n결과 저장 경로: {output_dir}")
         
@@ -300,34 +399,18 @@ def main():
 
         ]
 
-        # ===== 1. 텍스트 추출 그룹 처리 =====
-        combined_pdf_text = ""
-        if text_extract_paths:
-            combined_pdf_text = combine_pdf_texts(text_extract_paths)
-
-        # ===== 2. 파일 업로드 그룹 처리 (병렬 처리 적용) =====
-        if file_upload_paths:
-
-            with ThreadPoolExecutor(max_workers=27) as executor: 
-                future_to_file = {executor.submit(upload_file_concurrently, file_path): file_path 
-                                  for file_path in file_upload_paths} 
-                
-                for future in as_completed(future_to_file):
-                    file_path = future_to_file[future]
-                    try:
-                        file_response = future.result() # 업로드 결과 가져오기
-                        if file_response:
-                            uploaded_files.append(file_response)
-                    except Exception as exc:
-                        print(f"  - '{os.path.basename(file_path)}' 업로드 중 예외 발생: {exc}")
-
-            if uploaded_files:
-                wait_for_file_processing(uploaded_files)
-                print(f"\n총 {len(uploaded_files)}개 파일 업로드 완료")
+        # ===== 1·2. 텍스트 추출과 파일 업로드를 동시에 진행 =====
+        # 로컬 PDF 텍스트 추출(CPU)과 업로드·처리 대기(네트워크)는 서로 독립적이므로 겹쳐서 실행한다.
+        combined_pdf_text, uploaded_active = prepare_sources(
+            extract=(lambda: extract_stage(run, text_extract_paths)) if text_extract_paths else None,
+            upload=(lambda: upload_stage(run, file_upload_paths, uploader, uploaded_files)) if file_upload_paths else None,
+        )
+        combined_pdf_text = combined_pdf_text or ""
+        active_files = uploaded_active or []
 
         # ===== 3. 모델 초기화 =====
         try:
-            model = genai.GenerativeModel(
+            model = provider.model(
                 'gemini-2.5-flash',  # 최신 모델 사용
                 safety_settings={
                     HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
@@ -338,7 +421,7 @@ def main():
             )
         except Exception as e:
             print(f"기본 모델 초기화 실패: {e}")
-            model = genai.GenerativeModel('gemini-1.5-flash')
+            model = provider.model('gemini-1.5-flash')
             print("대체 모델 사용: gemini-1.5-flash")
 
         year = datetime.datetime.now().year + 1
@@ -355,12 +438,16 @@ def main():
         
         generated_forewords = []
         
-        # 토큰 절약을 위해 텍스트 데이터 축약
+        # 토큰 예산 안에서 문서별로 공평하게, 정보량이 큰 부분부터 참고 자료 구성
+        # (문자 수로 앞에서부터 자르면 뒤쪽 부서 자료가 통째로 빠진다)
+        # 최대 400000 토큰, 모델의 분당 토큰 한도(TPM)를 넘지 않도록 한도 비율 이하로 줄인다
+        context_token_budget = default_limiter().context_budget(model, 400000)
         summarized_text = ""
         if combined_pdf_text:
-            summarized_text = combined_pdf_text[:500000]  
-            if len(combined_pdf_text) > 500000:
-                summarized_text += "\n...(추가 내용 생략)..."
+            packed = pack_context(documents_from_corpus(combined_pdf_text), context_token_budget)
+            summarized_text = packed.text
+            for line in format_pack_report(packed):
+                print(line)
         
         for i, variation in enumerate(foreword_variations, 1):
             
@@ -374,8 +461,8 @@ def main():
                     prompt_parts = []
                     
                     if i == 1 and retry_count == 0:
-                        if uploaded_files:
-                            prompt_parts.extend(uploaded_files)
+                        if active_files:
+                            prompt_parts.extend(active_files)
                         
                         if summarized_text:
                             prompt_parts.append(f"[참고 자료 요약]\n{summarized_text}")
@@ -413,62 +500,81 @@ def main():
                                     """
                     
                     prompt_parts.append(prompt_text)
-                    
-                    response = model.generate_content(
-                        prompt_parts,
-                        generation_config=genai.types.GenerationConfig(
-                            temperature=0.8,
-                            top_p=0.9,
-                            top_k=40,
-                            max_output_tokens=70000,
-                        ),
+
+                    # 템플릿에 실제로 있는 문단 식별자만 요청
+                    template_to_use = available_templates[i-1] if i <= len(available_templates) else (available_templates[0] if available_templates else "")
+                    template_index = load_template_index(template_to_use)
+                    marker_hint = template_index.prompt_hint(LETTER_DIGIT) if template_index is not None else ""
+                    if marker_hint:
+                        prompt_parts.append(marker_hint)
+
+                    # 한글 파일은 응답을 받는 동안 완성된 섹션부터 바로 작성
+                    output_filename = f"{year}년_시장연설문.hwp"
+                    output_path = os.path.join(output_dir, output_filename)
+
+                    generation_config = genai.types.GenerationConfig(
+                        temperature=0.8,
+                        top_p=0.9,
+                        top_k=40,
+                        max_output_tokens=70000,
                     )
-                    
-                    if response and hasattr(response, 'text'):
-                        foreword_text = response.text.strip()
-                        
-                        # 응답 검증
-                        if len(foreword_text) < 5000:
-                            print(f"  - 경고: 생성된 텍스트가 너무 짧습니다. 재시도...")
-                            retry_count += 1
-                            continue
-                        
-                        generated_forewords.append(foreword_text)
-                        
-                        print(f"  ✓ 발간사 생성 완료 ({len(foreword_text)}자)")
-                        print(f"  미리보기: {foreword_text[:80]}...")
-                        
-                        # 한글 파일 생성
-                        template_to_use = available_templates[i-1] if i <= len(available_templates) else (available_templates[0] if available_templates else "")
-                        output_filename = f"{year}년_시장연설문.hwp"
-                        output_path = os.path.join(output_dir, output_filename)
-                        
-                        file_success, message = create_hwp_document_with_foreword(
-                            template_to_use, foreword_text, output_path, i
-                        )
-                        
-                        if file_success:
-                            print(f"  ✓ 한글 파일 생성: {output_filename}")
-                        else:
-                            print(f"  ✗ 한글 파일 생성 실패: {message}")
-                        
-                        success = True
-                        
+
+                    # 같은 실행에서 같은 입력으로 이미 받은 응답이 있으면 생성 없이 문서만 이어서 작성
+                    response_key = cache_key(getattr(model, "model_name", ""), prompt_parts, generation_config,
+                                             uploader.digest_for)
+                    resumed = resume_foreword(run, response_key, template_to_use, output_path, i)
+                    if resumed is not None:
+                        foreword_text, file_result = resumed
                     else:
+                        # 입력(프롬프트·첨부 파일·설정)이 같으면 캐시된 응답을 사용. 재시도는 항상 새로 생성
+                        response_stream = response_cache.stream(
+                            model,
+                            prompt_parts,
+                            generation_config=generation_config,
+                            bypass=bypass_response_cache or retry_count > 0,
+                            attachment_hash=uploader.digest_for,
+                        )
+                        if response_stream.cached:
+                            print("  - 캐시된 응답 사용 (입력 변경 없음)")
+
+                        foreword_text, file_result = stream_foreword_document(
+                            response_stream, template_to_use, output_path, i
+                        )
+                        # 문서 작성이 실패해도 받은 응답은 남겨 두어 다시 실행할 때 생성을 건너뛴다
+                        if file_result is not None:
+                            checkpoint_foreword(run, response_key, foreword_text, file_result, template_to_use,
+                                                output_path, i)
+
+                    if not foreword_text:
                         print(f"  ✗ 응답 없음. 재시도 {retry_count+1}/{max_retries}")
                         retry_count += 1
-                        
+                        continue
+
+                    # 응답 검증
+                    if file_result is None:
+                        print(f"  - 경고: 생성된 텍스트가 너무 짧습니다. 재시도...")
+                        retry_count += 1
+                        continue
+
+                    generated_forewords.append(foreword_text)
+
+                    print(f"  ✓ 발간사 생성 완료 ({len(foreword_text)}자)")
+                    print(f"  미리보기: {foreword_text[:80]}...")
+
+                    file_success, message = file_result
+                    if file_success:
+                        print(f"  ✓ 한글 파일 생성: {output_filename}")
+                    else:
+                        print(f"  ✗ 한글 파일 생성 실패: {message}")
+
+                    success = True
+
                 except Exception as e:
                     error_message = str(e)
                     print(f"  ✗ 오류 발생: {error_message[:100]}")
                     
-                    # API 할당량 초과 처리
-                    if "429" in error_message or "quota" in error_message.lower():
-                        retry_match = re.search(r'retry in (\d+\.?\d*)', error_message)
-                        wait_time = float(retry_match.group(1)) + 5 if retry_match else 30
-                        print(f"  ⏳ API 한도 초과. {wait_time:.0f}초 대기...")
-                        time.sleep(wait_time)
-                    else:
+                    # 한도 초과(429)는 요청 스케줄러가 Retry-After 만큼 기다려 이미 재시도했으므로 바로 다음 시도로 넘어간다
+                    if not is_rate_limit_error(e):
                         time.sleep(5)
                     
                     retry_count += 1
@@ -500,11 +606,6 @@ def main():
                 
                 if file_success:
                     print(f"  ✓ 기본 템플릿 파일 생성: {output_filename}")
-            
-            # 다음 요청 전 대기
-            if i < len(foreword_variations):
-                print("  다음 발간사 생성을 위해 대기 중...")
-                time.sleep(5)
         
         # ===== 5. 결과 출력 =====
         print(f"\n{'=' * 60}")
@@ -517,22 +618,28 @@ def main():
             print("-" * 40)
         
         print(f"결과 파일 위치: {output_dir}")
+        print(default_limiter().summary())
         
     except Exception as e:
         print(f"\n❌ 프로그램 실행 중 치명적 오류 발생: {e}")
         import traceback
         traceback.print_exc()
+        if run is not None:
+            print(f"같은 실행 ID로 다시 실행하면 끝난 단계는 건너뜁니다: RUN_ID={run.run_id}")
         
     finally:
         # ===== 정리 작업 =====
+        export_requested()
         print("\n프로그램 정리 작업 시작...")
         
         # 업로드된 파일들 정리
-        if uploaded_files:
+        if uploaded_files and not delete_uploaded_files:
+            print(f"업로드된 파일 {len(uploaded_files)}개를 다음 실행에서 재사용하도록 유지합니다.")
+        elif uploaded_files:
             print("업로드된 임시 파일들을 삭제합니다...")
             for file in uploaded_files:
                 try:
-                    genai.delete_file(file.name)
+                    uploader.delete(file)
                     print(f"  ✓ 삭제: {file.display_name}")
                 except Exception as e:
                     print(f"  ✗ 삭제 실패: {file.display_name} - {e}")